@@ -1,31 +1,39 @@
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import Depends, FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from repositories.categoria_repo import CategoriaRepo
-from repositories.usuario_repo import UsuarioRepo
-from repositories.item_pedido_repo import ItemPedidoRepo
-from repositories.pedido_repo import PedidoRepo
-from repositories.produto_repo import ProdutoRepo
 from routes import auth_routes, main_routes, cliente_routes, admin_routes
 from util.auth_jwt import (
     checar_autorizacao,
     checar_autenticacao,
     configurar_swagger_auth,
 )
+from util.bootstrap import inicializar_banco
+from util.catalogo import encerrar_monitor_catalogo
+from util.database import fechar_pool
+from util.estaticos import ArquivosEstaticos
 from util.exceptions import configurar_excecoes
+from util.executor_banco import encerrar_executor
+from util.executor_imagens import encerrar_executor_imagens
+from util.templates import configurar_templates
+from util.uploads import LimiteUploadMiddleware
 
 load_dotenv()
-ProdutoRepo.criar_tabela()
-ProdutoRepo.inserir_produtos_json("sql/produtos.json")
-UsuarioRepo.criar_tabela()
-UsuarioRepo.inserir_usuarios_json("sql/usuarios.json")
-PedidoRepo.criar_tabela()
-CategoriaRepo.criar_tabela()
-CategoriaRepo.inserir_categorias_json("sql/categorias.json")
-ItemPedidoRepo.criar_tabela()
-app = FastAPI()
-# app = FastAPI(dependencies=[Depends(checar_autorizacao)])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    inicializar_banco()
+    configurar_templates()
+    yield
+    encerrar_monitor_catalogo()
+    encerrar_executor()
+    encerrar_executor_imagens()
+    fechar_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+# app = FastAPI(lifespan=lifespan, dependencies=[Depends(checar_autorizacao)])
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -33,7 +41,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-app.mount(path="/static", app=StaticFiles(directory="static"), name="static")
+app.add_middleware(LimiteUploadMiddleware)
+app.mount(path="/static", app=ArquivosEstaticos(directory="static"), name="static")
 # app.middleware("http")(checar_autenticacao)
 configurar_excecoes(app)
 app.include_router(main_routes.router)
@@ -1,9 +1,16 @@
-import json
 import sqlite3
 from typing import List, Optional
 from models.categoria_model import Categoria
 from sql.categoria_sql import *
-from util.database import obter_conexao
+from util.catalogo import invalidar_catalogo
+from util.database import obter_conexao, transacao
+from util.executor_banco import RepoAssincrono
+from util.sementes import (
+    filtrar_nao_carregados,
+    ler_semente_alterada,
+    registrar_chaves_carregadas,
+    registrar_semente,
+)
 
 class CategoriaRepo:
     @classmethod
@@ -13,27 +20,31 @@ class CategoriaRepo:
             cursor.execute(SQL_CRIAR_TABELA)
             
     @classmethod
-    def inserir_categorias_json(cls, arquivo_json: str):
+    def inserir_categorias_json(cls, arquivo_json: str) -> int:
+        # categorias com o mesmo nome de uma já existente são ignoradas
         try:
-            with open(arquivo_json, "r") as f:
-                categorias_data = json.load(f)
-
-            for categoria_data in categorias_data:
-                nome_categoria = categoria_data["nome"]
-
-                # Verificar se a categoria já existe no banco
-                if not cls.categoria_existe(nome_categoria):
-                    categoria = Categoria(nome=nome_categoria)
-                    cls.inserir(categoria)
-                else:
-                    print(f"A categoria '{nome_categoria}' já existe. Ignorando inserção.")
-                    
-        except FileNotFoundError:
-            print(f"Arquivo {arquivo_json} não encontrado.")
-        except json.JSONDecodeError:
-            print("Erro ao decodificar o JSON.")
-        except Exception as ex:
-            print(f"Erro ao inserir categorias: {ex}")
+            with transacao() as conexao:
+                semente = ler_semente_alterada(arquivo_json)
+                if semente is None:
+                    return 0
+                categorias, hash_conteudo = semente
+                cursor = conexao.cursor()
+                cursor.executemany(
+                    SQL_INSERIR_SEMENTE,
+                    [
+                        (c["nome"], c.get("ativo", 1))
+                        for c in filtrar_nao_carregados("categoria", categorias, "nome")
+                    ],
+                )
+                inseridas = cursor.rowcount
+                if inseridas > 0:
+                    invalidar_catalogo()
+                registrar_chaves_carregadas("categoria", [c["nome"] for c in categorias])
+                registrar_semente(arquivo_json, hash_conteudo)
+                return inseridas
+        except (OSError, ValueError, KeyError, sqlite3.Error) as ex:
+            print(f"Erro ao inserir categorias de {arquivo_json}: {ex}")
+            return 0
 
     @classmethod
     def categoria_existe(cls, nome_categoria: str) -> bool:
@@ -54,6 +65,7 @@ class CategoriaRepo:
                 cursor.execute(SQL_INSERIR, (categoria.nome,))
                 if cursor.rowcount > 0:
                     categoria.id = cursor.lastrowid
+                    invalidar_catalogo()
                     return categoria
         except sqlite3.Error as ex:
             print(ex)
@@ -89,6 +101,8 @@ class CategoriaRepo:
             with obter_conexao() as conexao:
                 cursor = conexao.cursor()
                 cursor.execute(SQL_ALTERAR, (categoria.nome, categoria.ativo, categoria.id))
+                if cursor.rowcount > 0:
+                    invalidar_catalogo()
                 return cursor.rowcount > 0
         except sqlite3.Error as ex:
             print(ex)
@@ -100,6 +114,8 @@ class CategoriaRepo:
             with obter_conexao() as conexao:
                 cursor = conexao.cursor()
                 cursor.execute(SQL_DESATIVAR, (id,))
+                if cursor.rowcount > 0:
+                    invalidar_catalogo()
                 return cursor.rowcount > 0
         except sqlite3.Error as ex:
             print(ex)
@@ -125,7 +141,12 @@ class CategoriaRepo:
             with obter_conexao() as conexao:
                 cursor = conexao.cursor()
                 cursor.execute(SQL_REATIVAR, (id,))
+                if cursor.rowcount > 0:
+                    invalidar_catalogo()
                 return cursor.rowcount > 0
         except sqlite3.Error as ex:
             print(ex)
-            return False
\ No newline at end of file
+            return False
+
+
+CategoriaRepoAsync = RepoAssincrono(CategoriaRepo)
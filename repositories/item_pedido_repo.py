@@ -3,6 +3,7 @@ from typing import List, Optional
 from models.item_pedido_model import ItemPedido
 from sql.item_pedido_sql import *
 from util.database import obter_conexao
+from util.executor_banco import RepoAssincrono
 
 
 class ItemPedidoRepo:
@@ -168,3 +169,6 @@ class ItemPedidoRepo:
         except sqlite3.Error as ex:
             print(ex)
             return False
+
+
+ItemPedidoRepoAsync = RepoAssincrono(ItemPedidoRepo)
@@ -5,6 +5,7 @@ from models.pedido_model import EstadoPedido, Pedido
 from repositories.item_pedido_repo import ItemPedidoRepo
 from sql.pedido_sql import *
 from util.database import obter_conexao
+from util.executor_banco import RepoAssincrono
 
 
 class PedidoRepo:
@@ -220,4 +221,7 @@ class PedidoRepo:
                 return pedidos
         except sqlite3.Error as ex:
             print(ex)
-            return None
\ No newline at end of file
+            return None
+
+
+PedidoRepoAsync = RepoAssincrono(PedidoRepo)
@@ -0,0 +1,52 @@
+import json
+import sqlite3
+from typing import Dict, List, Optional, Set, Tuple
+from sql.produto_imagem_sql import *
+from util.catalogo import invalidar_catalogo
+from util.database import obter_conexao, transacao
+
+
+class ProdutoImagemRepo:
+    @classmethod
+    def definir(cls, id_produto: int, variantes: List[Tuple[int, str, str]]) -> bool:
+        # substitui as variantes registradas para o produto; as chaves
+        # antigas continuam no armazenamento (podem ser usadas por outro
+        # produto ou por páginas ainda em cache)
+        try:
+            with transacao() as conexao:
+                cursor = conexao.cursor()
+                cursor.execute(SQL_EXCLUIR_POR_PRODUTO, (id_produto,))
+                cursor.executemany(
+                    SQL_INSERIR,
+                    [(id_produto, tamanho, formato, chave) for tamanho, formato, chave in variantes],
+                )
+                invalidar_catalogo()
+                return True
+        except sqlite3.Error as ex:
+            print(ex)
+            return False
+
+    @classmethod
+    def obter_chaves_em_uso(cls, chaves: List[str]) -> Optional[Set[str]]:
+        try:
+            with obter_conexao() as conexao:
+                cursor = conexao.cursor()
+                tuplas = cursor.execute(SQL_OBTER_CHAVES_EM_USO, (json.dumps(chaves),)).fetchall()
+                return {tupla[0] for tupla in tuplas}
+        except sqlite3.Error as ex:
+            print(ex)
+            return None
+
+    @classmethod
+    def obter_todas(cls) -> Optional[Dict[int, Dict[Tuple[int, str], str]]]:
+        try:
+            with obter_conexao() as conexao:
+                cursor = conexao.cursor()
+                tuplas = cursor.execute(SQL_OBTER_TODAS).fetchall()
+                imagens = {}
+                for id_produto, tamanho, formato, chave in tuplas:
+                    imagens.setdefault(id_produto, {})[(tamanho, formato)] = chave
+                return imagens
+        except sqlite3.Error as ex:
+            print(ex)
+            return None
@@ -1,12 +1,48 @@
 import json
 import sqlite3
-from typing import List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from models.produto_model import Produto
 from sql.produto_sql import *
-from util.database import obter_conexao
-import shutil
+from util.busca import montar_consulta_fts
+from util.cache import CacheLRU
+from util.catalogo import atualizar_versao_catalogo, invalidar_catalogo
+from util.database import obter_conexao, transacao
+from util.executor_banco import RepoAssincrono
+from util.sementes import (
+    filtrar_nao_carregados,
+    ler_semente_alterada,
+    registrar_chaves_carregadas,
+    registrar_semente,
+)
+from util.transferencia_imagens import sincronizar_imagens
+import os
 from pathlib import Path
 
+_cache_totais_busca: Optional[CacheLRU] = None
+_cache_resultados_busca: Optional[CacheLRU] = None
+
+
+def _obter_cache_totais_busca() -> CacheLRU:
+    global _cache_totais_busca
+    if _cache_totais_busca is None:
+        _cache_totais_busca = CacheLRU(
+            tamanho_maximo=int(os.getenv("BUSCA_CACHE_TOTAIS_TAMANHO", "1000")),
+            validade=float(os.getenv("BUSCA_CACHE_TOTAIS_VALIDADE", "30")),
+            nome="totais_busca",
+        )
+    return _cache_totais_busca
+
+
+def _obter_cache_resultados_busca() -> CacheLRU:
+    global _cache_resultados_busca
+    if _cache_resultados_busca is None:
+        _cache_resultados_busca = CacheLRU(
+            tamanho_maximo=int(os.getenv("BUSCA_CACHE_TAMANHO", "500")),
+            validade=float(os.getenv("BUSCA_CACHE_VALIDADE", "300")),
+            nome="resultados_busca",
+        )
+    return _cache_resultados_busca
+
 
 class ProdutoRepo:
     @classmethod
@@ -16,20 +52,21 @@ class ProdutoRepo:
             cursor.execute(SQL_CRIAR_TABELA)
 
     @classmethod
-    async def inserir(cls, produto: Produto) -> Optional[Produto]:
-            try:
-                with obter_conexao() as conexao:
-                    cursor = conexao.cursor()
-                    cursor.execute(
-                        SQL_INSERIR,
-                        (produto.nome, produto.preco, produto.descricao, produto.estoque, produto.categoria_id),
-                    )
-                    if cursor.rowcount > 0:
-                        produto.id = cursor.lastrowid
-                        return produto
-            except sqlite3.Error as ex:
-                print(ex)
-                return None
+    def inserir(cls, produto: Produto) -> Optional[Produto]:
+        try:
+            with obter_conexao() as conexao:
+                cursor = conexao.cursor()
+                cursor.execute(
+                    SQL_INSERIR,
+                    (produto.nome, produto.preco, produto.descricao, produto.estoque, produto.categoria_id),
+                )
+                if cursor.rowcount > 0:
+                    produto.id = cursor.lastrowid
+                    invalidar_catalogo()
+                    return produto
+        except sqlite3.Error as ex:
+            print(ex)
+            return None
 
     @classmethod
     def obter_todos(cls) -> List[Produto]:
@@ -65,26 +102,29 @@ class ProdutoRepo:
                         produto.id,
                     ),
                 )
+                if cursor.rowcount > 0:
+                    invalidar_catalogo()
                 return cursor.rowcount > 0
         except sqlite3.Error as ex:
             print(ex)
             return False
 
+    @classmethod
     def obter_por_categoria(cls, categoria_id: int) -> List[Produto]:
-            try:
-                with obter_conexao() as conexao:
-                    cursor = conexao.cursor()
-                    tuplas = cursor.execute(SQL_OBTER_POR_CATEGORIA, (categoria_id,)).fetchall()
-                    produtos = []
-                    for tupla in tuplas:
-                        produto = Produto(*tupla)
-                        produto.categoria_nome = tupla[6]  
-                        produto.categoria_ativo = tupla[7]
-                        produtos.append(produto)
-                    return produtos
-            except sqlite3.Error as ex:
-                print(ex)
-                return None
+        try:
+            with obter_conexao() as conexao:
+                cursor = conexao.cursor()
+                tuplas = cursor.execute(SQL_OBTER_POR_CATEGORIA, (categoria_id,)).fetchall()
+                produtos = []
+                for tupla in tuplas:
+                    produto = Produto(*tupla)
+                    produto.categoria_nome = tupla[6]  
+                    produto.categoria_ativo = tupla[7]
+                    produtos.append(produto)
+                return produtos
+        except sqlite3.Error as ex:
+            print(ex)
+            return None
         
     @classmethod
     def excluir(cls, id: int) -> bool:
@@ -92,6 +132,8 @@ class ProdutoRepo:
             with obter_conexao() as conexao:
                 cursor = conexao.cursor()
                 cursor.execute(SQL_EXCLUIR, (id,))
+                if cursor.rowcount > 0:
+                    invalidar_catalogo()
                 return cursor.rowcount > 0
         except sqlite3.Error as ex:
             print(ex)
@@ -111,6 +153,26 @@ class ProdutoRepo:
             print(ex)
             return None
 
+    @classmethod
+    def nome_existe(cls, nome: str) -> bool:
+        try:
+            with obter_conexao() as conexao:
+                cursor = conexao.cursor()
+                return cursor.execute(SQL_EXISTE_NOME, (nome,)).fetchone() is not None
+        except sqlite3.Error as ex:
+            print(ex)
+            return False
+
+    @classmethod
+    def obter_ids(cls) -> Optional[Set[int]]:
+        try:
+            with obter_conexao() as conexao:
+                cursor = conexao.cursor()
+                return {tupla[0] for tupla in cursor.execute(SQL_OBTER_IDS).fetchall()}
+        except sqlite3.Error as ex:
+            print(ex)
+            return None
+
     @classmethod
     def obter_quantidade(cls) -> Optional[int]:
         try:
@@ -123,26 +185,57 @@ class ProdutoRepo:
             return None
 
     @classmethod
-    def obter_busca(
-        cls, termo: str, pagina: int, tamanho_pagina: int, ordem: int, categoria_id: Optional[int] = None
-    ) -> List[Produto]:
-        termo = "%" + termo + "%"
+    def _preparar_busca(
+        cls, termo: str, pagina: int, tamanho_pagina: int, ordem: int, categoria_id, cursor
+    ) -> tuple:
+        # com cursor (chave de ordenação e id do último produto da página
+        # anterior) a página é obtida por busca no índice, sem OFFSET
+        consulta_fts = montar_consulta_fts(termo)
         offset = (pagina - 1) * tamanho_pagina
         match (ordem):
             case 1:
-                SQL_OBTER_BUSCA_ORDENADA = SQL_OBTER_BUSCA.replace("#1", "p.nome")
+                ordenacao, continuacao = "p.nome, p.id", "AND (p.nome, p.id) > (?, ?)"
             case 2:
-                SQL_OBTER_BUSCA_ORDENADA = SQL_OBTER_BUSCA.replace("#1", "p.preco ASC")
+                ordenacao, continuacao = "p.preco ASC, p.id ASC", "AND (p.preco, p.id) > (?, ?)"
             case 3:
-                SQL_OBTER_BUSCA_ORDENADA = SQL_OBTER_BUSCA.replace("#1", "p.preco DESC")
+                ordenacao, continuacao = "p.preco DESC, p.id DESC", "AND (p.preco, p.id) < (?, ?)"
+            case 4 if consulta_fts:
+                # relevância calculada na subconsulta de SQL_OBTER_BUSCA*
+                ordenacao, continuacao = "f.relevancia, p.id", None
             case _:
-                SQL_OBTER_BUSCA_ORDENADA = SQL_OBTER_BUSCA.replace("#1", "p.nome")
+                ordenacao, continuacao = "p.nome, p.id", None
+        parametros_continuacao = ()
+        if cursor is not None and continuacao is not None:
+            parametros_continuacao = tuple(cursor)
+            offset = 0
+        else:
+            continuacao = ""
+        if consulta_fts:
+            parametros_filtro = (consulta_fts, categoria_id, categoria_id)
+        else:
+            parametros_filtro = (categoria_id, categoria_id)
+        return consulta_fts, ordenacao, continuacao, parametros_filtro, parametros_continuacao, offset
+
+    @classmethod
+    def obter_busca(
+        cls,
+        termo: str,
+        pagina: int,
+        tamanho_pagina: int,
+        ordem: int,
+        categoria_id: Optional[int] = None,
+        cursor: Optional[Tuple] = None,
+    ) -> List[Produto]:
+        consulta_fts, ordenacao, continuacao, parametros_filtro, parametros_continuacao, offset = (
+            cls._preparar_busca(termo, pagina, tamanho_pagina, ordem, categoria_id, cursor)
+        )
+        sql = SQL_OBTER_BUSCA if consulta_fts else SQL_OBTER_BUSCA_SEM_TERMO
         try:
             with obter_conexao() as conexao:
-                cursor = conexao.cursor()
-                tuplas = cursor.execute(
-                    SQL_OBTER_BUSCA_ORDENADA,
-                    (termo, termo, categoria_id, categoria_id, tamanho_pagina, offset)
+                cursor_banco = conexao.cursor()
+                tuplas = cursor_banco.execute(
+                    sql.replace("#1", ordenacao).replace("#2", continuacao),
+                    parametros_filtro + parametros_continuacao + (tamanho_pagina, offset),
                 ).fetchall()
                 produtos = [Produto(*t) for t in tuplas]
                 return produtos
@@ -150,31 +243,131 @@ class ProdutoRepo:
             print(ex)
             return None
 
+    @classmethod
+    def obter_busca_com_total(
+        cls,
+        termo: str,
+        pagina: int,
+        tamanho_pagina: int,
+        ordem: int,
+        categoria_id: Optional[int] = None,
+        cursor: Optional[Tuple] = None,
+    ) -> Tuple[Optional[List[Produto]], Optional[int]]:
+        # página e total em uma só consulta (COUNT(*) OVER ()); o resultado
+        # fica em cache, e o total também separadamente, para que as páginas
+        # seguintes da mesma busca não contem os produtos de novo
+        consulta_fts, ordenacao, continuacao, parametros_filtro, parametros_continuacao, offset = (
+            cls._preparar_busca(termo, pagina, tamanho_pagina, ordem, categoria_id, cursor)
+        )
+        # as chaves usam os valores já normalizados (termo sem acentos, ordem
+        # inválida tratada como nome etc.) e a versão do catálogo, que muda a
+        # cada escrita em produto ou categoria, relida aqui do banco
+        versao = atualizar_versao_catalogo()
+        chave_resultado = (
+            versao, consulta_fts, categoria_id, ordenacao, parametros_continuacao, offset, tamanho_pagina
+        )
+        resultado = _obter_cache_resultados_busca().obter(chave_resultado)
+        if resultado is not None:
+            produtos, total = resultado
+            return list(produtos), total
+        chave_total = (versao, consulta_fts, categoria_id)
+        total = _obter_cache_totais_busca().obter(chave_total)
+        try:
+            with obter_conexao() as conexao:
+                cursor_banco = conexao.cursor()
+                if total is not None or continuacao:
+                    # com cursor, a janela contaria apenas o que vem depois
+                    # dele e impediria a leitura parcial do índice
+                    sql = SQL_OBTER_BUSCA if consulta_fts else SQL_OBTER_BUSCA_SEM_TERMO
+                    tuplas = cursor_banco.execute(
+                        sql.replace("#1", ordenacao).replace("#2", continuacao),
+                        parametros_filtro + parametros_continuacao + (tamanho_pagina, offset),
+                    ).fetchall()
+                    produtos = [Produto(*t) for t in tuplas]
+                else:
+                    sql = SQL_OBTER_BUSCA_COM_TOTAL if consulta_fts else SQL_OBTER_BUSCA_SEM_TERMO_COM_TOTAL
+                    tuplas = cursor_banco.execute(
+                        sql.replace("#1", ordenacao),
+                        parametros_filtro + (tamanho_pagina, offset),
+                    ).fetchall()
+                    produtos = [Produto(*t[:6]) for t in tuplas]
+                    if tuplas:
+                        total = tuplas[0][6]
+                if total is None:
+                    # página além do fim (ou cursor sem total em cache)
+                    sql = SQL_OBTER_QUANTIDADE_BUSCA if consulta_fts else SQL_OBTER_QUANTIDADE_BUSCA_SEM_TERMO
+                    total = int(cursor_banco.execute(sql, parametros_filtro).fetchone()[0])
+                _obter_cache_totais_busca().definir(chave_total, total)
+                _obter_cache_resultados_busca().definir(chave_resultado, (tuple(produtos), total))
+                return produtos, total
+        except sqlite3.Error as ex:
+            print(ex)
+            return None, None
+
     @classmethod
     def obter_quantidade_busca(cls, termo: str, categoria_id: Optional[int] = None) -> Optional[int]:
-        termo = "%" + termo + "%"
+        consulta_fts = montar_consulta_fts(termo)
         try:
             with obter_conexao() as conexao:
                 cursor = conexao.cursor()
-                tupla = cursor.execute(
-                    SQL_OBTER_QUANTIDADE_BUSCA, (termo, termo, categoria_id, categoria_id)
-                ).fetchone()
+                if consulta_fts:
+                    tupla = cursor.execute(
+                        SQL_OBTER_QUANTIDADE_BUSCA, (consulta_fts, categoria_id, categoria_id)
+                    ).fetchone()
+                else:
+                    tupla = cursor.execute(
+                        SQL_OBTER_QUANTIDADE_BUSCA_SEM_TERMO, (categoria_id, categoria_id)
+                    ).fetchone()
                 return int(tupla[0])
         except sqlite3.Error as ex:
             print(ex)
             return None
 
     @classmethod
-    def inserir_produtos_json(cls, arquivo_json: str):
-        if ProdutoRepo.obter_quantidade() == 0:
-            with open(arquivo_json, "r", encoding="utf-8") as arquivo:
+    def inserir_produtos_json(cls, arquivo_json: str) -> int:
+        # produtos com o mesmo nome de um já existente são ignorados
+        try:
+            with transacao() as conexao:
+                semente = ler_semente_alterada(arquivo_json)
+                if semente is None:
+                    return 0
+                produtos, hash_conteudo = semente
+                cursor = conexao.cursor()
+                cursor.executemany(
+                    SQL_INSERIR_SEMENTE,
+                    [
+                        (p["nome"], p["preco"], p["descricao"], p["estoque"], p["categoria_id"])
+                        for p in filtrar_nao_carregados("produto", produtos, "nome")
+                    ],
+                )
+                inseridos = cursor.rowcount
+                if inseridos > 0:
+                    invalidar_catalogo()
+                registrar_chaves_carregadas("produto", [p["nome"] for p in produtos])
+                registrar_semente(arquivo_json, hash_conteudo)
+        except (OSError, ValueError, KeyError, sqlite3.Error) as ex:
+            print(f"Erro ao inserir produtos de {arquivo_json}: {ex}")
+            return 0
+        return inseridos
+
+    @classmethod
+    def obter_ids_semente(cls, arquivo_json: str) -> Optional[Dict[int, int]]:
+        # {id no arquivo de carga: id no banco}, associados pelo nome; as
+        # imagens da carga são nomeadas pelo id do arquivo (0001.jpg)
+        try:
+            with open(arquivo_json, encoding="utf-8") as arquivo:
                 produtos = json.load(arquivo)
-                for produto in produtos:
-                    ProdutoRepo.inserir(Produto(**produto))
-            cls.transferir_imagens("static/img/produtos/inserir", "static/img/produtos")
+            with obter_conexao() as conexao:
+                cursor = conexao.cursor()
+                nomes = [p["nome"] for p in produtos]
+                ids = dict(cursor.execute(SQL_OBTER_IDS_POR_NOME, (json.dumps(nomes),)).fetchall())
+            return {p["id"]: ids[p["nome"]] for p in produtos if p["nome"] in ids}
+        except (OSError, ValueError, KeyError, sqlite3.Error) as ex:
+            print(f"Erro ao obter os produtos de {arquivo_json}: {ex}")
+            return None
 
     @classmethod
-    def transferir_imagens(cls, pasta_origem, pasta_destino):
+    def transferir_imagens(cls, pasta_origem, pasta_destino, ids_produtos=None):
         path_origem = Path(pasta_origem)
         path_destino = Path(pasta_destino)
         if not path_origem.exists() or not path_origem.is_dir():
@@ -183,7 +376,8 @@ class ProdutoRepo:
         if not path_destino.exists() or not path_destino.is_dir():
             print(f"Pasta de destino {pasta_destino} não existe ou não é um diretório.")
             return
-        for arquivo_imagem in path_origem.glob("*"):
-            if arquivo_imagem.is_file():
-                path_arquivo_destino = path_destino / arquivo_imagem.name
-                shutil.copy2(arquivo_imagem, path_arquivo_destino)
+        # incremental: só o que mudou desde a última carga é transferido
+        return sincronizar_imagens(str(path_origem), str(path_destino), ids_produtos=ids_produtos)
+
+
+ProdutoRepoAsync = RepoAssincrono(ProdutoRepo)
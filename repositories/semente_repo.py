@@ -0,0 +1,50 @@
+import sqlite3
+from datetime import datetime
+from typing import List, Optional, Set
+from sql.semente_sql import *
+from util.database import obter_conexao
+
+
+class SementeRepo:
+    @classmethod
+    def obter_hash(cls, arquivo: str) -> Optional[str]:
+        try:
+            with obter_conexao() as conexao:
+                cursor = conexao.cursor()
+                tupla = cursor.execute(SQL_OBTER_HASH, (arquivo,)).fetchone()
+                return tupla[0] if tupla else None
+        except sqlite3.Error as ex:
+            print(ex)
+            return None
+
+    @classmethod
+    def registrar_hash(cls, arquivo: str, hash_conteudo: str) -> bool:
+        try:
+            with obter_conexao() as conexao:
+                cursor = conexao.cursor()
+                cursor.execute(SQL_REGISTRAR_HASH, (arquivo, hash_conteudo, datetime.now()))
+                return cursor.rowcount > 0
+        except sqlite3.Error as ex:
+            print(ex)
+            return False
+
+    @classmethod
+    def obter_chaves(cls, tabela: str) -> Optional[Set[str]]:
+        try:
+            with obter_conexao() as conexao:
+                cursor = conexao.cursor()
+                return {tupla[0] for tupla in cursor.execute(SQL_OBTER_CHAVES, (tabela,)).fetchall()}
+        except sqlite3.Error as ex:
+            print(ex)
+            return None
+
+    @classmethod
+    def registrar_chaves(cls, tabela: str, chaves: List[str]) -> bool:
+        try:
+            with obter_conexao() as conexao:
+                cursor = conexao.cursor()
+                cursor.executemany(SQL_REGISTRAR_CHAVE, [(tabela, chave) for chave in chaves])
+                return True
+        except sqlite3.Error as ex:
+            print(ex)
+            return False
@@ -1,9 +1,15 @@
-import json
 import sqlite3
 from typing import List, Optional
 from models.usuario_model import Usuario
 from sql.usuario_sql import *
-from util.database import obter_conexao
+from util.database import obter_conexao, transacao
+from util.executor_banco import RepoAssincrono
+from util.sementes import (
+    filtrar_nao_carregados,
+    ler_semente_alterada,
+    registrar_chaves_carregadas,
+    registrar_semente,
+)
 
 
 class UsuarioRepo:
@@ -120,12 +126,38 @@ class UsuarioRepo:
             return None
 
     @classmethod
-    def inserir_usuarios_json(cls, arquivo_json: str):
-        if UsuarioRepo.obter_quantidade_por_perfil() == 0:
-            with open(arquivo_json, "r", encoding="utf-8") as arquivo:
-                usuarios = json.load(arquivo)
-                for usuario in usuarios:
-                    UsuarioRepo.inserir(Usuario(**usuario))
+    def inserir_usuarios_json(cls, arquivo_json: str) -> int:
+        # cpf, telefone e email são UNIQUE: usuários já cadastrados são ignorados
+        try:
+            with transacao() as conexao:
+                semente = ler_semente_alterada(arquivo_json)
+                if semente is None:
+                    return 0
+                usuarios, hash_conteudo = semente
+                cursor = conexao.cursor()
+                cursor.executemany(
+                    SQL_INSERIR_SEMENTE,
+                    [
+                        (
+                            u["nome"],
+                            u["cpf"],
+                            u["data_nascimento"],
+                            u["endereco"],
+                            u["telefone"],
+                            u["email"],
+                            u["perfil"],
+                            u["senha"],
+                        )
+                        for u in filtrar_nao_carregados("usuario", usuarios, "email")
+                    ],
+                )
+                inseridos = cursor.rowcount
+                registrar_chaves_carregadas("usuario", [u["email"] for u in usuarios])
+                registrar_semente(arquivo_json, hash_conteudo)
+                return inseridos
+        except (OSError, ValueError, KeyError, sqlite3.Error) as ex:
+            print(f"Erro ao inserir usuários de {arquivo_json}: {ex}")
+            return 0
 
     @classmethod
     def obter_busca(cls, termo: str, pagina: int, tamanho_pagina: int) -> List[Usuario]:
@@ -208,3 +240,6 @@ class UsuarioRepo:
         except sqlite3.Error as ex:
             print(ex)
             return False
+
+
+UsuarioRepoAsync = RepoAssincrono(UsuarioRepo)
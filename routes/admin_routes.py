@@ -1,9 +1,11 @@
 import asyncio
-from io import BytesIO
+import logging
+import os
+import sqlite3
 from typing import List, Optional
-from fastapi import APIRouter, File, Form, Path, UploadFile
+from fastapi import APIRouter, File, Form, Path, Request, UploadFile
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
-from PIL import Image
 
 from dtos.alterar_pedido_dto import AlterarPedidoDto
 from dtos.alterar_produto_dto import AlterarProdutoDto
@@ -13,24 +15,80 @@ from models.categoria_model import Categoria
 from models.pedido_model import EstadoPedido
 from models.produto_model import Produto
 from models.usuario_model import Usuario
-from repositories.categoria_repo import CategoriaRepo
-from repositories.item_pedido_repo import ItemPedidoRepo
-from repositories.pedido_repo import PedidoRepo
-from repositories.produto_repo import ProdutoRepo
-from repositories.usuario_repo import UsuarioRepo
-from util.images import transformar_em_quadrada
+from repositories.categoria_repo import CategoriaRepoAsync
+from repositories.item_pedido_repo import ItemPedidoRepoAsync
+from repositories.pedido_repo import PedidoRepoAsync
+from repositories.produto_imagem_repo import ProdutoImagemRepo
+from repositories.produto_repo import ProdutoRepo, ProdutoRepoAsync
+from repositories.usuario_repo import UsuarioRepoAsync
+from util.cache import obter_estatisticas_caches
+from util.cache_catalogo import obter_estatisticas_cache_catalogo
+from util.cache_http import (
+    calcular_etag,
+    definir_cabecalhos_cache,
+    nao_modificado,
+    resposta_nao_modificada,
+)
+from util.catalogo import obter_versao_catalogo
+from util.database import obter_configuracao_banco, obter_estatisticas_pool, transacao
+from util.executor_banco import executar_no_banco, obter_estatisticas_executor
+from util.executor_imagens import obter_estatisticas_imagens, processar_imagem
+from util.armazenamento_imagens import obter_armazenamento_imagens
+from util.images import ImagemInvalidaError, armazenar_imagem_produto, guardar_imagem_original
+from util.instrumentacao_sql import limpar_estatisticas_sql, obter_estatisticas_sql
+from util.uploads import (
+    UploadInvalidoError,
+    UploadMuitoGrandeError,
+    obter_tamanho_maximo_upload,
+    resposta_upload_muito_grande,
+    salvar_upload_imagem_temporario,
+)
 
 SLEEP_TIME = 0.2
 router = APIRouter(prefix="/admin")
+logger = logging.getLogger(__name__)
 
 @router.get("/obter_produtos")
 async def obter_produtos():
     await asyncio.sleep(SLEEP_TIME)
-    produtos = ProdutoRepo.obter_todos()
+    produtos = await ProdutoRepoAsync.obter_todos()
     for produto in produtos:
         print(f"Produto: {produto.nome}, Categoria ID: {produto.categoria_id}, Categoria: {produto.categoria_nome}, Categoria Ativo: {produto.categoria_ativo}")
     return produtos
 
+def _resposta_imagem_invalida():
+    pd = {
+        "title": "imagem",
+        "detail": "O arquivo enviado não é uma imagem válida.",
+        "type": "invalid_file",
+        "path": ["body", "imagem"],
+    }
+    return JSONResponse(pd, status_code=422)
+
+
+def _inserir_produto_com_imagens(produto: Produto, variantes) -> Optional[Produto]:
+    # produto e variantes na mesma transação: se o registro das imagens
+    # falhar, o produto não fica inserido sem elas
+    with transacao():
+        novo_produto = ProdutoRepo.inserir(produto)
+        if novo_produto and variantes and not ProdutoImagemRepo.definir(novo_produto.id, variantes):
+            raise sqlite3.Error("não foi possível registrar as imagens do produto")
+        return novo_produto
+
+
+def _remover_variantes_sem_uso(variantes):
+    # após uma inserção com falha; como o armazenamento é por conteúdo, uma
+    # chave também usada por outro produto (imagem idêntica) é mantida
+    chaves = sorted({chave for _, _, chave in variantes})
+    em_uso = ProdutoImagemRepo.obter_chaves_em_uso(chaves)
+    if em_uso is None:
+        return
+    armazenamento = obter_armazenamento_imagens()
+    for chave in chaves:
+        if chave not in em_uso:
+            armazenamento.remover(chave)
+
+
 @router.post("/inserir_produto", status_code=201)
 async def inserir_produto(
     nome: str = Form(...),
@@ -48,29 +106,67 @@ async def inserir_produto(
         categoria_id=categoria_id 
     )
 
+    # nome é único entre os produtos
+    if await ProdutoRepoAsync.nome_existe(produto_dto.nome):
+        pd = ProblemDetailsDto(
+            "produto",
+            f"O produto com o nome <b>{produto_dto.nome}</b> já existe.",
+            "product_exists",
+            ["body", "nome"],
+        )
+        return JSONResponse(pd.to_dict(), status_code=400)
+
+    caminho_temporario = None
+    variantes = None
     if imagem:
-        conteudo_arquivo = await imagem.read()
-        imagem_obj = Image.open(BytesIO(conteudo_arquivo))
-        if not imagem_obj:
-            pd = {
-                "title": "imagem",
-                "detail": "O arquivo enviado não é uma imagem válida.",
-                "type": "invalid_file",
-                "path": ["body", "imagem"],
-            }
-            return JSONResponse(pd, status_code=422)
-
-        # Salvando a imagem
-        imagem_quadrada = transformar_em_quadrada(imagem_obj)
-        imagem_quadrada.save(f"static/img/produtos/{produto_dto.categoria_id:04d}.jpg", "JPEG")
-
-    # Inserindo o produto no banco de dados
-    await asyncio.sleep(SLEEP_TIME)  # Simulando atraso
-    novo_produto = Produto(
-        None, produto_dto.nome, produto_dto.preco, produto_dto.descricao, produto_dto.estoque,
-        produto_dto.categoria_id
-    )
-    novo_produto = await ProdutoRepo.inserir(novo_produto)
+        try:
+            # o upload é copiado em blocos, com limite de tamanho e
+            # conferência do formato pelo cabeçalho, antes de decodificar
+            caminho_temporario = await salvar_upload_imagem_temporario(imagem)
+        except UploadMuitoGrandeError:
+            return resposta_upload_muito_grande(obter_tamanho_maximo_upload())
+        except UploadInvalidoError:
+            return _resposta_imagem_invalida()
+
+    try:
+        if caminho_temporario:
+            try:
+                # Salvando a imagem (todas as variantes de tamanho e formato)
+                # em um processo separado, sem bloquear o event loop; os nomes
+                # vêm do conteúdo e não dependem do id do produto; falhas do
+                # armazenamento e do executor (503/504) seguem como erro 5xx
+                variantes = await processar_imagem(armazenar_imagem_produto, caminho_temporario)
+            except ImagemInvalidaError:
+                return _resposta_imagem_invalida()
+
+        # Inserindo o produto no banco de dados
+        await asyncio.sleep(SLEEP_TIME)  # Simulando atraso
+        novo_produto = Produto(
+            None, produto_dto.nome, produto_dto.preco, produto_dto.descricao, produto_dto.estoque,
+            produto_dto.categoria_id
+        )
+        try:
+            # Inserindo o produto e associando as imagens a ele
+            novo_produto = await executar_no_banco(_inserir_produto_com_imagens, novo_produto, variantes)
+        except sqlite3.Error:
+            novo_produto = None
+
+        if not novo_produto and variantes:
+            # Removendo as variantes já gravadas para o produto não inserido
+            try:
+                await executar_no_banco(_remover_variantes_sem_uso, variantes)
+            except Exception as ex:
+                logger.warning("Não foi possível remover as variantes não utilizadas: %s", ex)
+        elif novo_produto and variantes:
+            # Guardando a original; o produto já foi inserido, então uma
+            # falha aqui não deve virar erro (o cliente repetiria a inserção)
+            try:
+                await processar_imagem(guardar_imagem_original, caminho_temporario, f"{novo_produto.id:04d}")
+            except Exception as ex:
+                logger.warning("Não foi possível guardar a original do produto %d: %s", novo_produto.id, ex)
+    finally:
+        if caminho_temporario:
+            os.remove(caminho_temporario)
 
     if novo_produto:
         return novo_produto
@@ -86,7 +182,7 @@ async def inserir_produto(
 @router.post("/excluir_produto", status_code=204)
 async def excluir_produto(id_produto: int = Form(..., title="Id do Produto", ge=1)):
     await asyncio.sleep(SLEEP_TIME)
-    if ProdutoRepo.excluir(id_produto):
+    if await ProdutoRepoAsync.excluir(id_produto):
         return None
     pd = ProblemDetailsDto(
         "int",
@@ -98,11 +194,14 @@ async def excluir_produto(id_produto: int = Form(..., title="Id do Produto", ge=
 
 
 @router.get("/obter_produto/{id_produto}")
-async def obter_produto(id_produto: int = Path(..., title="Id do Produto", ge=1)):
+async def obter_produto(request: Request, id_produto: int = Path(..., title="Id do Produto", ge=1)):
     await asyncio.sleep(SLEEP_TIME)
-    produto = ProdutoRepo.obter_um(id_produto)
+    produto = await ProdutoRepoAsync.obter_um(id_produto)
     if produto:
-        return produto
+        etag = calcular_etag(produto)
+        if nao_modificado(request, etag):
+            return resposta_nao_modificada(etag)
+        return definir_cabecalhos_cache(JSONResponse(jsonable_encoder(produto)), etag)
     pd = ProblemDetailsDto(
         "int",
         f"O produto com id <b>{id_produto}</b> não foi encontrado.",
@@ -118,7 +217,7 @@ async def alterar_produto(inputDto: AlterarProdutoDto):
     produto = Produto(
         inputDto.id, inputDto.nome, inputDto.preco, inputDto.descricao, inputDto.estoque
     )
-    if ProdutoRepo.alterar(produto):
+    if await ProdutoRepoAsync.alterar(produto):
         return None
     pd = ProblemDetailsDto(
         "int",
@@ -132,7 +231,7 @@ async def alterar_produto(inputDto: AlterarProdutoDto):
 @router.post("/alterar_pedido", status_code=204)
 async def alterar_pedido(inputDto: AlterarPedidoDto):
     await asyncio.sleep(SLEEP_TIME)
-    if PedidoRepo.alterar_estado(inputDto.id, inputDto.estado.value):
+    if await PedidoRepoAsync.alterar_estado(inputDto.id, inputDto.estado.value):
         return None
     pd = ProblemDetailsDto(
         "int",
@@ -146,7 +245,7 @@ async def alterar_pedido(inputDto: AlterarPedidoDto):
 @router.post("/cancelar_pedido", status_code=204)
 async def cancelar_pedido(id_pedido: int = Form(..., title="Id do Pedido", ge=1)):
     await asyncio.sleep(SLEEP_TIME)
-    if PedidoRepo.alterar_estado(id_pedido, EstadoPedido.CANCELADO.value):
+    if await PedidoRepoAsync.alterar_estado(id_pedido, EstadoPedido.CANCELADO.value):
         return None
     pd = ProblemDetailsDto(
         "int",
@@ -160,7 +259,7 @@ async def cancelar_pedido(id_pedido: int = Form(..., title="Id do Pedido", ge=1)
 @router.post("/evoluir_pedido", status_code=204)
 async def evoluir_pedido(id_pedido: int = Form(..., title="Id do Pedido", ge=1)):
     await asyncio.sleep(SLEEP_TIME)
-    pedido = PedidoRepo.obter_por_id(id_pedido)
+    pedido = await PedidoRepoAsync.obter_por_id(id_pedido)
     if not pedido:
         pd = ProblemDetailsDto(
             "int",
@@ -175,7 +274,7 @@ async def evoluir_pedido(id_pedido: int = Form(..., title="Id do Pedido", ge=1))
     indice += 1
     if indice < len(estados):
         novo_estado = estados[indice]
-        if PedidoRepo.alterar_estado(id_pedido, novo_estado):
+        if await PedidoRepoAsync.alterar_estado(id_pedido, novo_estado):
             return None
     pd = ProblemDetailsDto(
         "int",
@@ -190,10 +289,10 @@ async def evoluir_pedido(id_pedido: int = Form(..., title="Id do Pedido", ge=1))
 async def obter_pedido(id_pedido: int = Path(..., title="Id do Pedido", ge=1)):
     # TODO: refatorar criando Dto com resultado específico
     await asyncio.sleep(SLEEP_TIME)
-    pedido = PedidoRepo.obter_por_id(id_pedido)
+    pedido = await PedidoRepoAsync.obter_por_id(id_pedido)
     if pedido:
-        itens = ItemPedidoRepo.obter_por_pedido(pedido.id)
-        cliente = UsuarioRepo.obter_por_id(pedido.id_cliente)
+        itens = await ItemPedidoRepoAsync.obter_por_pedido(pedido.id)
+        cliente = await UsuarioRepoAsync.obter_por_id(pedido.id_cliente)
         pedido.itens = itens
         pedido.cliente = cliente
         return pedido
@@ -211,21 +310,21 @@ async def obter_pedidos_por_estado(
     estado: EstadoPedido = Path(..., title="Estado do Pedido")
 ):
     await asyncio.sleep(SLEEP_TIME)
-    pedidos = PedidoRepo.obter_todos_por_estado(estado.value)
+    pedidos = await PedidoRepoAsync.obter_todos_por_estado(estado.value)
     return pedidos
 
 
 @router.get("/obter_usuarios")
 async def obter_usuarios() -> List[Usuario]:
     await asyncio.sleep(SLEEP_TIME)
-    usuarios = UsuarioRepo.obter_todos()
+    usuarios = await UsuarioRepoAsync.obter_todos()
     return usuarios
 
 
 @router.post("/excluir_usuario", status_code=204)
 async def excluir_usuario(id_usuario: int = Form(...)):
     await asyncio.sleep(SLEEP_TIME)
-    if UsuarioRepo.excluir(id_usuario):
+    if await UsuarioRepoAsync.excluir(id_usuario):
         return None
     pd = ProblemDetailsDto(
         "int",
@@ -235,19 +334,56 @@ async def excluir_usuario(id_usuario: int = Form(...)):
     )
     return JSONResponse(pd.to_dict(), status_code=404)
 
+@router.get("/obter_estatisticas_pool")
+async def obter_estatisticas_banco():
+    return obter_estatisticas_pool()
+
+@router.get("/obter_estatisticas_executor")
+async def obter_estatisticas_executor_banco():
+    return obter_estatisticas_executor()
+
+@router.get("/obter_configuracao_banco")
+async def obter_configuracao_sqlite():
+    return await executar_no_banco(obter_configuracao_banco)
+
+@router.get("/obter_estatisticas_sql")
+async def obter_estatisticas_consultas():
+    return {"pid": os.getpid(), "consultas": obter_estatisticas_sql()}
+
+@router.post("/limpar_estatisticas_sql", status_code=204)
+async def limpar_estatisticas_consultas():
+    limpar_estatisticas_sql()
+    return None
+
+@router.get("/obter_estatisticas_cache")
+async def obter_estatisticas_cache():
+    return {
+        "pid": os.getpid(),
+        "versao_catalogo": obter_versao_catalogo(),
+        "caches": obter_estatisticas_caches(),
+        "catalogo": obter_estatisticas_cache_catalogo(),
+    }
+
+@router.get("/obter_estatisticas_imagens")
+async def obter_estatisticas_processamento_imagens():
+    return {"pid": os.getpid(), **obter_estatisticas_imagens()}
+
 @router.get("/listar_categorias")
-async def listar_categorias():
-    categorias = CategoriaRepo.obter_todos()
-    return categorias
+async def listar_categorias(request: Request):
+    categorias = await CategoriaRepoAsync.obter_todos()
+    etag = calcular_etag(categorias)
+    if nao_modificado(request, etag):
+        return resposta_nao_modificada(etag)
+    return definir_cabecalhos_cache(JSONResponse(jsonable_encoder(categorias)), etag)
 
 @router.get("/listar_categorias_ativas")
 async def listar_categorias_ativas():
-    categorias = CategoriaRepo.obter_todos_ativos()
+    categorias = await CategoriaRepoAsync.obter_todos_ativos()
     return categorias
 
 @router.get("/listar_categoria/{categoria_id}")
 async def listar_categoria(categoria_id: int):
-    categoria = CategoriaRepo.obter_um(categoria_id)
+    categoria = await CategoriaRepoAsync.obter_um(categoria_id)
     if not categoria:
         pd = ProblemDetailsDto(
             "int",
@@ -260,7 +396,8 @@ async def listar_categoria(categoria_id: int):
 
 @router.post("/inserir_categoria", status_code=201)
 async def inserir_categoria(nome: str = Form(..., title="Nome da Categoria")):
-    categorias_existentes = {categoria.nome for categoria in CategoriaRepo.obter_todos()}
+    categorias = await CategoriaRepoAsync.obter_todos()
+    categorias_existentes = {categoria.nome for categoria in categorias}
     
     if nome in categorias_existentes:
         pd = ProblemDetailsDto(
@@ -272,7 +409,7 @@ async def inserir_categoria(nome: str = Form(..., title="Nome da Categoria")):
         return JSONResponse(pd.to_dict(), status_code=400)
     
     nova_categoria = Categoria(nome=nome)
-    categoria_criada = CategoriaRepo.inserir(nova_categoria)
+    categoria_criada = await CategoriaRepoAsync.inserir(nova_categoria)
 
     if categoria_criada:
         return categoria_criada
@@ -291,7 +428,7 @@ async def alterar_categoria(
     nome: str = Form(..., title="Novo Nome da Categoria"),
     ativo: int = Form(..., title="Status da Categoria") 
 ):
-    categoria = CategoriaRepo.obter_um(categoria_id)
+    categoria = await CategoriaRepoAsync.obter_um(categoria_id)
     if not categoria:
         pd = ProblemDetailsDto(
             "int",
@@ -301,7 +438,8 @@ async def alterar_categoria(
         )
         return JSONResponse(pd.to_dict(), status_code=404)
     
-    categorias_existentes = {categoria.nome for categoria in CategoriaRepo.obter_todos()}
+    categorias = await CategoriaRepoAsync.obter_todos()
+    categorias_existentes = {categoria.nome for categoria in categorias}
     if nome in categorias_existentes and nome != categoria.nome:
         pd = ProblemDetailsDto(
             "categoria",
@@ -314,7 +452,7 @@ async def alterar_categoria(
     categoria.nome = nome
     categoria.ativo = ativo  # Atualiza o status da categoria
     
-    categoria_alterada = CategoriaRepo.alterar(categoria)
+    categoria_alterada = await CategoriaRepoAsync.alterar(categoria)
     
     if categoria_alterada:
         return None
@@ -329,7 +467,7 @@ async def alterar_categoria(
 
 @router.post("/excluir_categoria", status_code=204)
 async def excluir_categoria(categoria_id: int = Form(..., title="Id da Categoria", ge=1)):
-    categoria = CategoriaRepo.obter_um(categoria_id)
+    categoria = await CategoriaRepoAsync.obter_um(categoria_id)
     if not categoria:
         pd = ProblemDetailsDto(
             "int",
@@ -340,7 +478,7 @@ async def excluir_categoria(categoria_id: int = Form(..., title="Id da Categoria
         return JSONResponse(pd.to_dict(), status_code=404)
     
     categoria.ativo = 0 
-    categoria_alterada = CategoriaRepo.alterar(categoria)
+    categoria_alterada = await CategoriaRepoAsync.alterar(categoria)
     
     if categoria_alterada:
         return None
@@ -355,7 +493,7 @@ async def excluir_categoria(categoria_id: int = Form(..., title="Id da Categoria
 
 # @router.post("/reativar_categoria", status_code=204)
 # async def reativar_categoria(categoria_id: int = Form(..., title="Id da Categoria", ge=1)):
-#     categoria = CategoriaRepo.obter_um(categoria_id)
+#     categoria = await CategoriaRepoAsync.obter_um(categoria_id)
 #     if not categoria:
 #         pd = ProblemDetailsDto(
 #             "int",
@@ -365,7 +503,7 @@ async def excluir_categoria(categoria_id: int = Form(..., title="Id da Categoria
 #         )
 #         return JSONResponse(pd.to_dict(), status_code=404)
     
-#     if CategoriaRepo.reativar(categoria_id):
+#     if await CategoriaRepoAsync.reativar(categoria_id):
 #         return None
 
 #     pd = ProblemDetailsDto(
@@ -3,7 +3,7 @@ from fastapi.responses import JSONResponse
 
 from dtos.entrar_dto import EntrarDto
 from dtos.problem_details_dto import ProblemDetailsDto
-from repositories.usuario_repo import UsuarioRepo
+from repositories.usuario_repo import UsuarioRepoAsync
 from util.auth_jwt import conferir_senha, criar_token
 
 
@@ -12,7 +12,7 @@ router = APIRouter(prefix="/auth")
 
 @router.post("/entrar", status_code=200)
 async def entrar(entrar_dto: EntrarDto):
-    usuario = UsuarioRepo.obter_por_email(entrar_dto.email)
+    usuario = await UsuarioRepoAsync.obter_por_email(entrar_dto.email)
     if ((not usuario)
         or (not usuario.senha)
         or (not conferir_senha(entrar_dto.senha, usuario.senha))):
@@ -1,4 +1,6 @@
 from datetime import datetime, timedelta
+import sqlite3
+from typing import Optional, Tuple
 from fastapi import APIRouter, Form, HTTPException, Path, Query, Request, status
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 import mercadopago as mp
@@ -9,17 +11,21 @@ from dtos.alterar_senha_dto import AlterarSenhaDTO
 from models.usuario_model import Usuario
 from models.item_pedido_model import ItemPedido
 from models.pedido_model import EstadoPedido, Pedido
-from repositories.usuario_repo import UsuarioRepo
-from repositories.item_pedido_repo import ItemPedidoRepo
-from repositories.pedido_repo import PedidoRepo
+from models.produto_model import Produto
+from repositories.usuario_repo import UsuarioRepo, UsuarioRepoAsync
+from repositories.item_pedido_repo import ItemPedidoRepo, ItemPedidoRepoAsync
+from repositories.pedido_repo import PedidoRepo, PedidoRepoAsync
 from repositories.produto_repo import ProdutoRepo
 from util.auth_cookie import conferir_senha, obter_hash_senha
+from util.cache_catalogo import obter_snapshot_catalogo_async
 from util.cookies import (
     adicionar_mensagem_alerta,
     adicionar_mensagem_erro,
     adicionar_mensagem_sucesso,
     excluir_cookie_auth,
 )
+from util.database import transacao
+from util.executor_banco import executar_no_banco
 from util.templates import obter_jinja_templates
 
 router = APIRouter(prefix="/cliente", include_in_schema=False)
@@ -37,7 +43,7 @@ async def get_pedidos(request: Request, periodo: str = Query("todos")):
             data_inicial = data_final - timedelta(days=60)
         case "90":
             data_inicial = data_final - timedelta(days=90)
-    pedidos = PedidoRepo.obter_por_periodo(request.state.usuario.id, data_inicial, data_final)
+    pedidos = await PedidoRepoAsync.obter_por_periodo(request.state.usuario.id, data_inicial, data_final)
     return templates.TemplateResponse(
         "pages/pedidos.html",
         {"request": request, "pedidos": pedidos},
@@ -59,7 +65,7 @@ async def post_cadastro(request: Request, alterar_dto: AlterarUsuarioDTO):
     id = request.state.usuario.id
     cliente_data = alterar_dto.model_dump()
     response = JSONResponse({"redirect": {"url": "/cliente/cadastro"}})
-    if UsuarioRepo.alterar(Usuario(id, **cliente_data)):
+    if await UsuarioRepoAsync.alterar(Usuario(id, **cliente_data)):
         adicionar_mensagem_sucesso(response, "Cadastro alterado com sucesso!")
     else:
         adicionar_mensagem_erro(
@@ -79,13 +85,13 @@ async def get_senha(request: Request):
 @router.post("/post_senha", response_class=JSONResponse)
 async def post_senha(request: Request, alterar_dto: AlterarSenhaDTO):
     email = request.state.usuario.email
-    cliente_bd = UsuarioRepo.obter_por_email(email)
+    cliente_bd = await UsuarioRepoAsync.obter_por_email(email)
     nova_senha_hash = obter_hash_senha(alterar_dto.nova_senha)
     response = JSONResponse({"redirect": {"url": "/cliente/senha"}})
     if not conferir_senha(alterar_dto.senha, cliente_bd.senha):
         adicionar_mensagem_erro(response, "Senha atual incorreta!")
         return response
-    if UsuarioRepo.alterar_senha(cliente_bd.id, nova_senha_hash):
+    if await UsuarioRepoAsync.alterar_senha(cliente_bd.id, nova_senha_hash):
         adicionar_mensagem_sucesso(response, "Senha alterada com sucesso!")
     else:
         adicionar_mensagem_erro(response, "Não foi possível alterar sua senha!")
@@ -95,7 +101,7 @@ async def post_senha(request: Request, alterar_dto: AlterarSenhaDTO):
 @router.get("/sair", response_class=RedirectResponse)
 async def get_sair(request: Request):
     if request.state.usuario:
-        UsuarioRepo.alterar_token(request.state.usuario.email, "")
+        await UsuarioRepoAsync.alterar_token(request.state.usuario.email, "")
     response = RedirectResponse("/", status.HTTP_303_SEE_OTHER)
     excluir_cookie_auth(response)
     adicionar_mensagem_sucesso(response, "Saída realizada com sucesso!")
@@ -104,12 +110,12 @@ async def get_sair(request: Request):
 
 @router.get("/carrinho")
 async def get_carrinho(request: Request):
-    pedidos = PedidoRepo.obter_por_estado(
+    pedidos = await PedidoRepoAsync.obter_por_estado(
         request.state.usuario.id, EstadoPedido.CARRINHO.value
     )
     pedido_carrinho = pedidos[0] if pedidos else None
     if pedido_carrinho:
-        itens_pedido = ItemPedidoRepo.obter_por_pedido(pedido_carrinho.id)
+        itens_pedido = await ItemPedidoRepoAsync.obter_por_pedido(pedido_carrinho.id)
     if not pedido_carrinho or not itens_pedido:
         response = RedirectResponse("/", status.HTTP_303_SEE_OTHER)
         adicionar_mensagem_alerta(
@@ -118,36 +124,81 @@ async def get_carrinho(request: Request):
         )
         return response
     total_pedido = sum([item.valor_item for item in itens_pedido])
+    # as imagens vêm do retrato do catálogo, obtido fora do event loop
+    catalogo = await obter_snapshot_catalogo_async()
     return templates.TemplateResponse(
         "pages/carrinho.html",
-        {"request": request, "itens": itens_pedido, "valor_total": total_pedido},
+        {"request": request, "itens": itens_pedido, "valor_total": total_pedido, "catalogo": catalogo},
     )
 
 
+def _obter_carrinho(id_cliente: int) -> Optional[Pedido]:
+    pedidos = PedidoRepo.obter_por_estado(id_cliente, EstadoPedido.CARRINHO.value)
+    return pedidos[0] if pedidos else None
+
+
+def _fechar_carrinho(id_cliente: int) -> Optional[int]:
+    with transacao():
+        pedido_carrinho = _obter_carrinho(id_cliente)
+        if not pedido_carrinho:
+            return None
+        itens_pedido = ItemPedidoRepo.obter_por_pedido(pedido_carrinho.id)
+        if not itens_pedido:
+            return None
+        valor_total = sum([item.valor_produto * item.quantidade for item in itens_pedido])
+        usuario = UsuarioRepo.obter_por_id(id_cliente)
+        PedidoRepo.atualizar_para_fechar(
+            pedido_carrinho.id, usuario.endereco, valor_total
+        )
+        return pedido_carrinho.id
+
+
 @router.get("/confirmacaopedido")
 async def get_confirmacaopedido(request: Request):
-    pedidos = PedidoRepo.obter_por_estado(
-        request.state.usuario.id, EstadoPedido.CARRINHO.value
-    )
-    pedido_carrinho = pedidos[0] if pedidos else None
-    if not pedido_carrinho:
-        return RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
-    itens_pedido = ItemPedidoRepo.obter_por_pedido(pedido_carrinho.id)
-    if not itens_pedido:
+    try:
+        id_pedido = await executar_no_banco(_fechar_carrinho, request.state.usuario.id)
+    except sqlite3.Error:
+        response = RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
+        adicionar_mensagem_erro(response, "Não foi possível fechar o pedido. Tente novamente.")
+        return response
+    if not id_pedido:
         return RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
-    valor_total = sum([item.valor_produto * item.quantidade for item in itens_pedido])
-    usuario = UsuarioRepo.obter_por_id(request.state.usuario.id)
-    PedidoRepo.atualizar_para_fechar(
-        pedido_carrinho.id, usuario.endereco, valor_total
-    )
-    return RedirectResponse(f"/cliente/detalhespedido/{pedido_carrinho.id}")
+    return RedirectResponse(f"/cliente/detalhespedido/{id_pedido}")
+
+
+def _preparar_pagamento(id_cliente: int, id_pedido: int) -> Optional[Pedido]:
+    with transacao():
+        pedido = PedidoRepo.obter_por_id(id_pedido)
+        if not pedido or pedido.id_cliente != id_cliente:
+            return None
+        if pedido.estado not in [EstadoPedido.CARRINHO.value, EstadoPedido.PENDENTE.value]:
+            return pedido
+        # muda o estado do pedido para PENDENTE
+        PedidoRepo.alterar_estado(id_pedido, EstadoPedido.PENDENTE.value)
+        # captura os itens do pedido
+        itens = ItemPedidoRepo.obter_por_pedido(pedido.id)
+        pedido.itens = itens
+        pedido.valor_total = sum([item.valor_item for item in itens])
+        PedidoRepo.atualizar_para_fechar(pedido.id, pedido.endereco_entrega, pedido.valor_total)
+        return pedido
 
 
 @router.get("/pagamentopedido/{id_pedido:int}", response_class=HTMLResponse)
 async def get_pagamento(request: Request, id_pedido: int = Path(...)):
-    pedido = PedidoRepo.obter_por_id(id_pedido)
+    try:
+        pedido = await executar_no_banco(
+            _preparar_pagamento, request.state.usuario.id, id_pedido
+        )
+    except sqlite3.Error:
+        response = RedirectResponse(
+            url="/cliente/carrinho", status_code=status.HTTP_302_FOUND
+        )
+        adicionar_mensagem_erro(
+            response, "Não foi possível preparar o pagamento. Tente novamente."
+        )
+        return response
     # se o pedido não existe, ou não pertence ao cliente logado
-    if not pedido or (pedido and (pedido.id_cliente != request.state.usuario.id)):
+    if not pedido:
         response = RedirectResponse(
             url="/cliente/pedidos", status_code=status.HTTP_302_FOUND
         )
@@ -164,13 +215,7 @@ async def get_pagamento(request: Request, id_pedido: int = Path(...)):
             response, "O pedido em questão não está apto a receber pagamento."
         )
         return response
-    # muda o estado do pedido para PENDENTE
-    PedidoRepo.alterar_estado(id_pedido, EstadoPedido.PENDENTE.value)
-    # captura os itens do pedido
-    itens = ItemPedidoRepo.obter_por_pedido(pedido.id)
-    total_pedido = sum([item.valor_item for item in itens])
-    pedido.itens = itens
-    PedidoRepo.atualizar_para_fechar(pedido.id, pedido.endereco_entrega, total_pedido)
+    total_pedido = pedido.valor_total
     # access_token = os.getenv("ACCESS_TOKEN_MP_PROD")
     access_token = os.getenv("ACCESS_TOKEN_MP_TEST")
     print(f"\n\n\nTOKEN: {access_token}\n\n\n")
@@ -216,8 +261,8 @@ async def get_mp_sucesso(
     request: Request,
     id_pedido: int = Path(...),
 ):
-    pedido = PedidoRepo.obter_por_id(id_pedido)
-    PedidoRepo.alterar_estado(id_pedido, EstadoPedido.PAGO.value)
+    pedido = await PedidoRepoAsync.obter_por_id(id_pedido)
+    await PedidoRepoAsync.alterar_estado(id_pedido, EstadoPedido.PAGO.value)
     return RedirectResponse(f"/cliente/pedidoconfirmado/{id_pedido}")
 
 
@@ -239,108 +284,152 @@ async def get_mp_pendente(
     request: Request,
     id_pedido: int = Path(...),
 ):
-    pedido = PedidoRepo.obter_por_id(id_pedido)
-    PedidoRepo.alterar_estado(id_pedido, EstadoPedido.PAGO.value)
+    pedido = await PedidoRepoAsync.obter_por_id(id_pedido)
+    await PedidoRepoAsync.alterar_estado(id_pedido, EstadoPedido.PAGO.value)
     return RedirectResponse(f"/cliente/detalhespedido/{id_pedido}")
 
 
+def _adicionar_ao_carrinho(id_cliente: int, id_produto: int) -> str:
+    with transacao():
+        produto = ProdutoRepo.obter_um(id_produto)
+        mensagem = f"O produto <b>{produto.nome}</b> foi adicionado ao carrinho."
+        pedido_carrinho = _obter_carrinho(id_cliente)
+        if pedido_carrinho == None:
+            usuario = UsuarioRepo.obter_por_id(id_cliente)
+            pedido_carrinho = Pedido(
+                0,  # id
+                datetime.now(),
+                0,  # valor_total
+                usuario.endereco,
+                EstadoPedido.CARRINHO.value,
+                id_cliente,
+            )
+            pedido_carrinho = PedidoRepo.inserir(pedido_carrinho)
+        qtde = ItemPedidoRepo.obter_quantidade_por_produto(pedido_carrinho.id, id_produto)
+        if qtde == 0:
+            item_pedido = ItemPedido(
+                pedido_carrinho.id, id_produto, produto.nome, produto.preco, 1, 0
+            )
+            ItemPedidoRepo.inserir(item_pedido)
+        else:
+            ItemPedidoRepo.aumentar_quantidade_produto(pedido_carrinho.id, id_produto)
+            mensagem = f"O produto <b>{produto.nome}</b> já estava no carrinho e teve sua quantidade aumentada."
+        PedidoRepo.atualizar_valor_total(pedido_carrinho.id)
+    return mensagem
+
+
 @router.post("/post_adicionar_carrinho", response_class=RedirectResponse)
 async def post_adicionar_carrinho(request: Request, id_produto: int = Form(...)):
-    produto = ProdutoRepo.obter_um(id_produto)
-    mensagem = f"O produto <b>{produto.nome}</b> foi adicionado ao carrinho."
-    pedidos = PedidoRepo.obter_por_estado(
-        request.state.usuario.id, EstadoPedido.CARRINHO.value
-    )
-    pedido_carrinho = pedidos[0] if pedidos else None
-    usuario = UsuarioRepo.obter_por_id(request.state.usuario.id)
-    if pedido_carrinho == None:
-        pedido_carrinho = Pedido(
-            0,  # id
-            datetime.now(),
-            0,  # valor_total
-            usuario.endereco,
-            EstadoPedido.CARRINHO.value,
-            request.state.usuario.id,
+    response = RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
+    try:
+        mensagem = await executar_no_banco(
+            _adicionar_ao_carrinho, request.state.usuario.id, id_produto
         )
-        pedido_carrinho = PedidoRepo.inserir(pedido_carrinho)
-    qtde = ItemPedidoRepo.obter_quantidade_por_produto(pedido_carrinho.id, id_produto)
-    if qtde == 0:
-        item_pedido = ItemPedido(
-            pedido_carrinho.id, id_produto, produto.nome, produto.preco, 1, 0
+    except sqlite3.Error:
+        adicionar_mensagem_erro(
+            response, "Não foi possível adicionar o produto ao carrinho. Tente novamente."
         )
-        ItemPedidoRepo.inserir(item_pedido)
-    else:
-        ItemPedidoRepo.aumentar_quantidade_produto(pedido_carrinho.id, id_produto)
-        mensagem = f"O produto <b>{produto.nome}</b> já estava no carrinho e teve sua quantidade aumentada."
-    PedidoRepo.atualizar_valor_total(pedido_carrinho.id)
-    response = RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
+        return response
     adicionar_mensagem_sucesso(response, mensagem)
     return response
 
 
+def _alterar_quantidade_item(
+    id_cliente: int, id_produto: int, variacao: int
+) -> Tuple[Optional[Produto], Optional[Pedido], int]:
+    # variacao: +1 aumenta, -1 diminui e 0 remove o item do carrinho;
+    # retorna o produto, o carrinho e a quantidade anterior do item
+    with transacao():
+        produto = ProdutoRepo.obter_um(id_produto)
+        if not produto:
+            return None, None, 0
+        pedido_carrinho = _obter_carrinho(id_cliente)
+        if pedido_carrinho == None:
+            return produto, None, 0
+        qtde = ItemPedidoRepo.obter_quantidade_por_produto(pedido_carrinho.id, id_produto)
+        if qtde == 0:
+            return produto, pedido_carrinho, 0
+        if variacao > 0:
+            ItemPedidoRepo.aumentar_quantidade_produto(pedido_carrinho.id, id_produto)
+        elif variacao < 0 and qtde > 1:
+            ItemPedidoRepo.diminuir_quantidade_produto(pedido_carrinho.id, id_produto)
+        else:
+            ItemPedidoRepo.excluir(pedido_carrinho.id, id_produto)
+        PedidoRepo.atualizar_valor_total(pedido_carrinho.id)
+        return produto, pedido_carrinho, qtde
+
+
 @router.post("/post_aumentar_item", response_class=RedirectResponse)
 async def post_aumentar_item(request: Request, id_produto: int = Form(0)):
-    produto = ProdutoRepo.obter_um(id_produto)
-    pedidos = PedidoRepo.obter_por_estado(
-        request.state.usuario.id, EstadoPedido.CARRINHO.value
-    )
-    pedido_carrinho = pedidos[0] if pedidos else None
+    try:
+        produto, pedido_carrinho, qtde = await executar_no_banco(
+            _alterar_quantidade_item, request.state.usuario.id, id_produto, 1
+        )
+    except sqlite3.Error:
+        response = RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
+        adicionar_mensagem_erro(response, "Não foi possível alterar o carrinho. Tente novamente.")
+        return response
+    if not produto:
+        response = RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
+        adicionar_mensagem_alerta(response, "Produto não encontrado.")
+        return response
     if pedido_carrinho == None:
         response = RedirectResponse(
             f"/produto?id={id_produto}", status.HTTP_303_SEE_OTHER
         )
         adicionar_mensagem_alerta(
-            f"Seu carrinho não foi encontrado. Adicione este produto ao carrinho novamente."
+            response,
+            f"Seu carrinho não foi encontrado. Adicione este produto ao carrinho novamente.",
         )
         return response
-    qtde = ItemPedidoRepo.obter_quantidade_por_produto(pedido_carrinho.id, id_produto)
     if qtde == 0:
         response = RedirectResponse(
             f"/produto?id={id_produto}", status.HTTP_303_SEE_OTHER
         )
         adicionar_mensagem_alerta(
-            f"Este produto não foi encontrado em seu carrinho. Adicione-o novamente."
+            response,
+            f"Este produto não foi encontrado em seu carrinho. Adicione-o novamente.",
         )
         return response
-    ItemPedidoRepo.aumentar_quantidade_produto(pedido_carrinho.id, id_produto)
     response = RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
     adicionar_mensagem_sucesso(
         response,
         f"O produto <b>{produto.nome}</b> teve sua quantidade aumentada para <b>{qtde+1}</b>.",
     )
-    PedidoRepo.atualizar_valor_total(pedido_carrinho.id)
     return response
 
 
 @router.post("/post_reduzir_item", response_class=RedirectResponse)
 async def post_reduzir_item(request: Request, id_produto: int = Form(0)):
-    produto = ProdutoRepo.obter_um(id_produto)
-    pedidos = PedidoRepo.obter_por_estado(
-        request.state.usuario.id, EstadoPedido.CARRINHO.value
-    )
-    pedido_carrinho = pedidos[0] if pedidos else None
     response = RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
+    try:
+        produto, pedido_carrinho, qtde = await executar_no_banco(
+            _alterar_quantidade_item, request.state.usuario.id, id_produto, -1
+        )
+    except sqlite3.Error:
+        adicionar_mensagem_erro(response, "Não foi possível alterar o carrinho. Tente novamente.")
+        return response
+    if not produto:
+        response = RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
+        adicionar_mensagem_alerta(response, "Produto não encontrado.")
+        return response
     if pedido_carrinho == None:
-        adicionar_mensagem_alerta(f"Seu carrinho não foi encontrado.")
+        adicionar_mensagem_alerta(response, f"Seu carrinho não foi encontrado.")
         return response
-    qtde = ItemPedidoRepo.obter_quantidade_por_produto(pedido_carrinho.id, id_produto)
     if qtde == 0:
         adicionar_mensagem_alerta(
-            f"O produto {id_produto} não foi encontrado em seu carrinho."
+            response, f"O produto {id_produto} não foi encontrado em seu carrinho."
         )
         return response
     if qtde == 1:
-        ItemPedidoRepo.excluir(pedido_carrinho.id, id_produto)
         adicionar_mensagem_sucesso(
             response, f"O produto <b>{produto.nome}</b> foi excluído do carrinho."
         )
         return response
-    ItemPedidoRepo.diminuir_quantidade_produto(pedido_carrinho.id, id_produto)
     adicionar_mensagem_sucesso(
         response,
         f"O produto <b>{produto.nome}</b> teve sua quantidade diminuída para <b>{qtde-1}</b>.",
     )
-    PedidoRepo.atualizar_valor_total(pedido_carrinho.id)
     return response
 
 
@@ -348,29 +437,27 @@ async def post_reduzir_item(request: Request, id_produto: int = Form(0)):
 async def post_remover_item(request: Request, id_produto: int = Form(0)):
     if not id_produto:
         return RedirectResponse("/cliente/carrinho", status.HTTP_304_NOT_MODIFIED)
-    produto = ProdutoRepo.obter_um(id_produto)
+    response = RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
+    try:
+        produto, pedido_carrinho, qtde = await executar_no_banco(
+            _alterar_quantidade_item, request.state.usuario.id, id_produto, 0
+        )
+    except sqlite3.Error:
+        adicionar_mensagem_erro(response, "Não foi possível alterar o carrinho. Tente novamente.")
+        return response
     if not produto:
         response = RedirectResponse("/cliente/carrinho", status.HTTP_304_NOT_MODIFIED)
         adicionar_mensagem_alerta(response, "Produto não encontrado.")
         return response
-    pedidos = PedidoRepo.obter_por_estado(
-        request.state.usuario.id, EstadoPedido.CARRINHO.value
-    )
-    pedido_carrinho = pedidos[0] if pedidos else None
-    response = RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
     if pedido_carrinho == None:
-        adicionar_mensagem_alerta(f"Seu carrinho não foi encontrado.")
+        adicionar_mensagem_alerta(response, f"Seu carrinho não foi encontrado.")
         return response
-    qtde = ItemPedidoRepo.obter_quantidade_por_produto(pedido_carrinho.id, id_produto)
     if qtde == 0:
         adicionar_mensagem_alerta(
-            f"O produto {id_produto} não foi encontrado em seu carrinho."
+            response, f"O produto {id_produto} não foi encontrado em seu carrinho."
         )
         return response
-    ItemPedidoRepo.excluir(pedido_carrinho.id, id_produto)
-    response = RedirectResponse("/cliente/carrinho", status.HTTP_303_SEE_OTHER)
     adicionar_mensagem_sucesso(response, "Item excluído com sucesso.")
-    PedidoRepo.atualizar_valor_total(pedido_carrinho.id)
     return response
 
 
@@ -379,10 +466,10 @@ async def get_pedidoconfirmado(
     request: Request,
     id_pedido: int = Path(...),
 ):
-    pedido = PedidoRepo.obter_por_id(id_pedido)
+    pedido = await PedidoRepoAsync.obter_por_id(id_pedido)
     if pedido.id_cliente != request.state.usuario.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    PedidoRepo.alterar_estado(id_pedido, EstadoPedido.PAGO.value)
+    await PedidoRepoAsync.alterar_estado(id_pedido, EstadoPedido.PAGO.value)
     return templates.TemplateResponse(
         "pages/pedidoconfirmado.html",
         {"request": request, "pedido": pedido},
@@ -394,31 +481,32 @@ async def get_detalhespedido(
     request: Request,
     id_pedido: int = Path(...),
 ):
-    pedido = PedidoRepo.obter_por_id(id_pedido)
+    pedido = await PedidoRepoAsync.obter_por_id(id_pedido)
     if pedido.id_cliente != request.state.usuario.id:
         response = RedirectResponse(url="/pedidos", status_code=status.HTTP_302_FOUND)
         return adicionar_mensagem_erro(
             response,
             "Pedido não encontrado. Verifique o número do pedido e tente novamente.",
         )
-    itens = ItemPedidoRepo.obter_por_pedido(pedido.id)
+    itens = await ItemPedidoRepoAsync.obter_por_pedido(pedido.id)
     pedido.itens = itens
+    catalogo = await obter_snapshot_catalogo_async()
     return templates.TemplateResponse(
         "pages/detalhespedido.html",
-        {"request": request, "pedido": pedido},
+        {"request": request, "pedido": pedido, "catalogo": catalogo},
     )
 
 
 @router.post("/post_cancelar_pedido", response_class=RedirectResponse)
 async def post_cancelar_pedido(request: Request, id_pedido: int = Form(0)):
-    pedido = PedidoRepo.obter_por_id(id_pedido)
+    pedido = await PedidoRepoAsync.obter_por_id(id_pedido)
     if not pedido or pedido.id_cliente != request.state.usuario.id:
         response = RedirectResponse(url="/cliente/pedidos", status_code=status.HTTP_302_FOUND)
         return adicionar_mensagem_erro(
             response,
             "Pedido não encontrado. Verifique o número do pedido e tente novamente.",
         )
-    PedidoRepo.alterar_estado(id_pedido, EstadoPedido.CANCELADO.value)
+    await PedidoRepoAsync.alterar_estado(id_pedido, EstadoPedido.CANCELADO.value)
     response = RedirectResponse(url="/cliente/pedidos", status_code=status.HTTP_303_SEE_OTHER)
     adicionar_mensagem_sucesso(response, "Pedido cancelado com sucesso.")
     return response
\ No newline at end of file
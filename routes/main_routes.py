@@ -1,14 +1,26 @@
 import math
+from typing import Optional
 from fastapi import APIRouter, HTTPException, Query, Request, status
 from fastapi.responses import HTMLResponse, JSONResponse
 
 from dtos.entrar_dto import EntrarDto
-from repositories.categoria_repo import CategoriaRepo
 from util.html import ler_html
+from util.paginacao import criar_cursor, ler_cursor
 from dtos.inserir_usuario_dto import InserirUsuarioDTO
 from models.usuario_model import Usuario
-from repositories.usuario_repo import UsuarioRepo
-from repositories.produto_repo import ProdutoRepo
+from repositories.usuario_repo import UsuarioRepoAsync
+from repositories.produto_repo import ProdutoRepoAsync
+from util.cache_catalogo import obter_snapshot_catalogo_async
+from util.cache_http import (
+    CACHE_CONTROL_SEM_ARMAZENAMENTO,
+    calcular_etag,
+    finalizar_pagina_publica,
+    nao_modificado,
+    obter_cache_control_publico,
+    possui_mensagens,
+    remover_mensagens,
+    resposta_nao_modificada,
+)
 from util.auth_jwt import (
     conferir_senha,
     criar_token,
@@ -29,25 +41,47 @@ async def get_html(arquivo: str):
     return response
 
 @router.get("/")
-async def get_root(request: Request, categoria: str = Query("")):  
-    print(categoria)
-
+async def get_root(request: Request, categoria: str = Query("")):
+    catalogo = await obter_snapshot_catalogo_async()
     if categoria:
-        produtos = ProdutoRepo.obter_por_categoria(ProdutoRepo, int(categoria))
+        produtos = catalogo.produtos_por_categoria.get(int(categoria), ())
     else:
-        produtos = ProdutoRepo.obter_todos()
-        
-    categorias = CategoriaRepo.obter_todos_ativos()
+        produtos = catalogo.produtos
+    categorias = catalogo.categorias
+    etag = calcular_etag(catalogo.assinatura, categoria)
+    if not possui_mensagens(request) and nao_modificado(request, etag):
+        return resposta_nao_modificada(etag, obter_cache_control_publico())
 
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "pages/index.html",
         {
             "request": request,
+            "cabecalho_publico": True,
             "produtos": produtos,
             "categorias": categorias,
+            "catalogo": catalogo,
             "categoria_selecionada": categoria,
         },
     )
+    return finalizar_pagina_publica(request, response, etag)
+
+
+@router.get("/fragmentos/cabecalho", response_class=JSONResponse)
+async def get_fragmento_cabecalho(request: Request, pagina: str = Query("/")):
+    # parte pessoal das páginas públicas, carregada por static/js/cabecalho.js
+    contexto = {
+        "request": request,
+        "cliente": getattr(request.state, "usuario", None),
+        "pagina_atual": pagina,
+    }
+    response = JSONResponse(
+        {
+            "menu": templates.get_template("includes/menu_usuario.html").render(contexto),
+            "mensagens": templates.get_template("includes/message.html").render(contexto),
+        },
+        headers={"Cache-Control": CACHE_CONTROL_SEM_ARMAZENAMENTO},
+    )
+    return remover_mensagens(request, response)
 
 
 @router.get("/contato")
@@ -70,7 +104,7 @@ async def get_cadastro(request: Request):
 async def post_cadastro(cliente_dto: InserirUsuarioDTO):
     cliente_data = cliente_dto.model_dump(exclude={"confirmacao_senha"})
     cliente_data["senha"] = obter_hash_senha(cliente_data["senha"])
-    novo_cliente = UsuarioRepo.inserir(Usuario(**cliente_data))
+    novo_cliente = await UsuarioRepoAsync.inserir(Usuario(**cliente_data))
     if not novo_cliente or not novo_cliente.id:
         raise HTTPException(status_code=400, detail="Erro ao cadastrar cliente.")
     return {"redirect": {"url": "/cadastro_realizado"}}
@@ -100,7 +134,7 @@ async def get_entrar(
 
 @router.post("/post_entrar", response_class=JSONResponse)
 async def post_entrar(entrar_dto: EntrarDto):
-    cliente_entrou = UsuarioRepo.obter_por_email(entrar_dto.email)
+    cliente_entrou = await UsuarioRepoAsync.obter_por_email(entrar_dto.email)
     if (
         (not cliente_entrou)
         or (not cliente_entrou.senha)
@@ -116,7 +150,7 @@ async def post_entrar(entrar_dto: EntrarDto):
         )
     token = criar_token(cliente_entrou.id, cliente_entrou.nome, cliente_entrou.email, cliente_entrou.perfil)
     # O código a seguir é apenas para autenticação baseada em cookies
-    # if not UsuarioRepo.alterar_token(cliente_entrou.id, token):
+    # if not await UsuarioRepoAsync.alterar_token(cliente_entrou.id, token):
     #     raise DatabaseError(
     #         "Não foi possível alterar o token do cliente no banco de dados."
     #     )
@@ -131,14 +165,23 @@ async def post_entrar(entrar_dto: EntrarDto):
 
 @router.get("/produto/{id:int}")
 async def get_produto(request: Request, id: int):
-    produto = ProdutoRepo.obter_um(id)
-    return templates.TemplateResponse(
+    catalogo = await obter_snapshot_catalogo_async()
+    produto = catalogo.produtos_por_id.get(id)
+    if produto is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    etag = calcular_etag(produto, catalogo.imagens_por_produto.get(id))
+    if not possui_mensagens(request) and nao_modificado(request, etag):
+        return resposta_nao_modificada(etag, obter_cache_control_publico())
+    response = templates.TemplateResponse(
         "pages/produto.html",
         {
             "request": request,
+            "cabecalho_publico": True,
             "produto": produto,
+            "catalogo": catalogo,
         },
     )
+    return finalizar_pagina_publica(request, response, etag)
 
 @router.get("/buscar")
 async def get_buscar(
@@ -147,19 +190,36 @@ async def get_buscar(
     p: int = 1,
     tp: int = 6,
     o: int = 1,
+    c: Optional[str] = None,
+    categoria: Optional[int] = None,
 ):
-    produtos = ProdutoRepo.obter_busca(q, p, tp, o)
-    qtde_produtos = ProdutoRepo.obter_quantidade_busca(q)
-    qtde_paginas = math.ceil(qtde_produtos / float(tp))
-    return templates.TemplateResponse(
+    produtos, qtde_produtos = await ProdutoRepoAsync.obter_busca_com_total(
+        q, p, tp, o, categoria_id=categoria, cursor=ler_cursor(c, o)
+    )
+    qtde_paginas = math.ceil((qtde_produtos or 0) / float(tp))
+    cursor_proximo = None
+    if produtos and len(produtos) == tp and p < qtde_paginas:
+        cursor_proximo = criar_cursor(o, produtos[-1])
+    # as URLs das imagens (por conteúdo) também fazem parte da página
+    catalogo = await obter_snapshot_catalogo_async()
+    imagens = [catalogo.imagens_por_produto.get(produto.id) for produto in produtos or ()]
+    etag = calcular_etag(q, p, tp, o, c, categoria, produtos, qtde_produtos, imagens)
+    if not possui_mensagens(request) and nao_modificado(request, etag):
+        return resposta_nao_modificada(etag, obter_cache_control_publico())
+    response = templates.TemplateResponse(
         "pages/buscar.html",
         {
             "request": request,
+            "cabecalho_publico": True,
             "produtos": produtos,
             "quantidade_paginas": qtde_paginas,
             "tamanho_pagina": tp,
             "pagina_atual": p,
             "termo_busca": q,
             "ordem": o,
+            "categoria_busca": categoria,
+            "cursor_proximo": cursor_proximo,
+            "catalogo": catalogo,
         },
     )
+    return finalizar_pagina_publica(request, response, etag)
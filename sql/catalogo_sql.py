@@ -0,0 +1,6 @@
+SQL_OBTER_VERSAO = """
+    SELECT versao
+    FROM versao_catalogo
+    WHERE id = 1
+"""
+
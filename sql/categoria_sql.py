@@ -46,4 +46,10 @@ SQL_REATIVAR = """
     UPDATE categoria
     SET ativo = 1
     WHERE id = ?
-"""
\ No newline at end of file
+"""
+
+# nome é a chave natural (índice único)
+SQL_INSERIR_SEMENTE = """
+    INSERT OR IGNORE INTO categoria(nome, ativo)
+    VALUES (?, ?)
+"""
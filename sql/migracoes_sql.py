@@ -0,0 +1,359 @@
+SQL_CRIAR_TABELA_VERSAO = """
+    CREATE TABLE IF NOT EXISTS schema_versao (
+        versao INTEGER PRIMARY KEY,
+        descricao TEXT NOT NULL,
+        aplicada_em DATETIME NOT NULL)
+"""
+
+SQL_OBTER_VERSOES = """
+    SELECT versao, descricao, aplicada_em
+    FROM schema_versao
+    ORDER BY versao
+"""
+
+SQL_OBTER_VERSAO_ATUAL = """
+    SELECT COALESCE(MAX(versao), 0)
+    FROM schema_versao
+"""
+
+SQL_REGISTRAR_VERSAO = """
+    INSERT INTO schema_versao(versao, descricao, aplicada_em)
+    VALUES (?, ?, ?)
+"""
+
+# o DDL de cada migração fica congelado aqui, copiado por extenso: as
+# constantes de sql/*_sql.py podem mudar depois, mas uma migração já
+# publicada precisa criar sempre o mesmo esquema
+
+# migração 1
+SQL_V1_CRIAR_TABELA_CATEGORIA = """
+    CREATE TABLE IF NOT EXISTS categoria (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    ativo INTEGER DEFAULT 1
+    );
+"""
+
+SQL_V1_CRIAR_TABELA_PRODUTO = """
+    CREATE TABLE IF NOT EXISTS produto (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        preco FLOAT NOT NULL,
+        descricao TEXT NOT NULL,
+        estoque INTEGER NOT NULL,
+        categoria_id INTEGER,
+        FOREIGN KEY (categoria_id) REFERENCES categoria (id)
+    )
+"""
+
+SQL_V1_CRIAR_TABELA_USUARIO = """
+    CREATE TABLE IF NOT EXISTS usuario (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        cpf TEXT NOT NULL UNIQUE,
+        data_nascimento DATE NOT NULL,
+        endereco TEXT NOT NULL,
+        telefone TEXT NOT NULL UNIQUE,
+        email TEXT NOT NULL UNIQUE,
+        perfil INTEGER DEFAULT 1,
+        senha TEXT NOT NULL,
+        token TEXT)
+"""
+
+SQL_V1_CRIAR_TABELA_PEDIDO = """
+    CREATE TABLE IF NOT EXISTS pedido (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        data_hora DATETIME NOT NULL,
+        valor_total FLOAT NOT NULL,
+        endereco_entrega TEXT NOT NULL,
+        estado TEXT NOT NULL,
+        id_cliente INTEGER NOT NULL,
+        FOREIGN KEY (id_cliente) REFERENCES cliente(id))
+"""
+
+SQL_V1_CRIAR_TABELA_ITEM_PEDIDO = """
+    CREATE TABLE IF NOT EXISTS item_pedido (
+        id_pedido INTEGER NOT NULL,
+        id_produto INTEGER NOT NULL,
+        nome_produto TEXT NOT NULL,
+        valor_produto FLOAT NOT NULL,
+        quantidade INTEGER NOT NULL,
+        valor_item AS (valor_produto * quantidade),
+        PRIMARY KEY(id_pedido, id_produto),
+        FOREIGN KEY (id_pedido) REFERENCES pedido(id),
+        FOREIGN KEY (id_produto) REFERENCES produto(id))
+"""
+
+# migração 3
+SQL_V3_CRIAR_TABELA_SEMENTE = """
+    CREATE TABLE IF NOT EXISTS semente (
+        arquivo TEXT PRIMARY KEY,
+        hash TEXT NOT NULL,
+        carregada_em DATETIME NOT NULL)
+"""
+
+# migração 4
+# índice de texto completo sobre nome e descrição; remove_diacritics 2 faz
+# "eletrico" encontrar "Elétrico" (e vice-versa)
+SQL_V4_CRIAR_TABELA_FTS = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS produto_fts USING fts5(
+        nome,
+        descricao,
+        content='produto',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+SQL_V4_CRIAR_GATILHO_FTS_INSERIR = """
+    CREATE TRIGGER IF NOT EXISTS produto_fts_inserir AFTER INSERT ON produto
+    BEGIN
+        INSERT INTO produto_fts(rowid, nome, descricao)
+        VALUES (new.id, new.nome, new.descricao);
+    END
+"""
+
+SQL_V4_CRIAR_GATILHO_FTS_EXCLUIR = """
+    CREATE TRIGGER IF NOT EXISTS produto_fts_excluir AFTER DELETE ON produto
+    BEGIN
+        INSERT INTO produto_fts(produto_fts, rowid, nome, descricao)
+        VALUES ('delete', old.id, old.nome, old.descricao);
+    END
+"""
+
+SQL_V4_CRIAR_GATILHO_FTS_ALTERAR = """
+    CREATE TRIGGER IF NOT EXISTS produto_fts_alterar AFTER UPDATE OF nome, descricao ON produto
+    BEGIN
+        INSERT INTO produto_fts(produto_fts, rowid, nome, descricao)
+        VALUES ('delete', old.id, old.nome, old.descricao);
+        INSERT INTO produto_fts(rowid, nome, descricao)
+        VALUES (new.id, new.nome, new.descricao);
+    END
+"""
+
+SQL_V4_RECONSTRUIR_FTS = """
+    INSERT INTO produto_fts(produto_fts) VALUES ('rebuild')
+"""
+
+# migração 6
+# os gatilhos incrementam a versão na mesma transação da escrita, de modo
+# que os outros processos só enxergam a versão nova junto com os dados novos
+SQL_V6_CRIAR_TABELA_VERSAO_CATALOGO = """
+    CREATE TABLE IF NOT EXISTS versao_catalogo (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        versao INTEGER NOT NULL)
+"""
+
+SQL_V6_INICIAR_VERSAO_CATALOGO = """
+    INSERT OR IGNORE INTO versao_catalogo(id, versao)
+    VALUES (1, 0)
+"""
+
+SQL_V6_CRIAR_GATILHO_PRODUTO_INSERIR = """
+    CREATE TRIGGER IF NOT EXISTS versao_catalogo_produto_inserir AFTER INSERT ON produto
+    BEGIN
+        UPDATE versao_catalogo SET versao = versao + 1 WHERE id = 1;
+    END
+"""
+
+SQL_V6_CRIAR_GATILHO_PRODUTO_ALTERAR = """
+    CREATE TRIGGER IF NOT EXISTS versao_catalogo_produto_alterar AFTER UPDATE ON produto
+    BEGIN
+        UPDATE versao_catalogo SET versao = versao + 1 WHERE id = 1;
+    END
+"""
+
+SQL_V6_CRIAR_GATILHO_PRODUTO_EXCLUIR = """
+    CREATE TRIGGER IF NOT EXISTS versao_catalogo_produto_excluir AFTER DELETE ON produto
+    BEGIN
+        UPDATE versao_catalogo SET versao = versao + 1 WHERE id = 1;
+    END
+"""
+
+SQL_V6_CRIAR_GATILHO_CATEGORIA_INSERIR = """
+    CREATE TRIGGER IF NOT EXISTS versao_catalogo_categoria_inserir AFTER INSERT ON categoria
+    BEGIN
+        UPDATE versao_catalogo SET versao = versao + 1 WHERE id = 1;
+    END
+"""
+
+SQL_V6_CRIAR_GATILHO_CATEGORIA_ALTERAR = """
+    CREATE TRIGGER IF NOT EXISTS versao_catalogo_categoria_alterar AFTER UPDATE ON categoria
+    BEGIN
+        UPDATE versao_catalogo SET versao = versao + 1 WHERE id = 1;
+    END
+"""
+
+SQL_V6_CRIAR_GATILHO_CATEGORIA_EXCLUIR = """
+    CREATE TRIGGER IF NOT EXISTS versao_catalogo_categoria_excluir AFTER DELETE ON categoria
+    BEGIN
+        UPDATE versao_catalogo SET versao = versao + 1 WHERE id = 1;
+    END
+"""
+
+# migração 7
+SQL_V7_CRIAR_TABELA_PRODUTO_IMAGEM = """
+    CREATE TABLE IF NOT EXISTS produto_imagem (
+        id_produto INTEGER NOT NULL,
+        tamanho INTEGER NOT NULL,
+        formato TEXT NOT NULL,
+        chave TEXT NOT NULL,
+        PRIMARY KEY (id_produto, tamanho, formato),
+        FOREIGN KEY (id_produto) REFERENCES produto (id))
+"""
+
+# a mesma chave pode ser usada por vários produtos (imagens idênticas)
+SQL_V7_CRIAR_INDICE_CHAVE = """
+    CREATE INDEX IF NOT EXISTS idx_produto_imagem_chave ON produto_imagem(chave)
+"""
+
+SQL_V7_CRIAR_GATILHO_PRODUTO_EXCLUIR = """
+    CREATE TRIGGER IF NOT EXISTS produto_imagem_produto_excluir AFTER DELETE ON produto
+    BEGIN
+        DELETE FROM produto_imagem WHERE id_produto = old.id;
+    END
+"""
+
+SQL_V7_CRIAR_GATILHO_PRODUTO_IMAGEM_INSERIR = """
+    CREATE TRIGGER IF NOT EXISTS versao_catalogo_produto_imagem_inserir AFTER INSERT ON produto_imagem
+    BEGIN
+        UPDATE versao_catalogo SET versao = versao + 1 WHERE id = 1;
+    END
+"""
+
+SQL_V7_CRIAR_GATILHO_PRODUTO_IMAGEM_EXCLUIR = """
+    CREATE TRIGGER IF NOT EXISTS versao_catalogo_produto_imagem_excluir AFTER DELETE ON produto_imagem
+    BEGIN
+        UPDATE versao_catalogo SET versao = versao + 1 WHERE id = 1;
+    END
+"""
+
+# migração 8
+# nomes repetidos ganham o id como sufixo, para que o índice único possa
+# ser criado sem descartar registros
+SQL_V8_RENOMEAR_PRODUTOS_REPETIDOS = """
+    UPDATE produto
+    SET nome = nome || ' (' || id || ')'
+    WHERE id NOT IN (SELECT MIN(id) FROM produto GROUP BY nome)
+"""
+
+SQL_V8_RENOMEAR_CATEGORIAS_REPETIDAS = """
+    UPDATE categoria
+    SET nome = nome || ' (' || id || ')'
+    WHERE id NOT IN (SELECT MIN(id) FROM categoria GROUP BY nome)
+"""
+
+# chaves naturais já carregadas de cada arquivo de carga inicial: um
+# registro excluído depois da carga não volta quando o arquivo muda
+SQL_V8_CRIAR_TABELA_SEMENTE_CHAVE = """
+    CREATE TABLE IF NOT EXISTS semente_chave (
+        tabela TEXT NOT NULL,
+        chave TEXT NOT NULL,
+        PRIMARY KEY (tabela, chave)) WITHOUT ROWID
+"""
+
+SQL_V8_REGISTRAR_CHAVES_EXISTENTES = """
+    INSERT OR IGNORE INTO semente_chave(tabela, chave)
+    SELECT 'produto', nome FROM produto
+    UNION ALL SELECT 'categoria', nome FROM categoria
+    UNION ALL SELECT 'usuario', email FROM usuario
+"""
+
+# cada migração é (versão, descrição, lista de comandos SQL); as versões
+# devem ser crescentes e uma migração já publicada nunca deve ser alterada
+MIGRACOES = [
+    (
+        1,
+        "tabelas iniciais",
+        [
+            SQL_V1_CRIAR_TABELA_CATEGORIA,
+            SQL_V1_CRIAR_TABELA_PRODUTO,
+            SQL_V1_CRIAR_TABELA_USUARIO,
+            SQL_V1_CRIAR_TABELA_PEDIDO,
+            SQL_V1_CRIAR_TABELA_ITEM_PEDIDO,
+        ],
+    ),
+    (
+        2,
+        "índices das consultas mais frequentes",
+        [
+            # SQL_OBTER_POR_ESTADO (carrinho do cliente)
+            "CREATE INDEX IF NOT EXISTS idx_pedido_cliente_estado ON pedido(id_cliente, estado)",
+            # SQL_OBTER_POR_PERIODO e SQL_OBTER_QUANTIDADE_POR_PERIODO
+            "CREATE INDEX IF NOT EXISTS idx_pedido_cliente_data_hora ON pedido(id_cliente, data_hora)",
+            # SQL_OBTER_TODOS_POR_ESTADO (área administrativa)
+            "CREATE INDEX IF NOT EXISTS idx_pedido_estado ON pedido(estado)",
+            # SQL_OBTER_POR_CATEGORIA
+            "CREATE INDEX IF NOT EXISTS idx_produto_categoria ON produto(categoria_id)",
+            # SQL_OBTER_POR_TOKEN
+            "CREATE INDEX IF NOT EXISTS idx_usuario_token ON usuario(token)",
+            # CategoriaRepo.categoria_existe
+            "CREATE INDEX IF NOT EXISTS idx_categoria_nome ON categoria(nome)",
+        ],
+    ),
+    (
+        3,
+        "controle dos arquivos de carga inicial",
+        [SQL_V3_CRIAR_TABELA_SEMENTE],
+    ),
+    (
+        4,
+        "busca de produtos por texto completo (FTS5)",
+        [
+            SQL_V4_CRIAR_TABELA_FTS,
+            SQL_V4_CRIAR_GATILHO_FTS_INSERIR,
+            SQL_V4_CRIAR_GATILHO_FTS_EXCLUIR,
+            SQL_V4_CRIAR_GATILHO_FTS_ALTERAR,
+            SQL_V4_RECONSTRUIR_FTS,
+        ],
+    ),
+    (
+        5,
+        "índices da paginação por cursor",
+        [
+            # como id é o rowid, produto(nome) já é ordenado por (nome, id)
+            "CREATE INDEX IF NOT EXISTS idx_produto_nome ON produto(nome)",
+            "CREATE INDEX IF NOT EXISTS idx_produto_preco ON produto(preco)",
+        ],
+    ),
+    (
+        6,
+        "versão do catálogo compartilhada entre processos",
+        [
+            SQL_V6_CRIAR_TABELA_VERSAO_CATALOGO,
+            SQL_V6_INICIAR_VERSAO_CATALOGO,
+            SQL_V6_CRIAR_GATILHO_PRODUTO_INSERIR,
+            SQL_V6_CRIAR_GATILHO_PRODUTO_ALTERAR,
+            SQL_V6_CRIAR_GATILHO_PRODUTO_EXCLUIR,
+            SQL_V6_CRIAR_GATILHO_CATEGORIA_INSERIR,
+            SQL_V6_CRIAR_GATILHO_CATEGORIA_ALTERAR,
+            SQL_V6_CRIAR_GATILHO_CATEGORIA_EXCLUIR,
+        ],
+    ),
+    (
+        7,
+        "imagens dos produtos armazenadas por conteúdo",
+        [
+            SQL_V7_CRIAR_TABELA_PRODUTO_IMAGEM,
+            SQL_V7_CRIAR_INDICE_CHAVE,
+            SQL_V7_CRIAR_GATILHO_PRODUTO_EXCLUIR,
+            SQL_V7_CRIAR_GATILHO_PRODUTO_IMAGEM_INSERIR,
+            SQL_V7_CRIAR_GATILHO_PRODUTO_IMAGEM_EXCLUIR,
+        ],
+    ),
+    (
+        8,
+        "chaves naturais únicas para a carga inicial",
+        [
+            SQL_V8_RENOMEAR_PRODUTOS_REPETIDOS,
+            SQL_V8_RENOMEAR_CATEGORIAS_REPETIDAS,
+            # substituem os índices comuns criados nas migrações 2 e 5
+            "DROP INDEX IF EXISTS idx_produto_nome",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_produto_nome_unico ON produto(nome)",
+            "DROP INDEX IF EXISTS idx_categoria_nome",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_categoria_nome_unico ON categoria(nome)",
+            SQL_V8_CRIAR_TABELA_SEMENTE_CHAVE,
+            SQL_V8_REGISTRAR_CHAVES_EXISTENTES,
+        ],
+    ),
+]
@@ -0,0 +1,21 @@
+SQL_EXCLUIR_POR_PRODUTO = """
+    DELETE FROM produto_imagem
+    WHERE id_produto=?
+"""
+
+SQL_INSERIR = """
+    INSERT INTO produto_imagem(id_produto, tamanho, formato, chave)
+    VALUES (?, ?, ?, ?)
+"""
+
+SQL_OBTER_CHAVES_EM_USO = """
+    SELECT DISTINCT chave
+    FROM produto_imagem
+    WHERE chave IN (SELECT value FROM json_each(?))
+"""
+
+SQL_OBTER_TODAS = """
+    SELECT id_produto, tamanho, formato, chave
+    FROM produto_imagem
+    ORDER BY id_produto, tamanho, formato
+"""
@@ -56,22 +56,100 @@ SQL_OBTER_QUANTIDADE = """
     SELECT COUNT(*) FROM produto
 """
 
+SQL_OBTER_IDS = """
+    SELECT id FROM produto
+"""
+
+# bm25() só pode ser chamada na consulta que faz o MATCH, e não junto de
+# funções de janela (COUNT(*) OVER ()): a relevância é calculada na
+# subconsulta e usada na ordenação por fora (BM25: quanto menor, mais
+# relevante; o nome pesa mais que a descrição)
 SQL_OBTER_BUSCA = """
     SELECT p.id, p.nome, p.preco, p.descricao, p.estoque, c.nome AS categoria
-    FROM produto p
+    FROM (
+        SELECT rowid AS id, bm25(produto_fts, 10.0, 1.0) AS relevancia
+        FROM produto_fts
+        WHERE produto_fts MATCH ?
+    ) f
+    JOIN produto p ON p.id = f.id
     LEFT JOIN categoria c ON p.categoria_id = c.id
-    WHERE (p.nome LIKE ? OR p.descricao LIKE ?)
-      AND (? IS NULL OR c.id = ?)
+    WHERE (? IS NULL OR c.id = ?)
       AND c.ativo = 1
+      #2
     ORDER BY #1
     LIMIT ? OFFSET ?
 """
 
 SQL_OBTER_QUANTIDADE_BUSCA = """
+    SELECT COUNT(*)
+    FROM produto_fts f
+    JOIN produto p ON p.id = f.rowid
+    LEFT JOIN categoria c ON p.categoria_id = c.id
+    WHERE produto_fts MATCH ?
+      AND (? IS NULL OR c.id = ?)
+      AND c.ativo = 1
+"""
+
+SQL_OBTER_BUSCA_SEM_TERMO = """
+    SELECT p.id, p.nome, p.preco, p.descricao, p.estoque, c.nome AS categoria
+    FROM produto p
+    LEFT JOIN categoria c ON p.categoria_id = c.id
+    WHERE (? IS NULL OR c.id = ?)
+      AND c.ativo = 1
+      #2
+    ORDER BY #1
+    LIMIT ? OFFSET ?
+"""
+
+SQL_OBTER_QUANTIDADE_BUSCA_SEM_TERMO = """
     SELECT COUNT(*)
     FROM produto p
     LEFT JOIN categoria c ON p.categoria_id = c.id
-    WHERE (p.nome LIKE ? OR p.descricao LIKE ?)
+    WHERE (? IS NULL OR c.id = ?)
       AND c.ativo = 1
-      AND (? IS NULL OR c.id = ?)
-"""
\ No newline at end of file
+"""
+
+SQL_OBTER_BUSCA_COM_TOTAL = """
+    SELECT p.id, p.nome, p.preco, p.descricao, p.estoque, c.nome AS categoria,
+        COUNT(*) OVER () AS total
+    FROM (
+        SELECT rowid AS id, bm25(produto_fts, 10.0, 1.0) AS relevancia
+        FROM produto_fts
+        WHERE produto_fts MATCH ?
+    ) f
+    JOIN produto p ON p.id = f.id
+    LEFT JOIN categoria c ON p.categoria_id = c.id
+    WHERE (? IS NULL OR c.id = ?)
+      AND c.ativo = 1
+    ORDER BY #1
+    LIMIT ? OFFSET ?
+"""
+
+SQL_OBTER_BUSCA_SEM_TERMO_COM_TOTAL = """
+    SELECT p.id, p.nome, p.preco, p.descricao, p.estoque, c.nome AS categoria,
+        COUNT(*) OVER () AS total
+    FROM produto p
+    LEFT JOIN categoria c ON p.categoria_id = c.id
+    WHERE (? IS NULL OR c.id = ?)
+      AND c.ativo = 1
+    ORDER BY #1
+    LIMIT ? OFFSET ?
+"""
+
+# nome é a chave natural (índice único): o id é sempre gerado pelo banco
+SQL_INSERIR_SEMENTE = """
+    INSERT OR IGNORE INTO produto(nome, preco, descricao, estoque, categoria_id)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+SQL_EXISTE_NOME = """
+    SELECT 1
+    FROM produto
+    WHERE nome=?
+"""
+
+SQL_OBTER_IDS_POR_NOME = """
+    SELECT nome, id
+    FROM produto
+    WHERE nome IN (SELECT value FROM json_each(?))
+"""
@@ -0,0 +1,22 @@
+SQL_OBTER_HASH = """
+    SELECT hash
+    FROM semente
+    WHERE arquivo=?
+"""
+
+SQL_OBTER_CHAVES = """
+    SELECT chave
+    FROM semente_chave
+    WHERE tabela=?
+"""
+
+SQL_REGISTRAR_CHAVE = """
+    INSERT OR IGNORE INTO semente_chave(tabela, chave)
+    VALUES (?, ?)
+"""
+
+SQL_REGISTRAR_HASH = """
+    INSERT INTO semente(arquivo, hash, carregada_em)
+    VALUES (?, ?, ?)
+    ON CONFLICT(arquivo) DO UPDATE SET hash=excluded.hash, carregada_em=excluded.carregada_em
+"""
@@ -89,3 +89,8 @@ SQL_OBTER_QUANTIDADE_BUSCA = """
     SELECT COUNT(*) FROM usuario
     WHERE nome LIKE ? OR cpf LIKE ?
 """
+
+SQL_INSERIR_SEMENTE = """
+    INSERT OR IGNORE INTO usuario(nome, cpf, data_nascimento, endereco, telefone, email, perfil, senha)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
@@ -0,0 +1,26 @@
+// Páginas públicas do catálogo chegam iguais para todos (podem vir de um cache
+// compartilhado); o menu do usuário e as mensagens vêm do fragmento pessoal.
+function carregarCabecalho() {
+    var pagina = encodeURIComponent(window.location.pathname);
+    fetch('/fragmentos/cabecalho?pagina=' + pagina, {
+        credentials: 'same-origin',
+        cache: 'no-store'
+    })
+        .then(response => response.ok ? response.json() : null)
+        .then(data => {
+            if (!data) {
+                return;
+            }
+            var menu = document.getElementById('menuUsuario');
+            if (menu) {
+                menu.innerHTML = data.menu;
+            }
+            var mensagens = document.getElementById('mensagens');
+            if (mensagens && data.mensagens.trim() !== '' && mensagens.innerHTML.trim() === '') {
+                mensagens.innerHTML = data.mensagens;
+            }
+        })
+        .catch(error => console.error('Erro ao carregar o cabeçalho:', error));
+}
+
+document.addEventListener('DOMContentLoaded', carregarCabecalho);
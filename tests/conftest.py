@@ -0,0 +1,23 @@
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+os.chdir(RAIZ)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def banco(tmp_path_factory):
+    # cópia do banco versionado, com as migrações aplicadas; as sementes não
+    # são recarregadas (copiariam imagens para dentro de static/)
+    arquivo = tmp_path_factory.mktemp("banco") / "dados.db"
+    shutil.copyfile(RAIZ / "dados.db", arquivo)
+    os.environ["DB_ARQUIVO"] = str(arquivo)
+    from util.bootstrap import executar_bootstrap
+
+    executar_bootstrap(sementes=False)
+    return arquivo
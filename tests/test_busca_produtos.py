@@ -0,0 +1,24 @@
+from repositories.produto_repo import ProdutoRepo
+
+ORDEM_RELEVANCIA = 4
+
+
+def test_busca_por_relevancia_com_total():
+    produtos, total = ProdutoRepo.obter_busca_com_total("relogio", 1, 6, ORDEM_RELEVANCIA)
+    assert produtos is not None
+    assert total == ProdutoRepo.obter_quantidade_busca("relogio")
+    assert total >= len(produtos) > 0
+
+
+def test_busca_por_relevancia_sem_total():
+    produtos = ProdutoRepo.obter_busca("relogio", 1, 6, ORDEM_RELEVANCIA)
+    assert produtos is not None
+    assert len(produtos) > 0
+
+
+def test_busca_por_relevancia_ordena_nome_antes_da_descricao():
+    # o nome pesa mais que a descrição no bm25
+    produtos, total = ProdutoRepo.obter_busca_com_total("fone", 1, 50, ORDEM_RELEVANCIA)
+    assert produtos is not None and total == len(produtos)
+    no_nome = ["fone" in produto.nome.lower() for produto in produtos]
+    assert no_nome == sorted(no_nome, reverse=True)
@@ -0,0 +1,32 @@
+import sqlite3
+
+import util.cache_catalogo as cache_catalogo
+import util.catalogo as catalogo_monitor
+from repositories.produto_imagem_repo import ProdutoImagemRepo
+from util.cache_catalogo import obter_imagem_produto, obter_snapshot_catalogo
+from util.images import TAMANHOS_VARIANTES, montar_imagem_produto
+
+VARIANTES = [(tamanho, formato, f"ab/{tamanho}.{formato}") for tamanho in TAMANHOS_VARIANTES for formato in ("jpg", "webp")]
+
+
+def _sem_banco(versao):
+    raise AssertionError("o catálogo não deve ser reconstruído durante a renderização")
+
+
+def test_imagem_produto_le_apenas_o_retrato_recebido(monkeypatch):
+    assert ProdutoImagemRepo.definir(2, VARIANTES)
+    catalogo = obter_snapshot_catalogo()
+    monkeypatch.setattr(cache_catalogo, "_construir_snapshot", _sem_banco)
+    assert obter_imagem_produto(catalogo, 2) == catalogo.imagens_por_produto[2]
+    assert obter_imagem_produto(None, 2) == montar_imagem_produto(2)
+
+
+def test_retrato_percebe_escrita_de_outro_processo_sem_monitor(banco):
+    catalogo = obter_snapshot_catalogo()
+    # escrita feita por outra conexão, fora do pool, como a de outro worker
+    conexao = sqlite3.connect(banco)
+    with conexao:
+        conexao.execute("UPDATE versao_catalogo SET versao = versao + 1 WHERE id = 1")
+    conexao.close()
+    assert catalogo_monitor._monitor is None
+    assert obter_snapshot_catalogo() is not catalogo
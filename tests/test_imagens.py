@@ -0,0 +1,48 @@
+import pytest
+from PIL import Image
+
+from util.images import TAMANHOS_VARIANTES, abrir_imagem_reduzida, renderizar_variantes
+
+# maior que 2x a maior variante, para passar por reduce()
+LADO = TAMANHOS_VARIANTES[-1] * 2 + 40
+
+
+def _criar_imagem(caminho, modo, formato):
+    if modo == "I;16":
+        imagem = Image.new("I;16", (LADO, LADO))
+        imagem.putpixel((0, 0), 65535)
+    elif modo == "P":
+        imagem = Image.new("RGB", (LADO, LADO), (200, 30, 30)).convert("P", palette=Image.Palette.ADAPTIVE)
+    else:
+        imagem = Image.new(modo, (LADO, LADO), 1)
+    imagem.save(caminho, formato)
+
+
+@pytest.mark.parametrize(
+    "modo, formato",
+    [("P", "PNG"), ("P", "GIF"), ("I;16", "PNG"), ("1", "PNG"), ("RGB", "JPEG")],
+)
+def test_abrir_imagem_reduzida_aceita_modos(tmp_path, modo, formato):
+    caminho = tmp_path / f"imagem.{formato.lower()}"
+    _criar_imagem(caminho, modo, formato)
+    with abrir_imagem_reduzida(str(caminho)) as imagem:
+        assert min(imagem.size) >= TAMANHOS_VARIANTES[-1]
+        assert min(imagem.size) < LADO
+        variantes = renderizar_variantes(imagem)
+    assert len(variantes) == len(TAMANHOS_VARIANTES) * 2
+
+
+def test_paleta_mantem_as_cores(tmp_path):
+    caminho = tmp_path / "imagem.png"
+    _criar_imagem(caminho, "P", "PNG")
+    with abrir_imagem_reduzida(str(caminho)) as imagem:
+        vermelho, verde, azul = imagem.convert("RGB").getpixel((10, 10))
+    assert vermelho > 150 and verde < 80 and azul < 80
+
+
+def test_cinza_16_bits_nao_satura(tmp_path):
+    caminho = tmp_path / "imagem.png"
+    Image.new("I;16", (LADO, LADO), 32768).save(caminho)
+    with abrir_imagem_reduzida(str(caminho)) as imagem:
+        assert imagem.mode == "L"
+        assert 120 <= imagem.getpixel((10, 10)) <= 135
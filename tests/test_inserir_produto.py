@@ -0,0 +1,138 @@
+import io
+import itertools
+import os
+import sqlite3
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import routes.admin_routes as admin_routes
+import util.armazenamento_imagens as armazenamento_imagens
+from models.produto_model import Produto
+from repositories.produto_imagem_repo import ProdutoImagemRepo
+from repositories.produto_repo import ProdutoRepo
+from routes.admin_routes import _inserir_produto_com_imagens, _remover_variantes_sem_uso
+from util.armazenamento_imagens import ArmazenamentoLocal
+from util.images import TAMANHOS_VARIANTES
+
+VARIANTES = [(tamanho, formato, f"cd/{tamanho}.{formato}") for tamanho in TAMANHOS_VARIANTES for formato in ("jpg", "webp")]
+# nome é único entre os produtos
+_NUMEROS = itertools.count(1)
+FORMULARIO = {
+    "preco": "10",
+    "descricao": "Descrição do produto enviado",
+    "estoque": "1",
+    "categoria_id": "1",
+}
+
+
+def _novo_produto():
+    return Produto(None, f"Produto de teste {next(_NUMEROS)}", 10.0, "Descrição", 1, 1)
+
+
+def _imagem_jpeg(cor=(200, 30, 30)):
+    corpo = io.BytesIO()
+    Image.new("RGB", (64, 64), cor).save(corpo, "JPEG")
+    return corpo.getvalue()
+
+
+async def _processar_no_processo(funcao, *args):
+    return funcao(*args)
+
+
+@pytest.fixture
+def armazenamento(tmp_path, monkeypatch):
+    local = ArmazenamentoLocal(str(tmp_path / "conteudo"))
+    monkeypatch.setattr(armazenamento_imagens, "_armazenamento", local)
+    monkeypatch.setattr(armazenamento_imagens, "_pid_armazenamento", os.getpid())
+    return local
+
+
+@pytest.fixture
+def cliente(armazenamento, tmp_path, monkeypatch):
+    monkeypatch.setenv("IMAGENS_PASTA_ORIGINAIS", str(tmp_path / "originais"))
+    monkeypatch.setattr(admin_routes, "processar_imagem", _processar_no_processo)
+    monkeypatch.setattr(admin_routes, "SLEEP_TIME", 0)
+    app = FastAPI()
+    app.include_router(admin_routes.router)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def _enviar(cliente, imagem):
+    return cliente.post(
+        "/admin/inserir_produto",
+        data={**FORMULARIO, "nome": f"Produto enviado {next(_NUMEROS)}"},
+        files={"imagem": ("a.jpg", imagem, "image/jpeg")},
+    )
+
+
+def test_inserir_produto_registra_imagens():
+    produto = _inserir_produto_com_imagens(_novo_produto(), VARIANTES)
+    assert produto is not None
+    assert ProdutoImagemRepo.obter_todas()[produto.id] == {
+        (tamanho, formato): chave for tamanho, formato, chave in VARIANTES
+    }
+
+
+def test_inserir_produto_desfeito_se_imagens_falham(monkeypatch):
+    monkeypatch.setattr(ProdutoImagemRepo, "definir", classmethod(lambda cls, id_produto, variantes: False))
+    quantidade = ProdutoRepo.obter_quantidade()
+    with pytest.raises(sqlite3.Error):
+        _inserir_produto_com_imagens(_novo_produto(), VARIANTES)
+    assert ProdutoRepo.obter_quantidade() == quantidade
+
+
+def test_remover_variantes_mantem_chaves_de_outros_produtos(armazenamento):
+    produto = _inserir_produto_com_imagens(_novo_produto(), VARIANTES)
+    compartilhada = VARIANTES[0]
+    exclusiva = (TAMANHOS_VARIANTES[0], "jpg", "ef/exclusiva.jpg")
+    for _, _, chave in (compartilhada, exclusiva):
+        armazenamento._gravar(chave, b"imagem", "image/jpeg")
+    _remover_variantes_sem_uso([compartilhada, exclusiva])
+    assert armazenamento.existe(compartilhada[2])
+    assert not armazenamento.existe(exclusiva[2])
+    assert produto.id in ProdutoImagemRepo.obter_todas()
+
+
+def test_rota_devolve_produto_se_guardar_original_falha(cliente, monkeypatch):
+    def falhar(caminho, nome_base):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(admin_routes, "guardar_imagem_original", falhar)
+    resposta = _enviar(cliente, _imagem_jpeg())
+    assert resposta.status_code == 201
+    assert resposta.json()["id"] in ProdutoImagemRepo.obter_todas()
+
+
+def test_rota_recusa_imagem_invalida(cliente):
+    resposta = _enviar(cliente, b"\xff\xd8\xff\xe0" + b"0" * 512)
+    assert resposta.status_code == 422
+    assert resposta.json()["type"] == "invalid_file"
+
+
+def test_rota_falha_do_armazenamento_nao_e_imagem_invalida(cliente, armazenamento, monkeypatch):
+    def falhar(chave, conteudo, tipo_conteudo):
+        raise PermissionError("sem permissão")
+
+    monkeypatch.setattr(armazenamento, "_gravar", falhar)
+    assert _enviar(cliente, _imagem_jpeg()).status_code == 500
+
+
+def test_rota_remove_variantes_se_insercao_falha(cliente, armazenamento, monkeypatch):
+    def falhar(produto, variantes):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(admin_routes, "_inserir_produto_com_imagens", falhar)
+    # cor ainda não usada: nenhuma das variantes pertence a outro produto
+    resposta = _enviar(cliente, _imagem_jpeg((10, 90, 170)))
+    assert resposta.status_code == 500
+    assert not any(arquivo.is_file() for arquivo in armazenamento.pasta.rglob("*"))
+
+
+def test_rota_recusa_nome_repetido(cliente):
+    produto = _inserir_produto_com_imagens(_novo_produto(), None)
+    resposta = cliente.post("/admin/inserir_produto", data={**FORMULARIO, "nome": produto.nome})
+    assert resposta.status_code == 400
+    assert resposta.json()["type"] == "product_exists"
@@ -0,0 +1,24 @@
+from util.reprocessar_imagens import _listar_originais
+
+
+def test_imagens_sem_produto_sao_orfas(tmp_path):
+    pasta_originais = tmp_path / "originais"
+    pasta_imagens = tmp_path / "produtos"
+    pasta_originais.mkdir()
+    pasta_imagens.mkdir()
+    for nome in ("0001.jpg", "0000.jpg", "0021.jpg", "0001-800.jpg", "logo.jpg"):
+        (pasta_imagens / nome).write_bytes(b"jpg")
+    (pasta_originais / "0002.png").write_bytes(b"png")
+    (pasta_originais / "0099.png").write_bytes(b"png")
+
+    originais, orfas = _listar_originais(pasta_originais, pasta_imagens, {1, 2})
+
+    assert sorted(originais) == ["0001", "0002"]
+    assert sorted(orfas) == sorted([
+        "0099.png",
+        f"{pasta_imagens.as_posix()}/0000.jpg",
+        f"{pasta_imagens.as_posix()}/0021.jpg",
+        f"{pasta_imagens.as_posix()}/logo.jpg",
+    ])
+    # órfãs não são copiadas para as originais
+    assert sorted(p.name for p in pasta_originais.iterdir()) == ["0001.jpg", "0002.png", "0099.png"]
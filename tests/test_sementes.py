@@ -0,0 +1,41 @@
+import json
+
+from repositories.categoria_repo import CategoriaRepo
+from repositories.produto_repo import ProdutoRepo
+
+
+def _gravar(caminho, registros):
+    caminho.write_text(json.dumps(registros), encoding="utf-8")
+
+
+def _produto(id, nome):
+    return {"id": id, "nome": nome, "preco": 10, "descricao": "Descrição", "estoque": 1, "categoria_id": 1}
+
+
+def test_carga_de_produtos_usa_o_nome_e_nao_recria_excluidos(tmp_path):
+    arquivo = tmp_path / "produtos.json"
+    _gravar(arquivo, [_produto(9001, "Semente A"), _produto(9002, "Semente B")])
+    assert ProdutoRepo.inserir_produtos_json(str(arquivo)) == 2
+    # arquivo sem alteração: nada é lido do banco
+    assert ProdutoRepo.inserir_produtos_json(str(arquivo)) == 0
+
+    ids = ProdutoRepo.obter_ids_semente(str(arquivo))
+    # o id do arquivo não é usado no banco
+    assert set(ids) == {9001, 9002} and 9001 not in ids.values()
+    assert ProdutoRepo.excluir(ids[9001])
+
+    _gravar(arquivo, [_produto(9001, "Semente A"), _produto(9002, "Semente B"), _produto(9003, "Semente C")])
+    assert ProdutoRepo.inserir_produtos_json(str(arquivo)) == 1
+    assert set(ProdutoRepo.obter_ids_semente(str(arquivo))) == {9002, 9003}
+
+
+def test_carga_de_categorias_ignora_nomes_existentes(tmp_path):
+    arquivo = tmp_path / "categorias.json"
+    _gravar(arquivo, [{"id": 1, "nome": "Semente X"}, {"id": 2, "nome": "Semente X"}])
+    assert CategoriaRepo.inserir_categorias_json(str(arquivo)) == 1
+    _gravar(arquivo, [{"id": 1, "nome": "Semente X"}, {"id": 2, "nome": "Semente Y"}])
+    assert CategoriaRepo.inserir_categorias_json(str(arquivo)) == 1
+    assert sorted(c.nome for c in CategoriaRepo.obter_todos() if c.nome.startswith("Semente")) == [
+        "Semente X",
+        "Semente Y",
+    ]
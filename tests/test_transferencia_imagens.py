@@ -0,0 +1,27 @@
+import os
+
+from PIL import Image
+
+import util.armazenamento_imagens as armazenamento_imagens
+from repositories.produto_imagem_repo import ProdutoImagemRepo
+from util.armazenamento_imagens import ArmazenamentoLocal
+from util.transferencia_imagens import sincronizar_imagens
+
+
+def test_sincronizacao_registra_imagens_ausentes_do_banco(tmp_path, monkeypatch):
+    monkeypatch.setenv("IMAGENS_PASTA_ORIGINAIS", str(tmp_path / "originais"))
+    monkeypatch.setattr(armazenamento_imagens, "_armazenamento", ArmazenamentoLocal(str(tmp_path / "conteudo")))
+    monkeypatch.setattr(armazenamento_imagens, "_pid_armazenamento", os.getpid())
+    origem, destino = tmp_path / "inserir", tmp_path / "produtos"
+    origem.mkdir()
+    destino.mkdir()
+    Image.new("RGB", (64, 64), (10, 120, 200)).save(origem / "0001.jpg")
+
+    assert sincronizar_imagens(str(origem), str(destino))["transferidos"] == 1
+    assert sincronizar_imagens(str(origem), str(destino))["inalterados"] == 1
+
+    # banco recriado: o manifesto e o armazenamento continuam válidos, mas
+    # as variantes precisam ser registradas de novo
+    assert ProdutoImagemRepo.definir(1, [])
+    assert sincronizar_imagens(str(origem), str(destino))["transferidos"] == 1
+    assert 1 in ProdutoImagemRepo.obter_todas()
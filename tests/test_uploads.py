@@ -0,0 +1,47 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from util.uploads import MARGEM_FORMULARIO, LimiteUploadMiddleware
+
+
+def _criar_cliente(monkeypatch):
+    monkeypatch.setenv("IMAGENS_UPLOAD_MAXIMO_MB", "1")
+    app = FastAPI()
+    app.add_middleware(LimiteUploadMiddleware)
+
+    @app.post("/upload")
+    async def upload(imagem: UploadFile = File(...)):
+        return {"tamanho": len(await imagem.read())}
+
+    return TestClient(app)
+
+
+def test_recusa_pelo_content_length(monkeypatch):
+    cliente = _criar_cliente(monkeypatch)
+    resposta = cliente.post("/upload", files={"imagem": ("a.jpg", b"0" * (2 * 1024 * 1024), "image/jpeg")})
+    assert resposta.status_code == 413
+    assert resposta.json()["type"] == "file_too_large"
+
+
+def test_recusa_corpo_sem_content_length(monkeypatch):
+    cliente = _criar_cliente(monkeypatch)
+
+    def gerar():
+        yield b'--x\r\nContent-Disposition: form-data; name="imagem"; filename="a.jpg"\r\n\r\n'
+        for _ in range(40):
+            yield b"0" * 65536
+        yield b"\r\n--x--\r\n"
+
+    resposta = cliente.post(
+        "/upload", content=gerar(), headers={"content-type": "multipart/form-data; boundary=x"}
+    )
+    assert resposta.status_code == 413
+    assert resposta.json()["type"] == "file_too_large"
+
+
+def test_aceita_dentro_do_limite(monkeypatch):
+    cliente = _criar_cliente(monkeypatch)
+    tamanho = 1024 * 1024 - MARGEM_FORMULARIO
+    resposta = cliente.post("/upload", files={"imagem": ("a.jpg", b"0" * tamanho, "image/jpeg")})
+    assert resposta.status_code == 200
+    assert resposta.json() == {"tamanho": tamanho}
@@ -0,0 +1,184 @@
+import hashlib
+from abc import ABC, abstractmethod
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+# os arquivos são nomeados pelo hash do conteúdo: uma chave nunca muda de
+# conteúdo, então pode ficar em cache (navegador, CDN) para sempre, e
+# imagens idênticas são gravadas uma única vez
+CACHE_CONTROL_IMUTAVEL = "public, max-age=31536000, immutable"
+PASTA_CONTEUDO = "static/img/conteudo"
+URL_CONTEUDO = "/static/img/conteudo"
+TIPOS_CONTEUDO = {"jpg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+_armazenamento: Optional["ArmazenamentoImagens"] = None
+_pid_armazenamento: Optional[int] = None
+_lock_armazenamento = threading.Lock()
+
+
+def calcular_chave(conteudo: bytes, extensao: str) -> str:
+    # "ab/abcdef...0123.webp": o primeiro nível evita diretórios enormes
+    resumo = hashlib.sha256(conteudo).hexdigest()
+    return f"{resumo[:2]}/{resumo}.{extensao}"
+
+
+class ArmazenamentoImagens(ABC):
+    # interface dos backends; gravar() devolve a chave, a ser guardada no
+    # banco (produto_imagem), e url() a converte no endereço público
+    def gravar(self, conteudo: bytes, extensao: str) -> str:
+        chave = calcular_chave(conteudo, extensao)
+        if not self.existe(chave):
+            self._gravar(chave, conteudo, TIPOS_CONTEUDO.get(extensao, "application/octet-stream"))
+        return chave
+
+    @abstractmethod
+    def existe(self, chave: str) -> bool: ...
+
+    @abstractmethod
+    def remover(self, chave: str): ...
+
+    @abstractmethod
+    def url(self, chave: str) -> str: ...
+
+    @abstractmethod
+    def _gravar(self, chave: str, conteudo: bytes, tipo_conteudo: str): ...
+
+
+class ArmazenamentoLocal(ArmazenamentoImagens):
+    # arquivos em static/, servidos por ArquivosEstaticos com cache imutável
+    def __init__(self, pasta: str = PASTA_CONTEUDO, url_base: str = URL_CONTEUDO):
+        self.pasta = Path(pasta)
+        self.url_base = url_base.rstrip("/")
+
+    def existe(self, chave: str) -> bool:
+        return (self.pasta / chave).exists()
+
+    def remover(self, chave: str):
+        try:
+            os.remove(self.pasta / chave)
+        except FileNotFoundError:
+            pass
+
+    def url(self, chave: str) -> str:
+        return f"{self.url_base}/{chave}"
+
+    def _gravar(self, chave: str, conteudo: bytes, tipo_conteudo: str):
+        destino = self.pasta / chave
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        # temporário + rename: quem lê nunca encontra um arquivo pela metade,
+        # e dois processos gravando a mesma chave gravam o mesmo conteúdo
+        temporario = destino.with_name(f"{destino.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temporario.write_bytes(conteudo)
+        os.replace(temporario, destino)
+
+
+class ErroClienteS3(Exception):
+    # mesmo formato do botocore.exceptions.ClientError (atributo response)
+    def __init__(self, codigo: str, mensagem: str):
+        super().__init__(mensagem)
+        self.response = {"Error": {"Code": codigo, "Message": mensagem}}
+
+
+class ClienteS3Local:
+    # substituto do cliente do boto3 gravando em uma pasta (um subdiretório
+    # por bucket), para testar o backend S3 sem um serviço de verdade;
+    # implementa apenas as operações usadas por ArmazenamentoS3
+    def __init__(self, pasta: str):
+        self.pasta = Path(pasta)
+
+    def _caminho(self, Bucket: str, Key: str) -> Path:
+        return self.pasta / Bucket / Key
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        caminho = self._caminho(Bucket, Key)
+        if not caminho.is_file():
+            raise ErroClienteS3("404", "Not Found")
+        return {"ContentLength": caminho.stat().st_size}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, ContentType: str = None, CacheControl: str = None) -> dict:
+        caminho = self._caminho(Bucket, Key)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temporario.write_bytes(Body)
+        os.replace(temporario, caminho)
+        return {}
+
+    def delete_object(self, Bucket: str, Key: str) -> dict:
+        try:
+            os.remove(self._caminho(Bucket, Key))
+        except FileNotFoundError:
+            pass
+        return {}
+
+
+class ArmazenamentoS3(ArmazenamentoImagens):
+    # qualquer serviço compatível com S3; os objetos são gravados com
+    # Cache-Control imutável, e url_base normalmente aponta para a CDN
+    def __init__(self, cliente, bucket: str, url_base: str, prefixo: str = "produtos/"):
+        self.cliente = cliente
+        self.bucket = bucket
+        self.url_base = url_base.rstrip("/")
+        self.prefixo = prefixo
+
+    def existe(self, chave: str) -> bool:
+        try:
+            self.cliente.head_object(Bucket=self.bucket, Key=self.prefixo + chave)
+            return True
+        except Exception as ex:
+            codigo = getattr(ex, "response", {}).get("Error", {}).get("Code")
+            if codigo in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def remover(self, chave: str):
+        self.cliente.delete_object(Bucket=self.bucket, Key=self.prefixo + chave)
+
+    def url(self, chave: str) -> str:
+        return f"{self.url_base}/{self.prefixo}{chave}"
+
+    def _gravar(self, chave: str, conteudo: bytes, tipo_conteudo: str):
+        self.cliente.put_object(
+            Bucket=self.bucket,
+            Key=self.prefixo + chave,
+            Body=conteudo,
+            ContentType=tipo_conteudo,
+            CacheControl=CACHE_CONTROL_IMUTAVEL,
+        )
+
+
+def _criar_cliente_s3():
+    pasta_local = os.getenv("IMAGENS_S3_PASTA_LOCAL")
+    if pasta_local:
+        return ClienteS3Local(pasta_local)
+    try:
+        import boto3
+    except ImportError:
+        raise RuntimeError("IMAGENS_ARMAZENAMENTO=s3 requer o pacote boto3 (ou IMAGENS_S3_PASTA_LOCAL).")
+    return boto3.client("s3", endpoint_url=os.getenv("IMAGENS_S3_ENDPOINT") or None)
+
+
+def _criar_armazenamento() -> ArmazenamentoImagens:
+    tipo = os.getenv("IMAGENS_ARMAZENAMENTO", "local")
+    if tipo == "local":
+        return ArmazenamentoLocal()
+    if tipo == "s3":
+        return ArmazenamentoS3(
+            _criar_cliente_s3(),
+            bucket=os.environ["IMAGENS_S3_BUCKET"],
+            url_base=os.environ["IMAGENS_S3_URL_BASE"],
+            prefixo=os.getenv("IMAGENS_S3_PREFIXO", "produtos/"),
+        )
+    raise ValueError(f"IMAGENS_ARMAZENAMENTO inválido: {tipo}")
+
+
+def obter_armazenamento_imagens() -> ArmazenamentoImagens:
+    # um por processo: também é usado nos processos do executor de imagens
+    global _armazenamento, _pid_armazenamento
+    if _armazenamento is None or _pid_armazenamento != os.getpid():
+        with _lock_armazenamento:
+            if _armazenamento is None or _pid_armazenamento != os.getpid():
+                _armazenamento = _criar_armazenamento()
+                _pid_armazenamento = os.getpid()
+    return _armazenamento
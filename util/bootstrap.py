@@ -0,0 +1,147 @@
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+from repositories.categoria_repo import CategoriaRepo
+from repositories.produto_repo import ProdutoRepo
+from repositories.usuario_repo import UsuarioRepo
+from util.database import obter_arquivo_banco, registrar_configuracao, transacao
+from util.migracoes import aplicar_migracoes, obter_versao_atual, obter_versao_mais_recente
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def _bloqueio_arquivo(caminho: str):
+    # bloqueio entre processos: só um worker (ou o CLI) prepara o banco por
+    # vez; os demais esperam e depois encontram o trabalho já feito
+    with open(caminho, "a+b") as arquivo:
+        if fcntl is not None:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+        else:
+            arquivo.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK desiste após ~10s; continua esperando
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+            else:
+                arquivo.seek(0)
+                msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _obter_arquivo_bloqueio() -> str:
+    return obter_arquivo_banco() + ".lock"
+
+
+def carregar_sementes() -> dict:
+    # carga inicial em uma única transação; arquivos sem alteração desde a
+    # última carga são ignorados
+    with transacao():
+        return {
+            "categorias": CategoriaRepo.inserir_categorias_json("sql/categorias.json"),
+            "produtos": ProdutoRepo.inserir_produtos_json("sql/produtos.json"),
+            "usuarios": UsuarioRepo.inserir_usuarios_json("sql/usuarios.json"),
+        }
+
+
+def transferir_imagens_sementes() -> dict:
+    # fora da transação da carga: processar as imagens leva segundos, que
+    # não devem segurar o bloqueio de escrita, e uma imagem com falha não
+    # desfaz a carga; é incremental, então também completa uma execução
+    # anterior interrompida
+    ids_produtos = ProdutoRepo.obter_ids_semente("sql/produtos.json")
+    if ids_produtos is None:
+        return None
+    return ProdutoRepo.transferir_imagens("static/img/produtos/inserir", "static/img/produtos", ids_produtos)
+
+
+def executar_bootstrap(sementes: bool = True) -> dict:
+    inicio = time.perf_counter()
+    with _bloqueio_arquivo(_obter_arquivo_bloqueio()):
+        migracoes = aplicar_migracoes()
+        inseridos = carregar_sementes() if sementes else {}
+        imagens = transferir_imagens_sementes() if sementes else None
+    resumo = {
+        "migracoes": migracoes,
+        "versao": obter_versao_atual(),
+        "inseridos": inseridos,
+        "imagens": imagens,
+        "tempo_ms": round((time.perf_counter() - inicio) * 1000, 1),
+    }
+    logger.info("Bootstrap do banco concluído: %s", resumo)
+    return resumo
+
+
+def inicializar_banco():
+    # executado por cada worker na inicialização (lifespan): apenas confere
+    # a versão do esquema, sem DDL nem carga inicial quando o banco já foi
+    # preparado por "python -m util.bootstrap" ou por outro worker
+    registrar_configuracao()
+    versao_atual = obter_versao_atual()
+    versao_esperada = obter_versao_mais_recente()
+    if versao_atual == versao_esperada:
+        return
+    if versao_atual > versao_esperada:
+        logger.warning(
+            "O banco está na versão %s, mais nova que a esperada pela aplicação (%s).",
+            versao_atual,
+            versao_esperada,
+        )
+        return
+    if os.getenv("DB_BOOTSTRAP_AUTOMATICO", "1") != "1":
+        raise RuntimeError(
+            f"O banco está na versão {versao_atual}, mas a aplicação requer a versão "
+            f"{versao_esperada}. Execute 'python -m util.bootstrap' antes de iniciar."
+        )
+    executar_bootstrap()
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m util.bootstrap",
+        description="Prepara o banco de dados: aplica as migrações e a carga inicial.",
+    )
+    parser.add_argument(
+        "--sem-sementes", action="store_true", help="aplica apenas as migrações"
+    )
+    argumentos = parser.parse_args(argumentos)
+
+    logging.basicConfig(level=logging.INFO)
+    registrar_configuracao()
+    resumo = executar_bootstrap(sementes=not argumentos.sem_sementes)
+    print(
+        f"Banco na versão {resumo['versao']} "
+        f"(migrações aplicadas: {resumo['migracoes'] or 'nenhuma'}; "
+        f"registros inseridos: {resumo['inseridos'] or 'nenhum'}) "
+        f"em {resumo['tempo_ms']} ms."
+    )
+
+
+if __name__ == "__main__":
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except ImportError:
+        pass
+    try:
+        main()
+    except sqlite3.Error as ex:
+        raise SystemExit(f"Erro ao preparar o banco de dados: {ex}")
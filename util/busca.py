@@ -0,0 +1,23 @@
+import re
+import unicodedata
+from typing import Optional
+
+_PALAVRA = re.compile(r"\w+", re.UNICODE)
+
+
+def normalizar_termo(termo: str) -> str:
+    # mesma normalização do tokenizador da produto_fts (minúsculas e sem
+    # acentos): termos equivalentes para a busca viram a mesma string
+    decomposto = unicodedata.normalize("NFKD", (termo or "").lower())
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(_PALAVRA.findall(sem_acentos))
+
+
+def montar_consulta_fts(termo: str) -> Optional[str]:
+    # cada palavra do termo vira um prefixo entre aspas ("celul"* encontra
+    # celular e celulares) e todas precisam aparecer no produto; aspas e
+    # operadores digitados pelo usuário nunca chegam ao MATCH
+    palavras = normalizar_termo(termo).split()
+    if not palavras:
+        return None
+    return " ".join(f'"{palavra}"*' for palavra in palavras)
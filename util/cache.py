@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_caches: dict = {}
+
+
+class CacheLRU:
+    # cache em memória (por processo) com limite de itens e validade: o item
+    # menos usado recentemente sai quando o cache enche e nenhum item é
+    # devolvido depois de "validade" segundos
+    def __init__(self, tamanho_maximo: int = 1000, validade: float = 30.0, nome: Optional[str] = None):
+        self._tamanho_maximo = max(1, tamanho_maximo)
+        self._validade = validade
+        self._itens: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._estatisticas = {"acertos": 0, "faltas": 0, "expirados": 0, "descartados": 0}
+        if nome:
+            _caches[nome] = self
+
+    def obter(self, chave: Hashable, padrao: Any = None) -> Any:
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self._estatisticas["faltas"] += 1
+                return padrao
+            valor, expira_em = item
+            if expira_em <= agora:
+                del self._itens[chave]
+                self._estatisticas["expirados"] += 1
+                self._estatisticas["faltas"] += 1
+                return padrao
+            self._itens.move_to_end(chave)
+            self._estatisticas["acertos"] += 1
+            return valor
+
+    def definir(self, chave: Hashable, valor: Any):
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + self._validade)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self._tamanho_maximo:
+                self._itens.popitem(last=False)
+                self._estatisticas["descartados"] += 1
+
+    def remover(self, chave: Hashable):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            estatisticas = dict(self._estatisticas)
+            estatisticas["itens"] = len(self._itens)
+        consultas = estatisticas["acertos"] + estatisticas["faltas"]
+        estatisticas["taxa_acerto"] = round(estatisticas["acertos"] / consultas, 3) if consultas else 0.0
+        estatisticas["tamanho_maximo"] = self._tamanho_maximo
+        estatisticas["validade"] = self._validade
+        return estatisticas
+
+
+def obter_estatisticas_caches() -> dict:
+    return {nome: cache.estatisticas() for nome, cache in sorted(_caches.items())}
@@ -0,0 +1,120 @@
+import hashlib
+import sqlite3
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from models.categoria_model import Categoria
+from models.produto_model import Produto
+from repositories.categoria_repo import CategoriaRepo
+from repositories.produto_imagem_repo import ProdutoImagemRepo
+from repositories.produto_repo import ProdutoRepo
+from util.catalogo import atualizar_versao_catalogo, obter_versao_catalogo
+from util.database import transacao
+from util.executor_banco import executar_no_banco
+from util.images import montar_imagem_produto
+
+
+@dataclass(frozen=True)
+class SnapshotCatalogo:
+    # retrato somente leitura dos produtos e categorias ativos em uma versão
+    # do catálogo; é compartilhado entre requisições, portanto os objetos
+    # Produto e Categoria contidos nele não devem ser alterados
+    versao: int
+    assinatura: str
+    produtos: Tuple[Produto, ...]
+    produtos_por_id: Mapping[int, Produto]
+    produtos_por_categoria: Mapping[int, Tuple[Produto, ...]]
+    categorias: Tuple[Categoria, ...]
+    categorias_por_id: Mapping[int, Categoria]
+    imagens_por_produto: Mapping[int, Mapping[str, str]]
+
+
+_snapshot: Optional[SnapshotCatalogo] = None
+_lock = threading.Lock()
+_estatisticas = {"acertos": 0, "reconstrucoes": 0}
+
+
+def _construir_snapshot(versao: int) -> SnapshotCatalogo:
+    # as duas leituras na mesma transação enxergam o mesmo estado do banco
+    with transacao(imediata=False):
+        produtos = ProdutoRepo.obter_todos()
+        categorias = CategoriaRepo.obter_todos_ativos()
+        imagens = ProdutoImagemRepo.obter_todas()
+    if produtos is None or imagens is None:
+        raise sqlite3.OperationalError("Não foi possível carregar os produtos do catálogo.")
+    por_categoria = {}
+    for produto in produtos:
+        por_categoria.setdefault(produto.categoria_id, []).append(produto)
+    # resumo do conteúdo: igual em todos os workers para os mesmos dados
+    # (ao contrário da versão local), serve de base para as ETags
+    assinatura = hashlib.sha1(repr((produtos, categorias, imagens)).encode("utf-8")).hexdigest()
+    return SnapshotCatalogo(
+        versao=versao,
+        assinatura=assinatura,
+        produtos=tuple(produtos),
+        produtos_por_id=MappingProxyType({produto.id: produto for produto in produtos}),
+        produtos_por_categoria=MappingProxyType(
+            {categoria_id: tuple(lista) for categoria_id, lista in por_categoria.items()}
+        ),
+        categorias=tuple(categorias),
+        categorias_por_id=MappingProxyType({categoria.id: categoria for categoria in categorias}),
+        imagens_por_produto=MappingProxyType(
+            {id_produto: montar_imagem_produto(id_produto, variantes) for id_produto, variantes in imagens.items()}
+        ),
+    )
+
+
+def _snapshot_atual(versao: int) -> Optional[SnapshotCatalogo]:
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.versao == versao:
+        _estatisticas["acertos"] += 1
+        return snapshot
+    return None
+
+
+def obter_snapshot_catalogo() -> SnapshotCatalogo:
+    global _snapshot
+    # a versão é relida do banco a cada chamada, para que uma escrita de
+    # outro processo não deixe o retrato antigo em uso
+    snapshot = _snapshot_atual(atualizar_versao_catalogo())
+    if snapshot is not None:
+        return snapshot
+    with _lock:
+        # outra thread pode ter reconstruído enquanto esta esperava
+        snapshot = _snapshot_atual(obter_versao_catalogo())
+        if snapshot is not None:
+            return snapshot
+        # a versão é lida antes das consultas: se uma escrita acontecer
+        # durante a reconstrução, a próxima chamada reconstrói de novo
+        snapshot = _construir_snapshot(obter_versao_catalogo())
+        _snapshot = snapshot
+        _estatisticas["reconstrucoes"] += 1
+        return snapshot
+
+
+async def obter_snapshot_catalogo_async() -> SnapshotCatalogo:
+    # sempre pelo executor: mesmo com o retrato em dia, a leitura da versão
+    # consulta o banco
+    return await executar_no_banco(obter_snapshot_catalogo)
+
+
+def obter_imagem_produto(catalogo: Optional[SnapshotCatalogo], id_produto: int) -> Mapping[str, str]:
+    # uso nos templates: imagem_produto(catalogo, p.id), com o retrato que a
+    # rota obteve (obter_snapshot_catalogo_async) antes de renderizar; nunca
+    # consulta o banco, o que bloquearia o event loop durante a renderização
+    imagem = catalogo.imagens_por_produto.get(id_produto) if catalogo else None
+    if imagem is None:
+        imagem = montar_imagem_produto(id_produto)
+    return imagem
+
+
+def obter_estatisticas_cache_catalogo() -> dict:
+    snapshot = _snapshot
+    return {
+        **_estatisticas,
+        "versao": snapshot.versao if snapshot else None,
+        "produtos": len(snapshot.produtos) if snapshot else 0,
+        "categorias": len(snapshot.categorias) if snapshot else 0,
+    }
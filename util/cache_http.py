@@ -0,0 +1,96 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+from fastapi import Request, Response
+
+# respostas pessoais: só o navegador guarda, e sempre confere com o servidor
+# (If-None-Match) antes de reutilizar
+CACHE_CONTROL_PRIVADO = "private, no-cache"
+
+# respostas com mensagens (cookies message_*) não podem ser reaproveitadas
+CACHE_CONTROL_SEM_ARMAZENAMENTO = "private, no-store"
+
+NOMES_COOKIES_MENSAGEM = ("message_success", "message_info", "message_warning", "message_danger")
+
+_versao_templates: Optional[str] = None
+
+
+def _obter_versao_templates() -> str:
+    # o HTML depende também dos templates e dos estáticos: um deploy que os
+    # altere invalida as ETags mesmo sem mudança nos dados (igual em todos os
+    # workers)
+    global _versao_templates
+    if _versao_templates is None:
+        resumo = hashlib.sha1()
+        arquivos = sorted(Path("templates").rglob("*.html"))
+        # o manifesto dos estáticos muda as URLs de CSS/JS no HTML
+        arquivos += [arquivo for arquivo in [Path("static/dist/manifest.json")] if arquivo.exists()]
+        for arquivo in arquivos:
+            resumo.update(arquivo.as_posix().encode("utf-8"))
+            resumo.update(arquivo.read_bytes())
+        _versao_templates = resumo.hexdigest()[:12]
+    return _versao_templates
+
+
+def calcular_etag(*partes) -> str:
+    # ETag fraca: identifica o conteúdo equivalente, não os bytes exatos
+    resumo = hashlib.sha1(_obter_versao_templates().encode("utf-8"))
+    for parte in partes:
+        resumo.update(repr(parte).encode("utf-8"))
+        resumo.update(b"\x00")
+    return f'W/"{resumo.hexdigest()[:20]}"'
+
+
+def obter_cache_control_publico() -> str:
+    # páginas do catálogo sem nada pessoal: podem ficar em caches
+    # compartilhados (CDN, proxy reverso) por CATALOGO_CACHE_PUBLICO_VALIDADE s
+    validade = int(os.getenv("CATALOGO_CACHE_PUBLICO_VALIDADE", "60"))
+    return f"public, max-age={validade}"
+
+
+def possui_mensagens(request: Request) -> bool:
+    return any(request.cookies.get(nome) for nome in NOMES_COOKIES_MENSAGEM)
+
+
+def remover_mensagens(request: Request, response: Response) -> Response:
+    # as mensagens já foram exibidas nesta resposta; sem isso o fragmento do
+    # cabeçalho as mostraria de novo enquanto os cookies não expiram
+    for nome in NOMES_COOKIES_MENSAGEM:
+        if request.cookies.get(nome):
+            response.delete_cookie(nome, httponly=True, samesite="lax")
+    return response
+
+
+def nao_modificado(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # comparação fraca: W/"x" e "x" são equivalentes
+    opaca = etag.removeprefix("W/")
+    return any(
+        candidata.strip().removeprefix("W/") == opaca for candidata in if_none_match.split(",")
+    )
+
+
+def resposta_nao_modificada(etag: str, cache_control: str = CACHE_CONTROL_PRIVADO) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def definir_cabecalhos_cache(
+    response: Response, etag: str, cache_control: str = CACHE_CONTROL_PRIVADO
+) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def finalizar_pagina_publica(request: Request, response: Response, etag: str) -> Response:
+    if possui_mensagens(request):
+        # o corpo traz as mensagens da requisição: vira resposta pessoal
+        response.headers["Cache-Control"] = CACHE_CONTROL_SEM_ARMAZENAMENTO
+        return remover_mensagens(request, response)
+    return definir_cabecalhos_cache(response, etag, obter_cache_control_publico())
@@ -0,0 +1,48 @@
+import os
+from typing import Optional
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from util.cache import CacheLRU
+from util.catalogo import obter_versao_catalogo
+
+_cache_fragmentos: Optional[CacheLRU] = None
+
+
+def _obter_cache_fragmentos() -> CacheLRU:
+    global _cache_fragmentos
+    if _cache_fragmentos is None:
+        _cache_fragmentos = CacheLRU(
+            tamanho_maximo=int(os.getenv("FRAGMENTOS_CACHE_TAMANHO", "200")),
+            validade=float(os.getenv("FRAGMENTOS_CACHE_VALIDADE", "600")),
+            nome="fragmentos",
+        )
+    return _cache_fragmentos
+
+
+class ExtensaoCacheFragmentos(Extension):
+    # uso: {% cache "grid_produtos", categoria_selecionada %}...{% endcache %}
+    # o trecho é renderizado uma vez por combinação de chave e versão do
+    # catálogo; só deve envolver conteúdo que não dependa do usuário
+    tags = {"cache"}
+
+    def parse(self, parser):
+        linha = next(parser.stream).lineno
+        partes = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            partes.append(parser.parse_expression())
+        corpo = parser.parse_statements(("name:endcache",), drop_needle=True)
+        argumentos = [nodes.Const(parser.name), nodes.Const(linha), nodes.List(partes)]
+        return nodes.CallBlock(
+            self.call_method("_renderizar", argumentos), [], [], corpo
+        ).set_lineno(linha)
+
+    def _renderizar(self, template: Optional[str], linha: int, partes: list, caller) -> str:
+        chave = (template, linha, obter_versao_catalogo(), repr(partes))
+        cache = _obter_cache_fragmentos()
+        conteudo = cache.obter(chave)
+        if conteudo is None:
+            conteudo = caller()
+            cache.definir(chave, conteudo)
+        return conteudo
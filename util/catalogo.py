@@ -0,0 +1,132 @@
+import logging
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+from sql.catalogo_sql import SQL_OBTER_VERSAO
+from util.database import apos_confirmar, criar_conexao, obter_conexao
+
+logger = logging.getLogger(__name__)
+
+# versão do catálogo (produtos e categorias) neste processo: é incrementada
+# sempre que a versão do banco muda, e os caches usam a versão como parte
+# da chave, de modo que nenhum resultado anterior à escrita volta a ser servido
+_versao = 0
+_lock = threading.Lock()
+
+# a fonte da verdade é a tabela versao_catalogo, incrementada por gatilhos
+# em produto, categoria e produto_imagem na mesma transação da escrita; antes
+# de usar um cache do catálogo, o caminho da requisição relê a tabela (uma
+# linha pela chave primária, em atualizar_versao_catalogo), de modo que a
+# escrita de outro processo (workers, CLI) é percebida já na requisição
+# seguinte; o monitor em segundo plano é opcional e só mantém a versão em
+# dia para quem a consulta sem passar por essa leitura
+_versao_banco: Optional[int] = None
+_monitor: Optional["_MonitorCatalogo"] = None
+_pid_monitor: Optional[int] = None
+_lock_monitor = threading.Lock()
+
+
+def obter_versao_catalogo() -> int:
+    # não consulta o banco (pode ser chamada no event loop, como nos
+    # templates); a rota deve ter chamado atualizar_versao_catalogo antes
+    _garantir_monitor()
+    return _versao
+
+
+def atualizar_versao_catalogo() -> int:
+    # bloqueia no banco: chamar em uma thread do executor, antes de consultar
+    # o retrato do catálogo ou o cache de buscas
+    _garantir_monitor()
+    _reler_versao_banco()
+    return _versao
+
+
+def _incrementar_versao():
+    global _versao
+    with _lock:
+        _versao += 1
+
+
+def invalidar_catalogo():
+    # chamado pelos repositórios após escrever em produto ou categoria; a
+    # versão do banco já foi incrementada pelos gatilhos, basta relê-la
+    apos_confirmar(lambda: _reler_versao_banco(escrita_local=True))
+
+
+def _reler_versao_banco(escrita_local: bool = False):
+    try:
+        with obter_conexao() as conexao:
+            tupla = conexao.execute(SQL_OBTER_VERSAO).fetchone()
+    except sqlite3.Error as ex:
+        # sem a releitura, a escrita é percebida na próxima delas
+        logger.warning("Não foi possível consultar a versão do catálogo: %s", ex)
+        return
+    if tupla is not None:
+        _observar_versao_banco(int(tupla[0]), escrita_local)
+
+
+def _observar_versao_banco(versao_banco: int, escrita_local: bool = False):
+    # a mesma versão observada duas vezes (releitura e monitor) conta uma só
+    global _versao_banco
+    with _lock:
+        anterior, _versao_banco = _versao_banco, versao_banco
+    if anterior != versao_banco and (anterior is not None or escrita_local):
+        _incrementar_versao()
+
+
+class _MonitorCatalogo(threading.Thread):
+    # consulta a versão do banco em segundo plano, com uma conexão própria
+    # (fora do pool), para que o event loop nunca espere pelo banco
+    def __init__(self, intervalo: float):
+        super().__init__(name="monitor-catalogo", daemon=True)
+        self._intervalo = intervalo
+        self._parar = threading.Event()
+
+    def run(self):
+        conexao = None
+        while True:
+            try:
+                if conexao is None:
+                    conexao = criar_conexao()
+                tupla = conexao.execute(SQL_OBTER_VERSAO).fetchone()
+                if tupla is not None:
+                    _observar_versao_banco(int(tupla[0]))
+            except sqlite3.Error as ex:
+                logger.warning("Não foi possível consultar a versão do catálogo: %s", ex)
+                if conexao is not None:
+                    conexao.close()
+                conexao = None
+            if self._parar.wait(self._intervalo):
+                break
+        if conexao is not None:
+            conexao.close()
+
+    def parar(self):
+        self._parar.set()
+
+
+def _garantir_monitor():
+    global _monitor, _pid_monitor
+    if _pid_monitor == os.getpid():
+        return
+    with _lock_monitor:
+        if _pid_monitor == os.getpid():
+            return
+        intervalo = float(os.getenv("CATALOGO_INTERVALO_VERIFICACAO", "0"))
+        _monitor = None
+        if intervalo > 0:
+            _monitor = _MonitorCatalogo(intervalo)
+            _monitor.start()
+        _pid_monitor = os.getpid()
+
+
+def encerrar_monitor_catalogo():
+    global _monitor, _pid_monitor
+    with _lock_monitor:
+        if _monitor is not None and _pid_monitor == os.getpid():
+            _monitor.parar()
+            _monitor.join(timeout=5)
+        _monitor = None
+        _pid_monitor = None
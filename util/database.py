@@ -1,4 +1,95 @@
+import os
 import sqlite3
+import threading
+from typing import Optional
+
+from util.instrumentacao_sql import ConexaoInstrumentada, instrumentacao_ativa
+from util.perfis_banco import (
+    aplicar_perfil,
+    obter_configuracao_efetiva,
+    obter_nome_perfil,
+    registrar_configuracao_banco,
+)
+from util.pool_conexoes import PoolConexoes, TransacaoRevertidaError
+
+ARQUIVO_BANCO = "dados.db"
+
+_pool: Optional[PoolConexoes] = None
+_pid_pool: Optional[int] = None
+_lock_pool = threading.Lock()
+
+
+def obter_arquivo_banco() -> str:
+    return os.getenv("DB_ARQUIVO", ARQUIVO_BANCO)
+
+
+def criar_conexao() -> sqlite3.Connection:
+    # a conexão pode ser usada por threads diferentes ao longo da vida,
+    # mas nunca por duas ao mesmo tempo (o pool garante isso)
+    fabrica = ConexaoInstrumentada if instrumentacao_ativa() else sqlite3.Connection
+    conexao = sqlite3.connect(obter_arquivo_banco(), check_same_thread=False, factory=fabrica)
+    try:
+        aplicar_perfil(conexao, obter_nome_perfil())
+    except BaseException:
+        conexao.close()
+        raise
+    return conexao
+
+
+def obter_pool() -> PoolConexoes:
+    global _pool, _pid_pool
+    # o pool é criado sob demanda e recriado em processos filhos (workers),
+    # pois conexões SQLite não podem ser compartilhadas entre processos
+    if _pool is None or _pid_pool != os.getpid():
+        with _lock_pool:
+            if _pool is None or _pid_pool != os.getpid():
+                _pool = PoolConexoes(
+                    criar_conexao,
+                    tamanho_maximo=int(os.getenv("DB_POOL_TAMANHO", "10")),
+                    maximo_usos=int(os.getenv("DB_POOL_MAXIMO_USOS", "1000")),
+                    tempo_espera=float(os.getenv("DB_POOL_TEMPO_ESPERA", "30")),
+                    intervalo_verificacao=float(
+                        os.getenv("DB_POOL_INTERVALO_VERIFICACAO", "30")
+                    ),
+                )
+                _pid_pool = os.getpid()
+    return _pool
+
 
 def obter_conexao():
-    return sqlite3.connect("dados.db")
\ No newline at end of file
+    return obter_pool().conexao()
+
+
+def transacao(imediata: bool = True):
+    # uso: with transacao(): ...chamadas aos repositórios...
+    # deve ser executado inteiramente em uma única thread (por exemplo,
+    # dentro de uma função passada para executar_no_banco)
+    return obter_pool().transacao(imediata)
+
+
+def apos_confirmar(funcao):
+    obter_pool().apos_confirmar(funcao)
+
+
+def obter_estatisticas_pool() -> dict:
+    return obter_pool().estatisticas()
+
+
+def obter_configuracao_banco() -> dict:
+    with obter_conexao() as conexao:
+        configuracao = obter_configuracao_efetiva(conexao)
+    return {"perfil": obter_nome_perfil(), "pid": os.getpid(), **configuracao}
+
+
+def registrar_configuracao():
+    with obter_conexao() as conexao:
+        return registrar_configuracao_banco(conexao, obter_nome_perfil())
+
+
+def fechar_pool():
+    global _pool, _pid_pool
+    with _lock_pool:
+        if _pool is not None and _pid_pool == os.getpid():
+            _pool.fechar()
+        _pool = None
+        _pid_pool = None
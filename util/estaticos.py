@@ -0,0 +1,240 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_ESTATICOS = "static"
+PREFIXO_URL = "/static/"
+SUBDIRETORIO_DIST = "dist"
+ARQUIVO_MANIFESTO = "manifest.json"
+
+# arquivos versionados pelo build; as imagens de produtos mudam em tempo de
+# execução (cadastro pelo admin) e ficam de fora
+EXTENSOES_VERSIONADAS = {
+    ".css", ".js", ".svg", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico",
+    ".woff", ".woff2", ".ttf", ".eot",
+}
+EXTENSOES_COMPRIMIVEIS = {".css", ".js", ".svg", ".json", ".txt"}
+# imagens armazenadas por conteúdo (util/armazenamento_imagens.py): como
+# os nomes já são o hash, também são servidas com cache imutável
+SUBDIRETORIO_IMAGENS_CONTEUDO = "img/conteudo"
+DIRETORIOS_IGNORADOS = {SUBDIRETORIO_DIST, "img/produtos", SUBDIRETORIO_IMAGENS_CONTEUDO}
+
+CACHE_CONTROL_IMUTAVEL = "public, max-age=31536000, immutable"
+CACHE_CONTROL_REVALIDAR = "no-cache"
+
+_URL_CSS = re.compile(r"""url\(\s*(['"]?)([^'")]+?)\1\s*\)""")
+
+_manifesto: Optional[Dict[str, str]] = None
+_lock_manifesto = threading.Lock()
+
+
+def _caminho_manifesto(diretorio: str = DIRETORIO_ESTATICOS) -> str:
+    return os.path.join(diretorio, SUBDIRETORIO_DIST, ARQUIVO_MANIFESTO)
+
+
+def _obter_manifesto() -> Dict[str, str]:
+    global _manifesto
+    if _manifesto is None:
+        with _lock_manifesto:
+            if _manifesto is None:
+                try:
+                    with open(_caminho_manifesto(), encoding="utf-8") as arquivo:
+                        _manifesto = json.load(arquivo)
+                except (OSError, ValueError):
+                    # sem build (desenvolvimento): os arquivos originais são usados
+                    _manifesto = {}
+    return _manifesto
+
+
+def estatico(caminho: str) -> str:
+    # uso nos templates: {{ estatico('css/estilos.css') }}
+    caminho = caminho.lstrip("/")
+    return PREFIXO_URL + _obter_manifesto().get(caminho, caminho)
+
+
+def _nome_versionado(caminho: str, conteudo: bytes) -> str:
+    resumo = hashlib.sha256(conteudo).hexdigest()[:12]
+    base, extensao = posixpath.splitext(caminho)
+    return f"{SUBDIRETORIO_DIST}/{base}.{resumo}{extensao}"
+
+
+def _reescrever_urls_css(caminho: str, conteudo: bytes, manifesto: Dict[str, str]) -> bytes:
+    # url(fonts/x.woff2?v=1) passa a apontar para o arquivo versionado; como
+    # dist/ espelha a estrutura original, o caminho relativo continua válido
+    diretorio = posixpath.dirname(caminho)
+
+    def substituir(correspondencia: re.Match) -> str:
+        url = correspondencia.group(2)
+        if url.startswith(("data:", "http:", "https:", "//", "#", "/")):
+            return correspondencia.group(0)
+        alvo, _, fragmento = url.partition("#")
+        alvo = alvo.split("?", 1)[0]
+        destino = manifesto.get(posixpath.normpath(posixpath.join(diretorio, alvo)))
+        if destino is None:
+            return correspondencia.group(0)
+        nova = posixpath.relpath(destino, posixpath.dirname(f"{SUBDIRETORIO_DIST}/{caminho}"))
+        if fragmento:
+            nova += "#" + fragmento
+        return f'url("{nova}")'
+
+    return _URL_CSS.sub(substituir, conteudo.decode("utf-8")).encode("utf-8")
+
+
+def _gravar(destino: Path, conteudo: bytes):
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_name(destino.name + ".tmp")
+    temporario.write_bytes(conteudo)
+    os.replace(temporario, destino)
+
+
+def _gravar_comprimidos(destino: Path, conteudo: bytes) -> list:
+    variantes = [(".gz", gzip.compress(conteudo, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variantes.append((".br", brotli.compress(conteudo, quality=11)))
+    gravadas = []
+    for extensao, comprimido in variantes:
+        # só vale a pena quando fica realmente menor
+        if len(comprimido) < len(conteudo):
+            _gravar(destino.with_name(destino.name + extensao), comprimido)
+            gravadas.append(extensao)
+    return gravadas
+
+
+def construir_estaticos(diretorio: str = DIRETORIO_ESTATICOS) -> dict:
+    # gera static/dist com nomes contendo o hash do conteúdo, variantes .gz
+    # e .br (se o pacote brotli estiver instalado) e o manifesto usado por
+    # estatico(); arquivos de builds anteriores são mantidos, pois páginas
+    # em cache ainda podem referenciá-los
+    raiz = Path(diretorio)
+    arquivos = []
+    for arquivo in sorted(raiz.rglob("*")):
+        relativo = arquivo.relative_to(raiz).as_posix()
+        if not arquivo.is_file() or arquivo.suffix.lower() not in EXTENSOES_VERSIONADAS:
+            continue
+        if any(relativo == d or relativo.startswith(d + "/") for d in DIRETORIOS_IGNORADOS):
+            continue
+        arquivos.append(relativo)
+    # CSS por último, para que as URLs internas já tenham destino no manifesto
+    arquivos.sort(key=lambda relativo: relativo.endswith(".css"))
+    manifesto: Dict[str, str] = {}
+    comprimidos = 0
+    for relativo in arquivos:
+        conteudo = (raiz / relativo).read_bytes()
+        if relativo.endswith(".css"):
+            conteudo = _reescrever_urls_css(relativo, conteudo, manifesto)
+        versionado = _nome_versionado(relativo, conteudo)
+        destino = raiz / versionado
+        if not destino.exists():
+            _gravar(destino, conteudo)
+        if posixpath.splitext(relativo)[1].lower() in EXTENSOES_COMPRIMIVEIS:
+            comprimidos += len(_gravar_comprimidos(destino, conteudo))
+        manifesto[relativo] = versionado
+    _gravar(
+        Path(_caminho_manifesto(diretorio)),
+        json.dumps(manifesto, indent=2, sort_keys=True).encode("utf-8"),
+    )
+    return {"arquivos": len(manifesto), "comprimidos": comprimidos, "brotli": brotli is not None}
+
+
+def _codificacoes_aceitas(accept_encoding: str) -> set:
+    aceitas = set()
+    for item in accept_encoding.split(","):
+        nome, *parametros = [parte.strip() for parte in item.split(";")]
+        qualidade = 1.0
+        for parametro in parametros:
+            if parametro.startswith("q="):
+                try:
+                    qualidade = float(parametro[2:])
+                except ValueError:
+                    qualidade = 0.0
+        if nome and qualidade > 0:
+            aceitas.add(nome.lower())
+    return aceitas
+
+
+class ArquivosEstaticos(StaticFiles):
+    # serve static/ com cache imutável para os arquivos versionados de dist/
+    # e as imagens armazenadas por conteúdo e, quando o navegador aceita, as variantes pré-comprimidas (.br, .gz)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        raiz = os.path.realpath(self.directory)
+        self._diretorios_imutaveis = tuple(
+            os.path.join(raiz, *subdiretorio.split("/")) + os.sep
+            for subdiretorio in (SUBDIRETORIO_DIST, SUBDIRETORIO_IMAGENS_CONTEUDO)
+        )
+        self._variantes: Dict[str, Dict[str, os.stat_result]] = {}
+
+    def _obter_variantes(self, caminho: str) -> Dict[str, os.stat_result]:
+        # os arquivos imutáveis nunca mudam: a consulta ao disco é feita uma vez
+        variantes = self._variantes.get(caminho)
+        if variantes is None:
+            variantes = {}
+            for codificacao, extensao in (("br", ".br"), ("gzip", ".gz")):
+                try:
+                    variantes[codificacao] = os.stat(caminho + extensao)
+                except OSError:
+                    pass
+            self._variantes[caminho] = variantes
+        return variantes
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        caminho = str(full_path)
+        if not caminho.startswith(self._diretorios_imutaveis):
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers["Cache-Control"] = CACHE_CONTROL_REVALIDAR
+            return response
+        cabecalhos = Headers(scope=scope)
+        variantes = self._obter_variantes(caminho)
+        aceitas = _codificacoes_aceitas(cabecalhos.get("accept-encoding", ""))
+        headers = {"Cache-Control": CACHE_CONTROL_IMUTAVEL}
+        if variantes:
+            headers["Vary"] = "Accept-Encoding"
+        arquivo = caminho
+        for codificacao in ("br", "gzip"):
+            if codificacao in variantes and codificacao in aceitas:
+                arquivo = caminho + (".br" if codificacao == "br" else ".gz")
+                stat_result = variantes[codificacao]
+                headers["Content-Encoding"] = codificacao
+                break
+        response = FileResponse(
+            arquivo,
+            status_code=status_code,
+            stat_result=stat_result,
+            headers=headers,
+            media_type=mimetypes.guess_type(caminho)[0] or "application/octet-stream",
+        )
+        if self.is_not_modified(response.headers, cabecalhos):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def main(argumentos=None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    resumo = construir_estaticos()
+    logger.info("Arquivos estáticos gerados: %s", resumo)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
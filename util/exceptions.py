@@ -46,7 +46,9 @@ def configurar_excecoes(app: FastAPI):
     @app.exception_handler(404)
     async def page_not_found_exception_handler(request: Request, _):
         return templates.TemplateResponse(
-            "pages/404.html", {"request": request, "cliente": request.state.usuario}
+            "pages/404.html",
+            {"request": request, "cliente": request.state.usuario},
+            status_code=status.HTTP_404_NOT_FOUND,
         )
 
     @app.exception_handler(HTTPException)
@@ -0,0 +1,112 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, status
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pid_executor: Optional[int] = None
+_lock_executor = threading.Lock()
+_semaforos: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+_estatisticas = {"executadas": 0, "rejeitadas": 0}
+
+
+def _obter_numero_threads() -> int:
+    # por padrão, uma thread por conexão do pool: nenhuma tarefa fica parada
+    # dentro do executor esperando por uma conexão
+    return int(os.getenv("DB_EXECUTOR_THREADS", os.getenv("DB_POOL_TAMANHO", "10")))
+
+
+def _obter_executor() -> ThreadPoolExecutor:
+    global _executor, _pid_executor
+    if _executor is None or _pid_executor != os.getpid():
+        with _lock_executor:
+            if _executor is None or _pid_executor != os.getpid():
+                _executor = ThreadPoolExecutor(
+                    max_workers=_obter_numero_threads(), thread_name_prefix="banco"
+                )
+                _pid_executor = os.getpid()
+    return _executor
+
+
+def _obter_semaforo() -> asyncio.Semaphore:
+    # limita as tarefas em execução + aguardando na fila do executor
+    loop = asyncio.get_running_loop()
+    semaforo = _semaforos.get(loop)
+    if semaforo is None:
+        limite = _obter_numero_threads() + int(os.getenv("DB_EXECUTOR_FILA", "100"))
+        semaforo = asyncio.Semaphore(limite)
+        _semaforos[loop] = semaforo
+    return semaforo
+
+
+async def executar_no_banco(funcao: Callable[..., Any], *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    semaforo = _obter_semaforo()
+    tempo_espera = float(os.getenv("DB_EXECUTOR_TEMPO_ESPERA", "10"))
+    try:
+        await asyncio.wait_for(semaforo.acquire(), tempo_espera)
+    except asyncio.TimeoutError:
+        _estatisticas["rejeitadas"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="O banco de dados está sobrecarregado. Tente novamente em instantes.",
+        )
+    contexto = contextvars.copy_context()
+    try:
+        futuro = _obter_executor().submit(contexto.run, funcao, *args, **kwargs)
+    except BaseException:
+        semaforo.release()
+        raise
+    # a vaga só é liberada quando a thread realmente termina, mesmo que a
+    # requisição seja cancelada antes disso
+    futuro.add_done_callback(lambda _: _liberar_vaga(loop, semaforo))
+    _estatisticas["executadas"] += 1
+    return await asyncio.wrap_future(futuro)
+
+
+def _liberar_vaga(loop: asyncio.AbstractEventLoop, semaforo: asyncio.Semaphore):
+    try:
+        loop.call_soon_threadsafe(semaforo.release)
+    except RuntimeError:
+        # event loop já encerrado (ex.: desligamento do servidor)
+        pass
+
+
+def obter_estatisticas_executor() -> dict:
+    return {"threads": _obter_numero_threads(), **_estatisticas}
+
+
+def encerrar_executor():
+    global _executor, _pid_executor
+    with _lock_executor:
+        if _executor is not None and _pid_executor == os.getpid():
+            _executor.shutdown(wait=True)
+        _executor = None
+        _pid_executor = None
+
+
+class RepoAssincrono:
+    # expõe os mesmos métodos de um repositório síncrono como corrotinas
+    # executadas no executor do banco, sem bloquear o event loop
+    def __init__(self, repo: type):
+        self._repo = repo
+
+    def __getattr__(self, nome: str):
+        metodo = getattr(self._repo, nome)
+        if not callable(metodo):
+            return metodo
+
+        @functools.wraps(metodo)
+        async def executar(*args, **kwargs):
+            return await executar_no_banco(metodo, *args, **kwargs)
+
+        setattr(self, nome, executar)
+        return executar
@@ -0,0 +1,172 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, status
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pid_executor: Optional[int] = None
+_lock_executor = threading.Lock()
+_semaforos: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+_lock_estatisticas = threading.Lock()
+_estatisticas = {
+    "executadas": 0,
+    "rejeitadas": 0,
+    "expiradas": 0,
+    "falhas": 0,
+    "espera_total_ms": 0.0,
+    "espera_maxima_ms": 0.0,
+    "processamento_total_ms": 0.0,
+    "processamento_maximo_ms": 0.0,
+}
+
+
+def _obter_numero_processos() -> int:
+    return int(os.getenv("IMAGENS_PROCESSOS", str(min(2, os.cpu_count() or 1))))
+
+
+def _obter_executor() -> ProcessPoolExecutor:
+    global _executor, _pid_executor
+    if _executor is None or _pid_executor != os.getpid():
+        with _lock_executor:
+            if _executor is None or _pid_executor != os.getpid():
+                # spawn: os processos não herdam as threads e conexões do worker
+                _executor = ProcessPoolExecutor(
+                    max_workers=_obter_numero_processos(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                _pid_executor = os.getpid()
+    return _executor
+
+
+def _obter_semaforo() -> asyncio.Semaphore:
+    # limita as tarefas em execução + aguardando na fila dos processos
+    loop = asyncio.get_running_loop()
+    semaforo = _semaforos.get(loop)
+    if semaforo is None:
+        limite = _obter_numero_processos() + int(os.getenv("IMAGENS_FILA", "8"))
+        semaforo = asyncio.Semaphore(limite)
+        _semaforos[loop] = semaforo
+    return semaforo
+
+
+def _executar_tarefa(funcao: Callable[..., Any], enviada_em: float, *args, **kwargs):
+    # roda no processo de imagens; devolve também os tempos medidos lá
+    inicio = time.time()
+    resultado = funcao(*args, **kwargs)
+    return resultado, inicio - enviada_em, time.time() - inicio
+
+
+def _registrar(chave: str, espera: Optional[float] = None, processamento: Optional[float] = None):
+    with _lock_estatisticas:
+        _estatisticas[chave] += 1
+        if espera is not None:
+            _estatisticas["espera_total_ms"] += espera * 1000
+            _estatisticas["espera_maxima_ms"] = max(_estatisticas["espera_maxima_ms"], espera * 1000)
+        if processamento is not None:
+            _estatisticas["processamento_total_ms"] += processamento * 1000
+            _estatisticas["processamento_maximo_ms"] = max(
+                _estatisticas["processamento_maximo_ms"], processamento * 1000
+            )
+
+
+async def processar_imagem(funcao: Callable[..., Any], *args, **kwargs) -> Any:
+    # executa funcao (de nível de módulo, pois é enviada a outro processo)
+    # fora do event loop; a espera inclui a fila do semáforo e a do pool
+    loop = asyncio.get_running_loop()
+    semaforo = _obter_semaforo()
+    enviada_em = time.time()
+    tempo_espera = float(os.getenv("IMAGENS_TEMPO_ESPERA", "10"))
+    try:
+        await asyncio.wait_for(semaforo.acquire(), tempo_espera)
+    except asyncio.TimeoutError:
+        _registrar("rejeitadas")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="O processamento de imagens está sobrecarregado. Tente novamente em instantes.",
+        )
+    executor = _obter_executor()
+    try:
+        futuro = executor.submit(_executar_tarefa, funcao, enviada_em, *args, **kwargs)
+    except BaseException:
+        semaforo.release()
+        raise
+    # a vaga só é liberada quando o processo realmente termina a tarefa,
+    # mesmo que a requisição desista antes por tempo limite
+    futuro.add_done_callback(lambda _: _liberar_vaga(loop, semaforo))
+    tempo_limite = float(os.getenv("IMAGENS_TEMPO_LIMITE", "30"))
+    try:
+        resultado, espera, processamento = await asyncio.wait_for(
+            asyncio.wrap_future(futuro), tempo_limite
+        )
+    except asyncio.TimeoutError:
+        futuro.cancel()
+        _registrar("expiradas", espera=time.time() - enviada_em)
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="O processamento da imagem demorou demais.",
+        )
+    except BrokenProcessPool:
+        # um processo morreu (ex.: falta de memória): o pool é recriado na
+        # próxima tarefa
+        _registrar("falhas")
+        _descartar_executor(executor)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="O processamento de imagens falhou. Tente novamente em instantes.",
+        )
+    except Exception:
+        _registrar("falhas")
+        raise
+    _registrar("executadas", espera=espera, processamento=processamento)
+    return resultado
+
+
+def _liberar_vaga(loop: asyncio.AbstractEventLoop, semaforo: asyncio.Semaphore):
+    try:
+        loop.call_soon_threadsafe(semaforo.release)
+    except RuntimeError:
+        # event loop já encerrado (ex.: desligamento do servidor)
+        pass
+
+
+def _descartar_executor(executor: ProcessPoolExecutor):
+    global _executor, _pid_executor
+    with _lock_executor:
+        # outra requisição pode já ter recriado o pool
+        if _executor is executor:
+            _executor = None
+            _pid_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def obter_estatisticas_imagens() -> dict:
+    with _lock_estatisticas:
+        estatisticas = dict(_estatisticas)
+    executadas = estatisticas["executadas"]
+    estatisticas["espera_media_ms"] = (
+        round(estatisticas["espera_total_ms"] / executadas, 3) if executadas else 0.0
+    )
+    estatisticas["processamento_medio_ms"] = (
+        round(estatisticas["processamento_total_ms"] / executadas, 3) if executadas else 0.0
+    )
+    for chave in ("espera_total_ms", "espera_maxima_ms", "processamento_total_ms", "processamento_maximo_ms"):
+        estatisticas[chave] = round(estatisticas[chave], 3)
+    return {"processos": _obter_numero_processos(), **estatisticas}
+
+
+def encerrar_executor_imagens():
+    global _executor, _pid_executor
+    with _lock_executor:
+        if _executor is not None and _pid_executor == os.getpid():
+            _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+        _pid_executor = None
@@ -1,4 +1,19 @@
-from PIL import Image
+import glob
+import hashlib
+import io
+import os
+import shutil
+
+from PIL import Image, UnidentifiedImageError
+from PIL.Image import DecompressionBombError
+
+from util.armazenamento_imagens import obter_armazenamento_imagens
+
+
+class ImagemInvalidaError(ValueError):
+    # o arquivo não pôde ser decodificado como imagem; falhas ao gravar no
+    # armazenamento (disco cheio, permissão, S3) não são convertidas nela
+    pass
 
 
 def transformar_em_quadrada(imagem_original, tamanho_maximo=480):
@@ -25,4 +40,162 @@ def transformar_em_quadrada(imagem_original, tamanho_maximo=480):
             (tamanho_maximo, tamanho_maximo), Image.Resampling.LANCZOS
         )
     # retorna a imagem quadrada e redimensionada (quando necessário)
-    return imagem_quadrada
\ No newline at end of file
+    return imagem_quadrada
+
+
+# lados (px) das variantes geradas para cada imagem de produto
+TAMANHOS_VARIANTES = (160, 320, 480)
+QUALIDADE_JPEG = 82
+QUALIDADE_WEBP = 80
+EXTENSOES_IMAGEM = (".jpg", ".jpeg", ".png", ".webp")
+# imagens antigas, com nome fixo ({id:04d}.jpg), anteriores ao armazenamento
+# por conteúdo (util/armazenamento_imagens.py)
+PASTA_IMAGENS_PRODUTOS = "static/img/produtos"
+# imagens como foram enviadas, fora de static/ (não são públicas); servem de
+# fonte para gerar as variantes novamente (python -m util.reprocessar_imagens)
+PASTA_IMAGENS_ORIGINAIS = "imagens_originais"
+# deve ser incrementada sempre que transformar_em_quadrada mudar de forma
+# que exija gerar as variantes novamente
+VERSAO_PROCESSAMENTO = 1
+URL_IMAGENS_PRODUTOS = "/static/img/produtos"
+
+
+def renderizar_variantes(imagem_original):
+    # gera, a partir da imagem enviada, a versão quadrada em todos os
+    # tamanhos de TAMANHOS_VARIANTES, em JPEG progressivo e em WebP;
+    # devolve [(tamanho, extensao, bytes)]
+    imagem_quadrada = transformar_em_quadrada(imagem_original, TAMANHOS_VARIANTES[-1])
+    variantes = []
+    for tamanho in sorted(TAMANHOS_VARIANTES, reverse=True):
+        if imagem_quadrada.size[0] > tamanho:
+            variante = imagem_quadrada.resize((tamanho, tamanho), Image.Resampling.LANCZOS)
+        else:
+            variante = imagem_quadrada
+        buffer = io.BytesIO()
+        variante.save(buffer, "JPEG", quality=QUALIDADE_JPEG, optimize=True, progressive=True)
+        variantes.append((tamanho, "jpg", buffer.getvalue()))
+        buffer = io.BytesIO()
+        variante.save(buffer, "WEBP", quality=QUALIDADE_WEBP, method=6)
+        variantes.append((tamanho, "webp", buffer.getvalue()))
+    return variantes
+
+
+def montar_imagem_produto(id_produto, variantes=None):
+    # atributos de <img>/<source> para os templates, a partir das chaves
+    # registradas em produto_imagem ({(tamanho, extensao): chave}); imagens
+    # antigas, sem variantes registradas, são servidas pelo JPEG original
+    if not variantes:
+        url = f"{URL_IMAGENS_PRODUTOS}/{id_produto:04d}.jpg"
+        return {"src": url, "miniatura": url, "srcset_jpeg": None, "srcset_webp": None}
+    armazenamento = obter_armazenamento_imagens()
+    imagem = {
+        "src": armazenamento.url(variantes[(TAMANHOS_VARIANTES[-1], "jpg")]),
+        "miniatura": armazenamento.url(variantes[(TAMANHOS_VARIANTES[0], "jpg")]),
+    }
+    for extensao, chave in (("jpg", "srcset_jpeg"), ("webp", "srcset_webp")):
+        imagem[chave] = ", ".join(
+            f"{armazenamento.url(variantes[(tamanho, extensao)])} {tamanho}w"
+            for tamanho in TAMANHOS_VARIANTES
+        )
+    return imagem
+
+
+def _normalizar_modo(imagem):
+    # reduce() não aceita os modos 1, P e I;16 (e em P faria a média dos
+    # índices da paleta): PNGs com paleta, GIFs, PNGs em tons de cinza de
+    # 16 bits e imagens de 1 bit são convertidos antes de reduzir
+    if imagem.mode in ("P", "PA"):
+        transparente = imagem.mode == "PA" or "transparency" in imagem.info
+        convertida = imagem.convert("RGBA" if transparente else "RGB")
+    elif imagem.mode == "1":
+        convertida = imagem.convert("L")
+    elif imagem.mode == "I" or imagem.mode.startswith("I;16"):
+        # 16 bits por pixel (0 a 65535) para 8 bits, sem saturar no branco
+        convertida = imagem.convert("I").point(lambda valor: valor * (1 / 256)).convert("L")
+    else:
+        return imagem
+    imagem.close()
+    return convertida
+
+
+def abrir_imagem_reduzida(caminho, lado_minimo=TAMANHOS_VARIANTES[-1]):
+    # abre a imagem já reduzida para perto do tamanho final: em JPEG o
+    # draft() decodifica em escala 1/2, 1/4 ou 1/8 (sem decodificar a foto
+    # inteira); nos demais formatos, reduce() diminui por um fator inteiro
+    # antes do LANCZOS, sempre mantendo o menor lado >= lado_minimo
+    imagem = Image.open(caminho)
+    if imagem.format == "JPEG":
+        imagem.draft("RGB", (lado_minimo, lado_minimo))
+    imagem = _normalizar_modo(imagem)
+    fator = min(imagem.size) // lado_minimo
+    if fator >= 2:
+        reduzida = imagem.reduce(fator)
+        imagem.close()
+        return reduzida
+    return imagem
+
+
+def obter_assinatura_processamento():
+    # muda quando os tamanhos, as qualidades ou a rotina de processamento mudam
+    tamanhos = ",".join(map(str, TAMANHOS_VARIANTES))
+    return f"v{VERSAO_PROCESSAMENTO}:{tamanhos}:{QUALIDADE_JPEG}:{QUALIDADE_WEBP}"
+
+
+def calcular_hash_arquivo(caminho):
+    resumo = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def vincular_ou_copiar(origem, destino):
+    # hardlink quando origem e destino estão no mesmo sistema de arquivos
+    # (nenhum byte copiado); senão, cópia comum; sempre via temporário
+    if os.path.exists(destino) and os.path.samefile(origem, destino):
+        # já vinculados: rename entre dois nomes do mesmo arquivo não faz nada
+        return
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    try:
+        os.link(origem, temporario)
+    except OSError:
+        shutil.copy2(origem, temporario)
+    os.replace(temporario, destino)
+
+
+def obter_pasta_originais():
+    return os.getenv("IMAGENS_PASTA_ORIGINAIS", PASTA_IMAGENS_ORIGINAIS)
+
+
+def guardar_imagem_original(caminho, nome_base):
+    # substitui a original anterior do mesmo produto, qualquer que seja a extensão
+    pasta = obter_pasta_originais()
+    os.makedirs(pasta, exist_ok=True)
+    with Image.open(caminho) as imagem:
+        extensao = (imagem.format or "jpeg").lower().replace("jpeg", "jpg")
+    destino = os.path.join(pasta, f"{nome_base}.{extensao}")
+    for anterior in glob.glob(os.path.join(pasta, glob.escape(nome_base) + ".*")):
+        if anterior != destino:
+            os.remove(anterior)
+    vincular_ou_copiar(caminho, destino)
+    return destino
+
+
+def armazenar_imagem_produto(caminho, nome_base=None):
+    # para o executor de imagens: recebe o caminho do arquivo (que atravessa
+    # o limite entre processos), grava as variantes no armazenamento e
+    # devolve [(tamanho, extensao, chave)] para registro em produto_imagem
+    try:
+        with abrir_imagem_reduzida(caminho) as imagem_original:
+            variantes = renderizar_variantes(imagem_original)
+    except (UnidentifiedImageError, DecompressionBombError, OSError, ValueError) as ex:
+        # OSError aqui vem da decodificação (ex.: arquivo truncado)
+        raise ImagemInvalidaError(str(ex)) from ex
+    armazenamento = obter_armazenamento_imagens()
+    chaves = [
+        (tamanho, extensao, armazenamento.gravar(conteudo, extensao))
+        for tamanho, extensao, conteudo in variantes
+    ]
+    if nome_base is not None:
+        guardar_imagem_original(caminho, nome_base)
+    return chaves
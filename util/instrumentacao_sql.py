@@ -0,0 +1,249 @@
+import importlib
+import logging
+import os
+import pkgutil
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_COMANDOS_COM_PLANO = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+_lock = threading.Lock()
+_consultas: dict = {}
+_nomes_sql: Optional[dict] = None
+
+
+def _normalizar(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def _obter_nomes_sql() -> dict:
+    # mapeia o texto de cada constante SQL_* de sql/*.py para um nome legível
+    # (ex.: "produto_sql.SQL_OBTER_POR_CATEGORIA")
+    global _nomes_sql
+    if _nomes_sql is None:
+        import sql
+
+        nomes = {}
+        modelos = []
+        for modulo in pkgutil.iter_modules(sql.__path__):
+            conteudo = importlib.import_module(f"sql.{modulo.name}")
+            for nome, valor in vars(conteudo).items():
+                if nome.startswith("SQL_") and isinstance(valor, str):
+                    normalizado = _normalizar(valor)
+                    nomes.setdefault(normalizado, f"{modulo.name}.{nome}")
+                    if "#" in normalizado:
+                        # constantes com marcadores (ex.: ORDER BY #1) são
+                        # reconhecidas pelo trecho anterior ao marcador
+                        modelos.append((normalizado.split("#", 1)[0], f"{modulo.name}.{nome}"))
+        modelos.sort(key=lambda modelo: len(modelo[0]), reverse=True)
+        _nomes_sql = {"exatos": nomes, "modelos": modelos}
+    return _nomes_sql
+
+
+def _nomear(sql: str) -> str:
+    normalizado = _normalizar(sql)
+    nomes_sql = _obter_nomes_sql()
+    nome = nomes_sql["exatos"].get(normalizado)
+    if nome is None:
+        nome = next(
+            (nome for prefixo, nome in nomes_sql["modelos"] if normalizado.startswith(prefixo)),
+            None,
+        )
+    if nome is None:
+        # comandos montados no código (PRAGMA, BEGIN, migrações etc.)
+        nome = "avulso: " + normalizado[:80]
+    return nome
+
+
+def _obter_limite_lenta_ms() -> float:
+    return float(os.getenv("DB_SQL_LIMITE_LENTA_MS", "100"))
+
+
+def _percentil(amostras: list, percentual: float) -> float:
+    indice = min(len(amostras) - 1, int(round(percentual / 100 * (len(amostras) - 1))))
+    return amostras[indice]
+
+
+class _Medicao:
+    __slots__ = ("cursor", "sql", "parametros", "varias", "duracao")
+
+    def __init__(self, cursor, sql: str, parametros, varias: bool, duracao: float):
+        self.cursor = cursor
+        self.sql = sql
+        self.parametros = parametros
+        self.varias = varias
+        self.duracao = duracao
+
+
+class CursorInstrumentado(sqlite3.Cursor):
+    # o tempo de uma consulta inclui o execute e as leituras (fetch*) feitas
+    # até o próximo comando, commit, rollback ou fechamento da conexão
+    def execute(self, sql, parametros=()):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self.connection._iniciar_medicao(
+                self, sql, parametros, False, time.perf_counter() - inicio
+            )
+
+    def executemany(self, sql, sequencia_parametros):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, sequencia_parametros)
+        finally:
+            self.connection._iniciar_medicao(
+                self, sql, None, True, time.perf_counter() - inicio
+            )
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self.connection._acumular_medicao(self, time.perf_counter() - inicio)
+
+    def fetchmany(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return super().fetchmany(*args, **kwargs)
+        finally:
+            self.connection._acumular_medicao(self, time.perf_counter() - inicio)
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self.connection._acumular_medicao(self, time.perf_counter() - inicio)
+            self.connection._finalizar_medicao()
+
+
+class ConexaoInstrumentada(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._medicao: Optional[_Medicao] = None
+
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, sequencia_parametros):
+        return self.cursor().executemany(sql, sequencia_parametros)
+
+    def commit(self):
+        self._finalizar_medicao()
+        super().commit()
+
+    def rollback(self):
+        self._finalizar_medicao()
+        super().rollback()
+
+    def close(self):
+        self._finalizar_medicao()
+        super().close()
+
+    def _iniciar_medicao(self, cursor, sql, parametros, varias, duracao):
+        self._finalizar_medicao()
+        self._medicao = _Medicao(cursor, sql, parametros, varias, duracao)
+
+    def _acumular_medicao(self, cursor, duracao):
+        if self._medicao is not None and self._medicao.cursor is cursor:
+            self._medicao.duracao += duracao
+
+    def _finalizar_medicao(self):
+        medicao, self._medicao = self._medicao, None
+        if medicao is None:
+            return
+        duracao_ms = medicao.duracao * 1000
+        nome = _nomear(medicao.sql)
+        _registrar(nome, medicao.sql, duracao_ms)
+        if duracao_ms >= _obter_limite_lenta_ms():
+            logger.warning(
+                "Consulta lenta (%.1f ms): %s\n%s\nPlano:\n%s",
+                duracao_ms,
+                nome,
+                _normalizar(medicao.sql),
+                self._obter_plano(medicao),
+            )
+
+    def _obter_plano(self, medicao: _Medicao) -> str:
+        comando = medicao.sql.lstrip().split(None, 1)[0].upper() if medicao.sql.strip() else ""
+        if medicao.varias or comando not in _COMANDOS_COM_PLANO:
+            return "  (indisponível)"
+        try:
+            # cursor base, para que o EXPLAIN não seja medido novamente
+            linhas = sqlite3.Cursor(self).execute(
+                "EXPLAIN QUERY PLAN " + medicao.sql, medicao.parametros
+            ).fetchall()
+        except sqlite3.Error as ex:
+            return f"  (erro ao obter o plano: {ex})"
+        profundidades = {0: 0}
+        saida = []
+        for id_linha, id_pai, _, detalhe in linhas:
+            profundidade = profundidades.get(id_pai, 0) + 1
+            profundidades[id_linha] = profundidade
+            saida.append("  " * profundidade + detalhe)
+        return "\n".join(saida) or "  (sem plano)"
+
+
+def _registrar(nome: str, sql: str, duracao_ms: float):
+    with _lock:
+        consulta = _consultas.get(nome)
+        if consulta is None:
+            consulta = {
+                "sql": _normalizar(sql),
+                "quantidade": 0,
+                "total_ms": 0.0,
+                "maximo_ms": 0.0,
+                "lentas": 0,
+                "amostras": deque(maxlen=int(os.getenv("DB_SQL_AMOSTRAS", "1000"))),
+            }
+            _consultas[nome] = consulta
+        consulta["quantidade"] += 1
+        consulta["total_ms"] += duracao_ms
+        consulta["maximo_ms"] = max(consulta["maximo_ms"], duracao_ms)
+        if duracao_ms >= _obter_limite_lenta_ms():
+            consulta["lentas"] += 1
+        consulta["amostras"].append(duracao_ms)
+
+
+def obter_estatisticas_sql() -> list:
+    # percentis calculados sobre as últimas DB_SQL_AMOSTRAS execuções de cada
+    # comando; ordenado pelo tempo total gasto
+    with _lock:
+        copias = [(nome, dict(c), sorted(c["amostras"])) for nome, c in _consultas.items()]
+    estatisticas = []
+    for nome, consulta, amostras in copias:
+        estatisticas.append(
+            {
+                "nome": nome,
+                "sql": consulta["sql"],
+                "quantidade": consulta["quantidade"],
+                "total_ms": round(consulta["total_ms"], 3),
+                "media_ms": round(consulta["total_ms"] / consulta["quantidade"], 3),
+                "p50_ms": round(_percentil(amostras, 50), 3),
+                "p95_ms": round(_percentil(amostras, 95), 3),
+                "p99_ms": round(_percentil(amostras, 99), 3),
+                "maximo_ms": round(consulta["maximo_ms"], 3),
+                "lentas": consulta["lentas"],
+            }
+        )
+    estatisticas.sort(key=lambda e: e["total_ms"], reverse=True)
+    return estatisticas
+
+
+def limpar_estatisticas_sql():
+    with _lock:
+        _consultas.clear()
+
+
+def instrumentacao_ativa() -> bool:
+    return os.getenv("DB_INSTRUMENTACAO", "1") == "1"
@@ -0,0 +1,86 @@
+import argparse
+import logging
+import sqlite3
+from datetime import datetime
+from typing import List, Optional
+
+from sql.migracoes_sql import *
+from util.database import obter_conexao, transacao
+
+logger = logging.getLogger(__name__)
+
+
+def obter_versao_mais_recente() -> int:
+    return max(versao for versao, _, _ in MIGRACOES)
+
+
+def obter_versao_atual() -> int:
+    with obter_conexao() as conexao:
+        conexao.execute(SQL_CRIAR_TABELA_VERSAO)
+        return int(conexao.execute(SQL_OBTER_VERSAO_ATUAL).fetchone()[0])
+
+
+def obter_versoes_aplicadas() -> List[tuple]:
+    with obter_conexao() as conexao:
+        conexao.execute(SQL_CRIAR_TABELA_VERSAO)
+        return conexao.execute(SQL_OBTER_VERSOES).fetchall()
+
+
+def aplicar_migracoes(versao_alvo: Optional[int] = None) -> List[int]:
+    versao_alvo = versao_alvo or obter_versao_mais_recente()
+    aplicadas = []
+    for versao, descricao, comandos in sorted(MIGRACOES, key=lambda m: m[0]):
+        if versao > versao_alvo:
+            break
+        # uma transação por migração: BEGIN IMMEDIATE serializa processos
+        # concorrentes, e a versão é conferida de novo já com o lock obtido
+        with transacao() as conexao:
+            conexao.execute(SQL_CRIAR_TABELA_VERSAO)
+            versao_atual = conexao.execute(SQL_OBTER_VERSAO_ATUAL).fetchone()[0]
+            if versao <= versao_atual:
+                continue
+            for comando in comandos:
+                conexao.execute(comando)
+            conexao.execute(SQL_REGISTRAR_VERSAO, (versao, descricao, datetime.now()))
+        logger.info("Migração %03d aplicada: %s", versao, descricao)
+        aplicadas.append(versao)
+    if aplicadas:
+        with obter_conexao() as conexao:
+            conexao.execute("PRAGMA optimize")
+    return aplicadas
+
+
+def main(argumentos: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m util.migracoes",
+        description="Aplica ou lista as migrações do banco de dados.",
+    )
+    subcomandos = parser.add_subparsers(dest="comando")
+    subcomandos.add_parser("status", help="mostra as versões aplicadas e pendentes")
+    aplicar = subcomandos.add_parser("aplicar", help="aplica as migrações pendentes")
+    aplicar.add_argument("--ate", type=int, default=None, help="versão alvo")
+    argumentos = parser.parse_args(argumentos)
+
+    logging.basicConfig(level=logging.INFO)
+    if argumentos.comando == "aplicar":
+        aplicadas = aplicar_migracoes(argumentos.ate)
+        if not aplicadas:
+            print("Nenhuma migração pendente.")
+        return
+    versoes = {versao: aplicada_em for versao, _, aplicada_em in obter_versoes_aplicadas()}
+    for versao, descricao, _ in MIGRACOES:
+        situacao = f"aplicada em {versoes[versao]}" if versao in versoes else "pendente"
+        print(f"{versao:03d} {descricao}: {situacao}")
+
+
+if __name__ == "__main__":
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except ImportError:
+        pass
+    try:
+        main()
+    except sqlite3.Error as ex:
+        raise SystemExit(f"Erro ao executar as migrações: {ex}")
@@ -0,0 +1,37 @@
+import base64
+import binascii
+import json
+from typing import Optional, Tuple
+
+# ordens que aceitam paginação por cursor (ver ProdutoRepo.obter_busca):
+# 1 = nome, 2 = menor preço, 3 = maior preço
+ORDENS_COM_CURSOR = {1: "nome", 2: "preco", 3: "preco"}
+
+
+def criar_cursor(ordem: int, produto) -> Optional[str]:
+    # o cursor guarda a chave de ordenação e o id do último produto da
+    # página; a próxima página começa logo depois dele, sem OFFSET
+    coluna = ORDENS_COM_CURSOR.get(ordem)
+    if coluna is None or produto is None:
+        return None
+    dados = json.dumps([ordem, getattr(produto, coluna), produto.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(dados.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def ler_cursor(cursor: Optional[str], ordem: int) -> Optional[Tuple]:
+    # cursores inválidos ou de outra ordenação são ignorados e a busca volta
+    # para a paginação por número de página
+    if not cursor or ordem not in ORDENS_COM_CURSOR:
+        return None
+    try:
+        dados = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ordem_cursor, valor, id = json.loads(dados.decode("utf-8"))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        return None
+    if ordem_cursor != ordem or not isinstance(id, int):
+        return None
+    if ORDENS_COM_CURSOR[ordem] == "nome" and not isinstance(valor, str):
+        return None
+    if ORDENS_COM_CURSOR[ordem] == "preco" and not isinstance(valor, (int, float)):
+        return None
+    return valor, id
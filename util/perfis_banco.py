@@ -0,0 +1,98 @@
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+PERFIL_PADRAO = "dev"
+
+# cache_size negativo é expresso em KiB (ex.: -16000 ≈ 16 MB de cache de páginas)
+PERFIS_BANCO = {
+    "dev": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -2000,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+    "prod-safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "mmap_size": 64 * 1024 * 1024,
+        "cache_size": -16000,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "prod-fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+
+_NOMES_SYNCHRONOUS = {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}
+_NOMES_TEMP_STORE = {0: "DEFAULT", 1: "FILE", 2: "MEMORY"}
+
+
+def obter_nome_perfil() -> str:
+    nome = os.getenv("DB_PERFIL", PERFIL_PADRAO).strip().lower()
+    if nome not in PERFIS_BANCO:
+        raise ValueError(
+            f"Perfil de banco '{nome}' inválido. Use um dos seguintes: {', '.join(PERFIS_BANCO)}."
+        )
+    return nome
+
+
+def aplicar_perfil(conexao: sqlite3.Connection, nome_perfil: str):
+    perfil = PERFIS_BANCO[nome_perfil]
+    # busy_timeout primeiro, para que a troca de journal_mode espere por
+    # outros processos em vez de falhar com "database is locked"
+    conexao.execute(f"PRAGMA busy_timeout = {int(perfil['busy_timeout'])}")
+    conexao.execute(f"PRAGMA journal_mode = {perfil['journal_mode']}").fetchone()
+    conexao.execute(f"PRAGMA synchronous = {perfil['synchronous']}")
+    conexao.execute(f"PRAGMA mmap_size = {int(perfil['mmap_size'])}").fetchone()
+    conexao.execute(f"PRAGMA cache_size = {int(perfil['cache_size'])}")
+    conexao.execute(f"PRAGMA temp_store = {perfil['temp_store']}")
+
+
+def obter_configuracao_efetiva(conexao: sqlite3.Connection) -> dict:
+    def ler(pragma: str):
+        return conexao.execute(f"PRAGMA {pragma}").fetchone()[0]
+
+    return {
+        "journal_mode": str(ler("journal_mode")).upper(),
+        "synchronous": _NOMES_SYNCHRONOUS.get(ler("synchronous"), "?"),
+        "mmap_size": ler("mmap_size"),
+        "cache_size": ler("cache_size"),
+        "temp_store": _NOMES_TEMP_STORE.get(ler("temp_store"), "?"),
+        "busy_timeout": ler("busy_timeout"),
+    }
+
+
+def registrar_configuracao_banco(conexao: sqlite3.Connection, nome_perfil: str) -> dict:
+    efetiva = obter_configuracao_efetiva(conexao)
+    esperada = PERFIS_BANCO[nome_perfil]
+    divergencias = [
+        chave
+        for chave, valor in esperada.items()
+        if str(efetiva[chave]).upper() != str(valor).upper()
+    ]
+    logger.info(
+        "Banco de dados (pid %s) usando o perfil '%s': %s",
+        os.getpid(),
+        nome_perfil,
+        ", ".join(f"{chave}={valor}" for chave, valor in efetiva.items()),
+    )
+    if divergencias:
+        # ex.: mmap_size limitado pelo SQLite compilado ou journal_mode WAL
+        # indisponível no sistema de arquivos
+        logger.warning(
+            "Configurações do banco diferentes do perfil '%s': %s",
+            nome_perfil,
+            ", ".join(f"{chave}={efetiva[chave]} (esperado {esperada[chave]})" for chave in divergencias),
+        )
+    return efetiva
@@ -0,0 +1,313 @@
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+
+class _EntradaPool:
+    __slots__ = ("conexao", "usos", "ultimo_uso")
+
+    def __init__(self, conexao: sqlite3.Connection):
+        self.conexao = conexao
+        self.usos = 0
+        self.ultimo_uso = time.monotonic()
+
+
+class _CheckoutConexao:
+    # Equivalente ao "with sqlite3.connect(...) as conexao": confirma a
+    # transação ao sair sem erro, desfaz em caso de exceção e, ao final,
+    # devolve a conexão ao pool em vez de deixá-la aberta.
+    def __init__(self, pool: "PoolConexoes"):
+        self._pool = pool
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self._pool.adquirir()
+
+    def __exit__(self, tipo_excecao, excecao, traceback) -> bool:
+        self._pool.liberar(sucesso=tipo_excecao is None)
+        return False
+
+
+class _TransacaoPool:
+    # unidade de trabalho: todas as chamadas a obter_conexao() feitas na
+    # mesma thread dentro do bloco compartilham a conexão e a transação,
+    # com um único commit no final (ou rollback se algo falhar)
+    def __init__(self, pool: "PoolConexoes", imediata: bool):
+        self._pool = pool
+        self._imediata = imediata
+        self._principal = False
+
+    def __enter__(self) -> sqlite3.Connection:
+        conexao = self._pool.adquirir()
+        local = self._pool._local
+        if getattr(local, "transacao", False) or local.savepoints:
+            # dentro de outra unidade de trabalho ou de um checkout já
+            # aberto (neste caso, adquirir() abriu um SAVEPOINT)
+            return conexao
+        self._principal = True
+        local.transacao = True
+        local.transacao_falhou = False
+        try:
+            if conexao.in_transaction:
+                conexao.commit()
+            conexao.execute("BEGIN IMMEDIATE" if self._imediata else "BEGIN")
+        except BaseException:
+            local.transacao = False
+            self._pool.liberar(sucesso=False)
+            raise
+        return conexao
+
+    def __exit__(self, tipo_excecao, excecao, traceback) -> bool:
+        local = self._pool._local
+        if not self._principal:
+            self._pool.liberar(sucesso=tipo_excecao is None)
+            return False
+        falhou = local.transacao_falhou
+        local.transacao = False
+        local.transacao_falhou = False
+        self._pool.liberar(sucesso=tipo_excecao is None and not falhou)
+        if falhou and tipo_excecao is None:
+            # os repositórios capturam sqlite3.Error e retornam None/False;
+            # aqui a falha volta a ser visível para quem abriu a transação
+            raise TransacaoRevertidaError(
+                "A transação foi desfeita porque uma das operações falhou."
+            )
+        return False
+
+
+class TransacaoRevertidaError(sqlite3.DatabaseError):
+    pass
+
+
+class PoolConexoes:
+    def __init__(
+        self,
+        fabrica: Callable[[], sqlite3.Connection],
+        tamanho_maximo: int = 10,
+        maximo_usos: int = 1000,
+        tempo_espera: float = 30.0,
+        intervalo_verificacao: float = 30.0,
+    ):
+        self._fabrica = fabrica
+        self._tamanho_maximo = max(1, tamanho_maximo)
+        self._maximo_usos = max(1, maximo_usos)
+        self._tempo_espera = tempo_espera
+        self._intervalo_verificacao = intervalo_verificacao
+        self._ociosas: list[_EntradaPool] = []
+        self._abertas = 0
+        self._em_uso = 0
+        self._condicao = threading.Condition()
+        self._local = threading.local()
+        self._estatisticas = {
+            "checkouts": 0,
+            "esperas": 0,
+            "tempo_total_espera_ms": 0.0,
+            "tempo_maximo_espera_ms": 0.0,
+            "timeouts": 0,
+            "maximo_em_uso": 0,
+            "criadas": 0,
+            "recicladas": 0,
+            "descartadas": 0,
+        }
+
+    def conexao(self) -> _CheckoutConexao:
+        return _CheckoutConexao(self)
+
+    def transacao(self, imediata: bool = True) -> _TransacaoPool:
+        return _TransacaoPool(self, imediata)
+
+    def adquirir(self) -> sqlite3.Connection:
+        # cada thread usa uma única conexão por vez; chamadas aninhadas na
+        # mesma thread reaproveitam a conexão já retirada do pool
+        entrada: Optional[_EntradaPool] = getattr(self._local, "entrada", None)
+        if entrada is not None:
+            if not getattr(self._local, "transacao", False):
+                self._abrir_savepoint(entrada.conexao)
+            self._local.profundidade += 1
+            return entrada.conexao
+        entrada = self._retirar()
+        self._local.entrada = entrada
+        self._local.profundidade = 1
+        self._local.apos_confirmar = []
+        self._local.savepoints = []
+        return entrada.conexao
+
+    def _abrir_savepoint(self, conexao: sqlite3.Connection):
+        # checkout aninhado fora de uma unidade de trabalho: o trabalho
+        # interno fica em um SAVEPOINT, para que só a liberação mais externa
+        # confirme ou desfaça a transação de quem retirou a conexão primeiro
+        if not conexao.in_transaction:
+            conexao.execute("BEGIN")
+        nome = f"aninhada_{len(self._local.savepoints) + 1}"
+        conexao.execute(f"SAVEPOINT {nome}")
+        self._local.savepoints.append((nome, len(self._local.apos_confirmar)))
+
+    def _fechar_savepoint(self, conexao: sqlite3.Connection, sucesso: bool):
+        nome, pendentes = self._local.savepoints.pop()
+        try:
+            if not sucesso:
+                conexao.execute(f"ROLLBACK TO SAVEPOINT {nome}")
+                # chamadas registradas pelo trabalho desfeito não devem rodar
+                del self._local.apos_confirmar[pendentes:]
+            conexao.execute(f"RELEASE SAVEPOINT {nome}")
+        finally:
+            self._local.profundidade -= 1
+
+    def liberar(self, sucesso: bool = True):
+        entrada: Optional[_EntradaPool] = getattr(self._local, "entrada", None)
+        if entrada is None:
+            return
+        if getattr(self._local, "transacao", False):
+            # dentro de uma unidade de trabalho só quem a abriu confirma ou
+            # desfaz; as chamadas internas apenas registram a falha
+            if not sucesso:
+                self._local.transacao_falhou = True
+            self._local.profundidade -= 1
+            return
+        if self._local.savepoints:
+            self._fechar_savepoint(entrada.conexao, sucesso)
+            return
+        try:
+            if sucesso:
+                entrada.conexao.commit()
+            else:
+                entrada.conexao.rollback()
+        except sqlite3.Error:
+            self._local.profundidade = 0
+            self._local.entrada = None
+            self._local.apos_confirmar = []
+            self._local.savepoints = []
+            self._descartar(entrada)
+            raise
+        apos_confirmar = self._local.apos_confirmar if sucesso else []
+        self._local.apos_confirmar = []
+        self._local.profundidade -= 1
+        if self._local.profundidade == 0:
+            self._local.entrada = None
+            self._devolver(entrada)
+        for funcao in apos_confirmar:
+            funcao()
+
+    def apos_confirmar(self, funcao: Callable[[], None]):
+        # adia a chamada até o commit da conexão em uso nesta thread (ou da
+        # unidade de trabalho); é descartada se houver rollback
+        if getattr(self._local, "entrada", None) is None:
+            funcao()
+        else:
+            self._local.apos_confirmar.append(funcao)
+
+    def estatisticas(self) -> dict:
+        with self._condicao:
+            estatisticas = dict(self._estatisticas)
+            estatisticas.update(
+                {
+                    "tamanho_maximo": self._tamanho_maximo,
+                    "maximo_usos": self._maximo_usos,
+                    "abertas": self._abertas,
+                    "em_uso": self._em_uso,
+                    "ociosas": len(self._ociosas),
+                }
+            )
+        estatisticas["tempo_total_espera_ms"] = round(estatisticas["tempo_total_espera_ms"], 3)
+        estatisticas["tempo_maximo_espera_ms"] = round(estatisticas["tempo_maximo_espera_ms"], 3)
+        return estatisticas
+
+    def fechar(self):
+        with self._condicao:
+            ociosas, self._ociosas = self._ociosas, []
+            self._abertas -= len(ociosas)
+            self._condicao.notify_all()
+        for entrada in ociosas:
+            self._fechar_silenciosamente(entrada.conexao)
+
+    def _retirar(self) -> _EntradaPool:
+        inicio = time.monotonic()
+        prazo = inicio + self._tempo_espera
+        esperou = False
+        entrada: Optional[_EntradaPool] = None
+        with self._condicao:
+            self._estatisticas["checkouts"] += 1
+            while True:
+                if self._ociosas:
+                    entrada = self._ociosas.pop()
+                    break
+                if self._abertas < self._tamanho_maximo:
+                    self._abertas += 1
+                    break
+                if not esperou:
+                    esperou = True
+                    self._estatisticas["esperas"] += 1
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    self._estatisticas["timeouts"] += 1
+                    raise sqlite3.OperationalError(
+                        f"Nenhuma conexão disponível no pool após {self._tempo_espera}s."
+                    )
+                self._condicao.wait(restante)
+            self._em_uso += 1
+            if self._em_uso > self._estatisticas["maximo_em_uso"]:
+                self._estatisticas["maximo_em_uso"] = self._em_uso
+            if esperou:
+                espera_ms = (time.monotonic() - inicio) * 1000
+                self._estatisticas["tempo_total_espera_ms"] += espera_ms
+                if espera_ms > self._estatisticas["tempo_maximo_espera_ms"]:
+                    self._estatisticas["tempo_maximo_espera_ms"] = espera_ms
+        try:
+            if entrada is not None and not self._saudavel(entrada):
+                self._fechar_silenciosamente(entrada.conexao)
+                self._contar("descartadas")
+                entrada = None
+            if entrada is None:
+                entrada = _EntradaPool(self._fabrica())
+                self._contar("criadas")
+        except BaseException:
+            with self._condicao:
+                self._abertas -= 1
+                self._em_uso -= 1
+                self._condicao.notify()
+            raise
+        return entrada
+
+    def _saudavel(self, entrada: _EntradaPool) -> bool:
+        if time.monotonic() - entrada.ultimo_uso < self._intervalo_verificacao:
+            return True
+        try:
+            entrada.conexao.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _devolver(self, entrada: _EntradaPool):
+        entrada.usos += 1
+        if entrada.usos >= self._maximo_usos:
+            self._fechar_silenciosamente(entrada.conexao)
+            with self._condicao:
+                self._estatisticas["recicladas"] += 1
+                self._abertas -= 1
+                self._em_uso -= 1
+                self._condicao.notify()
+            return
+        entrada.ultimo_uso = time.monotonic()
+        with self._condicao:
+            self._ociosas.append(entrada)
+            self._em_uso -= 1
+            self._condicao.notify()
+
+    def _descartar(self, entrada: _EntradaPool):
+        self._fechar_silenciosamente(entrada.conexao)
+        with self._condicao:
+            self._estatisticas["descartadas"] += 1
+            self._abertas -= 1
+            self._em_uso -= 1
+            self._condicao.notify()
+
+    def _contar(self, chave: str):
+        with self._condicao:
+            self._estatisticas[chave] += 1
+
+    @staticmethod
+    def _fechar_silenciosamente(conexao: sqlite3.Connection):
+        try:
+            conexao.close()
+        except sqlite3.Error:
+            pass
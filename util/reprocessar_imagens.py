@@ -0,0 +1,193 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from repositories.produto_imagem_repo import ProdutoImagemRepo
+from repositories.produto_repo import ProdutoRepo
+from util.armazenamento_imagens import obter_armazenamento_imagens
+from util.images import (
+    EXTENSOES_IMAGEM,
+    PASTA_IMAGENS_PRODUTOS,
+    armazenar_imagem_produto,
+    calcular_hash_arquivo,
+    obter_assinatura_processamento,
+    obter_pasta_originais,
+    vincular_ou_copiar,
+)
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_MANIFESTO = "manifesto.json"
+# o manifesto é gravado a cada tantas imagens: uma execução interrompida
+# retoma de onde parou
+INTERVALO_GRAVACAO_MANIFESTO = 20
+
+_VARIANTE = re.compile(r"-\d+$")
+
+
+def _caminho_manifesto(pasta_originais: Path) -> Path:
+    return pasta_originais / ARQUIVO_MANIFESTO
+
+
+def _ler_manifesto(pasta_originais: Path) -> Dict[str, dict]:
+    try:
+        with open(_caminho_manifesto(pasta_originais), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+
+def _gravar_manifesto(pasta_originais: Path, manifesto: Dict[str, dict]):
+    destino = _caminho_manifesto(pasta_originais)
+    temporario = destino.with_name(destino.name + ".tmp")
+    temporario.write_text(json.dumps(manifesto, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(temporario, destino)
+
+
+def _obter_id_produto(nome_base: str) -> Optional[int]:
+    # as originais são nomeadas pelo id do produto (0001.jpg)
+    return int(nome_base) if nome_base.isdigit() else None
+
+
+def _listar_originais(
+    pasta_originais: Path, pasta_imagens: Path, ids_produtos: Set[int]
+) -> Tuple[Dict[str, Path], List[str]]:
+    # imagens enviadas antes de as originais serem guardadas só existem como
+    # {nome}.jpg em static/: essa cópia passa a ser a original; imagens sem
+    # produto correspondente (órfãs) são devolvidas à parte
+    originais = {}
+    orfas = []
+    for arquivo in sorted(pasta_originais.glob("*")):
+        if not arquivo.is_file() or arquivo.suffix.lower() not in EXTENSOES_IMAGEM:
+            continue
+        if _obter_id_produto(arquivo.stem) in ids_produtos:
+            originais[arquivo.stem] = arquivo
+        else:
+            orfas.append(arquivo.name)
+    for arquivo in sorted(pasta_imagens.glob("*.jpg")):
+        if arquivo.stem in originais or _VARIANTE.search(arquivo.stem):
+            continue
+        if _obter_id_produto(arquivo.stem) not in ids_produtos:
+            orfas.append(f"{pasta_imagens.as_posix()}/{arquivo.name}")
+            continue
+        destino = pasta_originais / arquivo.name
+        vincular_ou_copiar(str(arquivo), str(destino))
+        originais[arquivo.stem] = destino
+    return originais, orfas
+
+
+def _variantes_armazenadas(registro: dict) -> bool:
+    armazenamento = obter_armazenamento_imagens()
+    chaves = registro.get("chaves") or []
+    return bool(chaves) and all(armazenamento.existe(chave) for chave in chaves)
+
+
+def reprocessar_imagens(processos: int = None, forcar: bool = False) -> dict:
+    # gera novamente as variantes de todas as imagens de produtos a partir
+    # das originais, em paralelo, e as registra em produto_imagem; imagens
+    # cuja original (hash) e assinatura de processamento não mudaram desde
+    # a última execução são ignoradas, e as de produtos inexistentes também
+    pasta_originais = Path(obter_pasta_originais())
+    pasta_imagens = Path(PASTA_IMAGENS_PRODUTOS)
+    pasta_originais.mkdir(parents=True, exist_ok=True)
+    assinatura = obter_assinatura_processamento()
+    manifesto = _ler_manifesto(pasta_originais)
+    ids_produtos = ProdutoRepo.obter_ids()
+    if ids_produtos is None:
+        raise RuntimeError("Não foi possível consultar os produtos.")
+    originais, orfas = _listar_originais(pasta_originais, pasta_imagens, ids_produtos)
+    for nome in orfas:
+        logger.warning("Imagem sem produto correspondente, ignorada: %s", nome)
+    pendentes: List[Tuple[str, Path, str]] = []
+    ignoradas = 0
+    for nome_base, origem in originais.items():
+        hash_origem = calcular_hash_arquivo(origem)
+        registro = manifesto.get(nome_base)
+        if (
+            not forcar
+            and registro
+            and (registro.get("hash"), registro.get("assinatura")) == (hash_origem, assinatura)
+            and _variantes_armazenadas(registro)
+        ):
+            ignoradas += 1
+            continue
+        pendentes.append((nome_base, origem, hash_origem))
+    resumo = {"processadas": 0, "ignoradas": ignoradas, "orfas": len(orfas), "falhas": 0}
+    inicio = time.perf_counter()
+    desde_gravacao = 0
+    with ProcessPoolExecutor(
+        max_workers=processos or os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        futuros = {
+            executor.submit(armazenar_imagem_produto, str(origem)): (nome_base, hash_origem)
+            for nome_base, origem, hash_origem in pendentes
+        }
+        try:
+            for futuro in as_completed(futuros):
+                nome_base, hash_origem = futuros[futuro]
+                try:
+                    variantes = futuro.result()
+                    if not ProdutoImagemRepo.definir(_obter_id_produto(nome_base), variantes):
+                        raise RuntimeError("não foi possível registrar as variantes")
+                except Exception as ex:
+                    logger.error("Erro ao reprocessar a imagem %s: %s", nome_base, ex)
+                    resumo["falhas"] += 1
+                    continue
+                manifesto[nome_base] = {
+                    "hash": hash_origem,
+                    "assinatura": assinatura,
+                    "chaves": sorted(chave for _, _, chave in variantes),
+                }
+                resumo["processadas"] += 1
+                desde_gravacao += 1
+                if desde_gravacao >= INTERVALO_GRAVACAO_MANIFESTO:
+                    _gravar_manifesto(pasta_originais, manifesto)
+                    desde_gravacao = 0
+        except KeyboardInterrupt:
+            for futuro in futuros:
+                futuro.cancel()
+            raise
+        finally:
+            _gravar_manifesto(pasta_originais, manifesto)
+    duracao = time.perf_counter() - inicio
+    resumo["segundos"] = round(duracao, 3)
+    resumo["imagens_por_segundo"] = round(resumo["processadas"] / duracao, 2) if duracao > 0 else 0.0
+    return resumo
+
+
+def main(argumentos=None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        prog="python -m util.reprocessar_imagens",
+        description="Gera novamente as variantes das imagens de produtos.",
+    )
+    parser.add_argument("--processos", type=int, default=None, help="padrão: número de núcleos")
+    parser.add_argument("--forcar", action="store_true", help="reprocessa também as imagens inalteradas")
+    opcoes = parser.parse_args(argumentos)
+    try:
+        resumo = reprocessar_imagens(opcoes.processos, opcoes.forcar)
+    except KeyboardInterrupt:
+        logger.warning("Interrompido; a próxima execução continua de onde parou.")
+        return 130
+    except RuntimeError as ex:
+        logger.error("%s", ex)
+        return 1
+    logger.info(
+        "%d processadas, %d ignoradas, %d órfãs, %d falhas em %.2f s (%.2f imagens/s)",
+        resumo["processadas"], resumo["ignoradas"], resumo["orfas"], resumo["falhas"],
+        resumo["segundos"], resumo["imagens_por_segundo"],
+    )
+    return 1 if resumo["falhas"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,34 @@
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from repositories.semente_repo import SementeRepo
+
+
+def ler_semente_alterada(arquivo_json: str) -> Optional[Tuple[list, str]]:
+    # devolve os registros do arquivo e o hash do conteúdo, ou None se o
+    # arquivo é idêntico ao da última carga e pode ser ignorado
+    conteudo = Path(arquivo_json).read_bytes()
+    hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+    if SementeRepo.obter_hash(Path(arquivo_json).as_posix()) == hash_conteudo:
+        return None
+    return json.loads(conteudo.decode("utf-8")), hash_conteudo
+
+
+def registrar_semente(arquivo_json: str, hash_conteudo: str) -> bool:
+    return SementeRepo.registrar_hash(Path(arquivo_json).as_posix(), hash_conteudo)
+
+
+def filtrar_nao_carregados(tabela: str, registros: list, chave: str) -> list:
+    # apenas os registros cuja chave natural nunca foi carregada: um registro
+    # excluído depois da carga não volta quando o arquivo muda
+    carregadas = SementeRepo.obter_chaves(tabela)
+    if carregadas is None:
+        raise sqlite3.OperationalError(f"Não foi possível consultar as chaves já carregadas de {tabela}.")
+    return [registro for registro in registros if registro[chave] not in carregadas]
+
+
+def registrar_chaves_carregadas(tabela: str, chaves: List[str]) -> bool:
+    return SementeRepo.registrar_chaves(tabela, chaves)
@@ -1,10 +1,177 @@
+import logging
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
 from fastapi.templating import Jinja2Templates
-from jinja2 import ChoiceLoader, FileSystemLoader
+from jinja2 import (
+    BaseLoader,
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    TemplateNotFound,
+    TemplateSyntaxError,
+)
+
+from util.cache_catalogo import obter_imagem_produto
+from util.cache_templates import ExtensaoCacheFragmentos
+from util.estaticos import estatico
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_TEMPLATES = "templates"
+DIRETORIO_COMPARTILHADO = "templates/shared"
+
+_ambiente: Optional["AmbienteTemplates"] = None
+_lock_ambiente = threading.Lock()
+
+
+def _separar_nome(nome: str) -> Tuple[str, str]:
+    # nomes no ambiente compartilhado trazem a área: "templates/main:pages/index.html"
+    if ":" in nome:
+        area, relativo = nome.split(":", 1)
+        return area, relativo
+    return DIRETORIO_COMPARTILHADO, nome
+
+
+class LoaderAreas(BaseLoader):
+    # procura primeiro no diretório da área e depois em templates/shared,
+    # como o antigo ChoiceLoader criado para cada área
+    def __init__(self):
+        self._loaders: Dict[str, FileSystemLoader] = {}
+
+    def _obter_loader(self, diretorio: str) -> FileSystemLoader:
+        loader = self._loaders.get(diretorio)
+        if loader is None:
+            loader = self._loaders.setdefault(diretorio, FileSystemLoader(diretorio))
+        return loader
+
+    def get_source(self, environment, template):
+        area, relativo = _separar_nome(template)
+        for diretorio in dict.fromkeys((area, DIRETORIO_COMPARTILHADO)):
+            try:
+                return self._obter_loader(diretorio).get_source(environment, relativo)
+            except TemplateNotFound:
+                pass
+        raise TemplateNotFound(template)
+
+
+class AmbienteTemplates(Environment):
+    # extends/include dentro de um template continuam na área de quem o
+    # incluiu: "pages/base.html" usado por templates/main vira
+    # "templates/main:pages/base.html"
+    def join_path(self, template: str, parent: str) -> str:
+        if ":" in template or ":" not in parent:
+            return template
+        return f"{parent.split(':', 1)[0]}:{template}"
+
+
+class TemplatesArea(Jinja2Templates):
+    # fachada de uma área (templates/main, templates/cliente...) sobre o
+    # ambiente compartilhado; os nomes usados nas rotas não mudam
+    def __init__(self, diretorio: str, env: Environment):
+        super().__init__(env=env)
+        self.diretorio = diretorio
+
+    def get_template(self, name: str):
+        return self.env.get_template(f"{self.diretorio}:{name}")
+
+
+def _recarregar_automaticamente() -> bool:
+    # em produção (TEMPLATES_AUTO_RELOAD=0) os arquivos não são conferidos a
+    # cada renderização; alterações exigem reiniciar a aplicação
+    return os.getenv("TEMPLATES_AUTO_RELOAD", "1") == "1"
+
+
+def _aplicar_configuracao(ambiente: "AmbienteTemplates"):
+    ambiente.auto_reload = _recarregar_automaticamente()
+    diretorio_cache = os.getenv("TEMPLATES_CACHE_DIR", ".cache/jinja")
+    if diretorio_cache:
+        os.makedirs(diretorio_cache, exist_ok=True)
+        ambiente.bytecode_cache = FileSystemBytecodeCache(diretorio_cache)
+    else:
+        ambiente.bytecode_cache = None
+
+
+def _criar_ambiente() -> AmbienteTemplates:
+    ambiente = AmbienteTemplates(
+        loader=LoaderAreas(),
+        autoescape=True,
+        cache_size=int(os.getenv("TEMPLATES_CACHE_TAMANHO", "400")),
+        extensions=[ExtensaoCacheFragmentos],
+    )
+    ambiente.globals["estatico"] = estatico
+    ambiente.globals["imagem_produto"] = obter_imagem_produto
+    _aplicar_configuracao(ambiente)
+    return ambiente
+
+
+def obter_ambiente_templates() -> AmbienteTemplates:
+    global _ambiente
+    if _ambiente is None:
+        with _lock_ambiente:
+            if _ambiente is None:
+                _ambiente = _criar_ambiente()
+    return _ambiente
 
 
 def obter_jinja_templates(diretorio: str) -> Jinja2Templates:
-    loader1 = FileSystemLoader(diretorio)
-    loader2 = FileSystemLoader("templates/shared")
-    loader = ChoiceLoader([loader1, loader2])
-    templates = Jinja2Templates(directory="templates", loader=loader)
-    return templates
+    return TemplatesArea(diretorio, obter_ambiente_templates())
+
+
+def configurar_templates():
+    # as rotas criam o ambiente ao serem importadas, antes do load_dotenv;
+    # chamado na inicialização para aplicar as variáveis do .env
+    _aplicar_configuracao(obter_ambiente_templates())
+    if os.getenv("TEMPLATES_PRECOMPILAR", "0") == "1":
+        resumo = precompilar_templates()
+        logger.info("%d templates pré-compilados.", resumo["compilados"])
+
+
+def _listar_areas() -> List[str]:
+    raiz = Path(DIRETORIO_TEMPLATES)
+    areas = [DIRETORIO_TEMPLATES]
+    areas += sorted(
+        item.as_posix() for item in raiz.iterdir()
+        if item.is_dir() and item.as_posix() != DIRETORIO_COMPARTILHADO
+    )
+    return areas
+
+
+def _listar_templates(diretorio: str) -> List[str]:
+    return [
+        arquivo.relative_to(diretorio).as_posix()
+        for arquivo in sorted(Path(diretorio).rglob("*.html"))
+    ]
+
+
+def precompilar_templates() -> dict:
+    # compila todos os templates de todas as áreas, preenchendo o cache em
+    # memória e o cache de bytecode em disco antes da primeira requisição
+    ambiente = obter_ambiente_templates()
+    compartilhados = _listar_templates(DIRETORIO_COMPARTILHADO)
+    resumo = {"compilados": 0, "erros": []}
+    for area in _listar_areas():
+        # a área raiz (usada pelas páginas de erro) só enxerga os compartilhados
+        proprios = [] if area == DIRETORIO_TEMPLATES else _listar_templates(area)
+        for nome in dict.fromkeys(proprios + compartilhados):
+            try:
+                ambiente.get_template(f"{area}:{nome}")
+                resumo["compilados"] += 1
+            except TemplateSyntaxError as ex:
+                logger.error("Erro ao compilar o template %s (%s): %s", nome, area, ex)
+                resumo["erros"].append(f"{area}:{nome}")
+    return resumo
+
+
+def main(argumentos=None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    resumo = precompilar_templates()
+    logger.info("%d templates compilados.", resumo["compilados"])
+    return 1 if resumo["erros"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
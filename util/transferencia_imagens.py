@@ -0,0 +1,190 @@
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from repositories.produto_imagem_repo import ProdutoImagemRepo
+from util.armazenamento_imagens import obter_armazenamento_imagens
+from util.images import (
+    EXTENSOES_IMAGEM,
+    armazenar_imagem_produto,
+    calcular_hash_arquivo,
+    obter_assinatura_processamento,
+    obter_pasta_originais,
+    vincular_ou_copiar,
+)
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_MANIFESTO = "transferencias.json"
+
+
+def _caminho_manifesto() -> Path:
+    return Path(obter_pasta_originais()) / ARQUIVO_MANIFESTO
+
+
+def _ler_manifesto() -> Dict[str, dict]:
+    try:
+        with open(_caminho_manifesto(), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+
+def _gravar_manifesto(manifesto: Dict[str, dict]):
+    destino = _caminho_manifesto()
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_name(destino.name + ".tmp")
+    temporario.write_text(json.dumps(manifesto, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(temporario, destino)
+
+
+def _eh_imagem(arquivo: Path) -> bool:
+    return arquivo.suffix.lower() in EXTENSOES_IMAGEM
+
+
+def _obter_id_produto(arquivo: Path, ids_produtos: Optional[Dict[int, int]]) -> Optional[int]:
+    # imagens da carga inicial são nomeadas pelo id do produto no arquivo
+    # de carga (0001.jpg); ids_produtos o converte no id do banco
+    if not arquivo.stem.isdigit():
+        return None
+    numero = int(arquivo.stem)
+    return numero if ids_produtos is None else ids_produtos.get(numero)
+
+
+def _destino_existe(
+    arquivo: Path, path_destino: Path, registro: dict, registradas: dict, id_produto: Optional[int]
+) -> bool:
+    if _eh_imagem(arquivo):
+        # além de gravadas no armazenamento, as variantes precisam estar
+        # registradas em produto_imagem: o manifesto sobrevive a um banco
+        # recriado, e o arquivo seria ignorado sem nunca ser registrado
+        armazenamento = obter_armazenamento_imagens()
+        chaves = registro.get("chaves") or []
+        return (
+            bool(chaves)
+            and sorted(registradas.get(id_produto, {}).values()) == chaves
+            and all(armazenamento.existe(chave) for chave in chaves)
+        )
+    return (path_destino / arquivo.name).exists()
+
+
+def _transferir(arquivo: Path, path_destino: Path, id_produto: Optional[int]):
+    if _eh_imagem(arquivo):
+        # mesma rotina do upload: grava as variantes no armazenamento
+        return armazenar_imagem_produto(str(arquivo), f"{id_produto:04d}")
+    vincular_ou_copiar(str(arquivo), str(path_destino / arquivo.name))
+    return None
+
+
+def _registrar(variantes, entrada: dict):
+    if variantes is not None:
+        if not ProdutoImagemRepo.definir(entrada["id_produto"], variantes):
+            raise RuntimeError("não foi possível registrar as variantes")
+        entrada["chaves"] = sorted(chave for _, _, chave in variantes)
+
+
+def sincronizar_imagens(
+    pasta_origem: str,
+    pasta_destino: str,
+    processos: Optional[int] = None,
+    ids_produtos: Optional[Dict[int, int]] = None,
+) -> dict:
+    # transfere de pasta_origem apenas os arquivos novos ou alterados desde a
+    # última sincronização; tamanho e mtime iguais aos do manifesto dispensam
+    # até a leitura do arquivo, e o hash evita reprocessar um arquivo apenas
+    # tocado (mtime diferente, conteúdo igual)
+    inicio = time.perf_counter()
+    path_origem, path_destino = Path(pasta_origem), Path(pasta_destino)
+    manifesto = _ler_manifesto()
+    assinatura = obter_assinatura_processamento()
+    registradas = ProdutoImagemRepo.obter_todas() or {}
+    pendentes = {}
+    resumo = {"transferidos": 0, "inalterados": 0, "orfas": 0, "falhas": 0}
+    for arquivo in sorted(path_origem.glob("*")):
+        if not arquivo.is_file():
+            continue
+        chave = arquivo.as_posix()
+        informacoes = arquivo.stat()
+        registro = manifesto.get(chave)
+        id_produto = _obter_id_produto(arquivo, ids_produtos) if _eh_imagem(arquivo) else None
+        if _eh_imagem(arquivo) and id_produto is None:
+            logger.warning("Imagem sem produto correspondente, ignorada: %s", arquivo)
+            resumo["orfas"] += 1
+            continue
+        entrada = {
+            "tamanho": informacoes.st_size,
+            "mtime_ns": informacoes.st_mtime_ns,
+            "assinatura": assinatura if _eh_imagem(arquivo) else None,
+            "id_produto": id_produto,
+        }
+        if (
+            registro
+            and registro.get("assinatura") == entrada["assinatura"]
+            and _destino_existe(arquivo, path_destino, registro, registradas, id_produto)
+        ):
+            if (registro["tamanho"], registro["mtime_ns"]) == (entrada["tamanho"], entrada["mtime_ns"]):
+                resumo["inalterados"] += 1
+                continue
+            entrada["hash"] = calcular_hash_arquivo(arquivo)
+            if entrada["hash"] == registro["hash"]:
+                manifesto[chave] = {**registro, **entrada}
+                resumo["inalterados"] += 1
+                continue
+        else:
+            entrada["hash"] = calcular_hash_arquivo(arquivo)
+        pendentes[arquivo] = entrada
+    imagens = [arquivo for arquivo in pendentes if _eh_imagem(arquivo)]
+    outros = [arquivo for arquivo in pendentes if not _eh_imagem(arquivo)]
+    futuros = {}
+    executores = []
+    if len(imagens) > 1:
+        # decodificar e redimensionar usa CPU: um processo por núcleo
+        executor_imagens = ProcessPoolExecutor(
+            max_workers=min(len(imagens), processos or os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        executores.append(executor_imagens)
+        futuros.update(
+            {executor_imagens.submit(_transferir, a, path_destino, pendentes[a]["id_produto"]): a for a in imagens}
+        )
+        imagens = []
+    if outros:
+        # cópias são limitadas por E/S: threads bastam
+        executor_arquivos = ThreadPoolExecutor(max_workers=min(len(outros), 8))
+        executores.append(executor_arquivos)
+        futuros.update({executor_arquivos.submit(_transferir, a, path_destino, None): a for a in outros})
+    try:
+        for arquivo in imagens:
+            try:
+                _registrar(_transferir(arquivo, path_destino, pendentes[arquivo]["id_produto"]), pendentes[arquivo])
+            except Exception as ex:
+                logger.error("Erro ao transferir %s: %s", arquivo, ex)
+                resumo["falhas"] += 1
+                continue
+            manifesto[arquivo.as_posix()] = pendentes[arquivo]
+            resumo["transferidos"] += 1
+        for futuro, arquivo in futuros.items():
+            try:
+                _registrar(futuro.result(), pendentes[arquivo])
+            except Exception as ex:
+                logger.error("Erro ao transferir %s: %s", arquivo, ex)
+                resumo["falhas"] += 1
+                continue
+            manifesto[arquivo.as_posix()] = pendentes[arquivo]
+            resumo["transferidos"] += 1
+    finally:
+        for executor in executores:
+            executor.shutdown(wait=True, cancel_futures=True)
+        _gravar_manifesto(manifesto)
+    resumo["segundos"] = round(time.perf_counter() - inicio, 3)
+    logger.info(
+        "Imagens de %s: %d transferidas, %d inalteradas, %d órfãs, %d falhas em %.2f s",
+        pasta_origem, resumo["transferidos"], resumo["inalterados"], resumo["orfas"], resumo["falhas"],
+        resumo["segundos"],
+    )
+    return resumo
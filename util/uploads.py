@@ -0,0 +1,137 @@
+import os
+import tempfile
+
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+TAMANHO_BLOCO = 64 * 1024
+# folga para os demais campos do formulário e os delimitadores do multipart
+MARGEM_FORMULARIO = 256 * 1024
+
+# assinaturas (primeiros bytes) dos formatos de imagem aceitos no upload
+ASSINATURAS_IMAGEM = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+)
+
+
+class UploadInvalidoError(ValueError):
+    pass
+
+
+class UploadMuitoGrandeError(UploadInvalidoError):
+    pass
+
+
+def obter_tamanho_maximo_upload() -> int:
+    return int(float(os.getenv("IMAGENS_UPLOAD_MAXIMO_MB", "10")) * 1024 * 1024)
+
+
+def identificar_formato_imagem(cabecalho: bytes):
+    for assinatura, formato in ASSINATURAS_IMAGEM:
+        if cabecalho.startswith(assinatura):
+            return formato
+    if cabecalho[:4] == b"RIFF" and cabecalho[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+async def salvar_upload_imagem_temporario(arquivo: UploadFile) -> str:
+    # copia o upload em blocos para um arquivo temporário, sem manter o
+    # conteúdo inteiro em memória; recusa pelo cabeçalho o que não é imagem
+    # e interrompe a cópia ao passar de IMAGENS_UPLOAD_MAXIMO_MB; quem chama
+    # deve remover o arquivo devolvido
+    tamanho_maximo = obter_tamanho_maximo_upload()
+    if arquivo.size is not None and arquivo.size > tamanho_maximo:
+        raise UploadMuitoGrandeError(arquivo.size)
+    bloco = await arquivo.read(TAMANHO_BLOCO)
+    if identificar_formato_imagem(bloco[:12]) is None:
+        raise UploadInvalidoError("formato não reconhecido")
+    descritor, caminho = tempfile.mkstemp(prefix="upload-", suffix=".img")
+    try:
+        with os.fdopen(descritor, "wb") as destino:
+            total = 0
+            while bloco:
+                total += len(bloco)
+                if total > tamanho_maximo:
+                    raise UploadMuitoGrandeError(total)
+                destino.write(bloco)
+                bloco = await arquivo.read(TAMANHO_BLOCO)
+    except BaseException:
+        os.remove(caminho)
+        raise
+    return caminho
+
+
+class _CorpoMuitoGrandeError(HTTPException):
+    # HTTPException: o FastAPI a repassa em vez de trocá-la por um 400
+    def __init__(self):
+        super().__init__(status_code=413)
+
+
+def resposta_upload_muito_grande(tamanho_maximo: int) -> JSONResponse:
+    pd = {
+        "title": "imagem",
+        "detail": f"A imagem deve ter no máximo {tamanho_maximo // (1024 * 1024)} MB.",
+        "type": "file_too_large",
+        "path": ["body", "imagem"],
+    }
+    return JSONResponse(pd, status_code=413)
+
+
+class LimiteUploadMiddleware:
+    # o Starlette lê o corpo multipart inteiro (para a memória ou um arquivo
+    # temporário) antes de chamar a rota; este middleware recusa o corpo
+    # acima de IMAGENS_UPLOAD_MAXIMO_MB já pelo Content-Length ou, sem ele
+    # (chunked), assim que os bytes recebidos passam do limite
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        cabecalhos = Headers(scope=scope)
+        if not cabecalhos.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+        tamanho_maximo = obter_tamanho_maximo_upload()
+        limite = tamanho_maximo + MARGEM_FORMULARIO
+        tamanho_declarado = cabecalhos.get("content-length")
+        if tamanho_declarado is not None and tamanho_declarado.isdigit() and int(tamanho_declarado) > limite:
+            await resposta_upload_muito_grande(tamanho_maximo)(scope, receive, send)
+            return
+        recebido = 0
+        excedido = False
+        resposta_iniciada = False
+
+        async def receber():
+            nonlocal recebido, excedido
+            mensagem = await receive()
+            if mensagem["type"] == "http.request":
+                recebido += len(mensagem.get("body", b""))
+                if recebido > limite:
+                    excedido = True
+                    raise _CorpoMuitoGrandeError()
+            return mensagem
+
+        async def enviar(mensagem):
+            # a página de erro gerada pelos handlers da aplicação é trocada
+            # pela mesma resposta 413 do caso com Content-Length
+            nonlocal resposta_iniciada
+            if mensagem["type"] == "http.response.start":
+                resposta_iniciada = True
+                if excedido:
+                    await resposta_upload_muito_grande(tamanho_maximo)(scope, receive, send)
+            if not excedido:
+                await send(mensagem)
+
+        try:
+            await self.app(scope, receber, enviar)
+        except _CorpoMuitoGrandeError:
+            if resposta_iniciada:
+                raise
+            await resposta_upload_muito_grande(tamanho_maximo)(scope, receive, send)